@@ -29,6 +29,8 @@ const resumeUpload = multer({ storage: storage });
 
 // Python service URL
 const PYTHON_SERVICE_URL = 'http://127.0.0.1:8000';
+// With PITCH_UDS set, the same requests go over the service's Unix socket instead of TCP
+const PYTHON_SERVICE_SOCKET = process.env.PITCH_UDS ? { socketPath: process.env.PITCH_UDS } : {};
 
 // Updated route to use your Python FastAPI service
 router.post('/parse-resume', resumeUpload.single('file'), async (req, res) => {
@@ -56,6 +58,7 @@ router.post('/parse-resume', resumeUpload.single('file'), async (req, res) => {
         ...formData.getHeaders(),
         'Content-Type': 'multipart/form-data'
       },
+      ...PYTHON_SERVICE_SOCKET,
       timeout: 30000 // 30 second timeout
     });
 
@@ -177,6 +180,7 @@ router.post('/upload', resumeUpload.single('resume'), async (req, res) => {
         ...formData.getHeaders(),
         'Content-Type': 'multipart/form-data'
       },
+      ...PYTHON_SERVICE_SOCKET,
       timeout: 30000
     });
 
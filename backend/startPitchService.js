@@ -4,11 +4,15 @@ const path = require('path');
 const startPitchService = () => {
   const pitchServicePath = path.join(__dirname, '..', 'models', 'Elevator Pitch');
   
-  console.log('Starting Elevator Pitch service...');
+  // Production mode drops the reloader, runs several workers and warms up before /ready
+  const pitchEnv = process.env.PITCH_ENV || (process.env.NODE_ENV === 'production' ? 'production' : 'development');
   
-  const pythonProcess = spawn('python', ['main.py'], {
+  console.log(`Starting Elevator Pitch service (${pitchEnv})...`);
+  
+  const pythonProcess = spawn(process.env.PITCH_PYTHON || 'python', ['main.py'], {
     cwd: pitchServicePath,
-    stdio: 'inherit'
+    stdio: 'inherit',
+    env: { ...process.env, PITCH_ENV: pitchEnv }
   });
   
   pythonProcess.on('error', (error) => {
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from metrics import registry
+
+ADMISSION_REJECTED_TOTAL = registry.counter(
+    "pitch_admission_rejected_total", "Requests turned away with 503, by lane and reason (queue_full, timeout)",
+    ("lane", "reason")
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "pitch_admission_wait_seconds", "Time admitted requests spent in the wait queue, by lane", ("lane",)
+)
+
+
+class LaneFull(Exception):
+    """Raised when a request can't be admitted; retry_after is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLane:
+    """
+    At most `concurrency` requests run at once; up to `queue_size` more wait, first come first
+    served, for at most `max_wait` seconds. Anything beyond that is rejected immediately, so
+    latency stays bounded and clients are told to come back instead of timing out.
+    A concurrency of 0 admits everything.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long admitted requests hold their slot
+        self._service_seconds = 0.1
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained"""
+        if not self.concurrency:
+            return 1
+        return max(1, math.ceil(self._service_seconds * (self.waiting + 1) / self.concurrency))
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the seconds spent waiting, or raise LaneFull"""
+        if not self.concurrency or (self.active < self.concurrency and not self._waiters):
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.queue_size:
+            ADMISSION_REJECTED_TOTAL.inc(self.name, "queue_full")
+            raise LaneFull("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            ADMISSION_REJECTED_TOTAL.inc(self.name, "timeout")
+            raise LaneFull("timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # The client went away while queued
+            self._abandon(waiter)
+            raise
+        waited = time.perf_counter() - start
+        ADMISSION_WAIT_SECONDS.observe(waited, self.name)
+        return waited
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done():
+            # A slot was handed over just as the wait ended; pass it on
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def release(self, held_seconds: Optional[float] = None):
+        if held_seconds is not None:
+            self._service_seconds += 0.1 * (held_seconds - self._service_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot goes straight to the next waiter, so active stays the same
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting each request through the lane `classify(method, path)` names.
+    Requests it returns None for (health checks, metrics, job polling) are never held back.
+    """
+
+    def __init__(self, app, lanes: Dict[str, AdmissionLane], classify: Callable[[str, str], Optional[str]]):
+        self.app = app
+        self.lanes = lanes
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        lane_name = self.classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        lane = self.lanes.get(lane_name) if lane_name else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await lane.acquire()
+        except LaneFull as e:
+            await self._reject(send, lane, e)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, lane: AdmissionLane, error: LaneFull):
+        body = json.dumps({
+            "detail": f"Server busy: {lane.active} {lane.name} requests running and {lane.waiting} waiting, "
+                      f"please retry in {error.retry_after}s"
+        }).encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(error.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_lanes_from_env(pool_workers: int) -> Dict[str, AdmissionLane]:
+    """
+    The "heavy" lane (file uploads that parse in the worker pool) and the "light" lane
+    (JSON pitch, match and search calls), sized by PITCH_ADMISSION_{HEAVY,LIGHT}_CONCURRENCY
+    and PITCH_ADMISSION_{HEAVY,LIGHT}_QUEUE, with PITCH_ADMISSION_MAX_WAIT seconds of queueing.
+    """
+    max_wait = float(os.getenv("PITCH_ADMISSION_MAX_WAIT", "2"))
+    return {
+        "heavy": AdmissionLane(
+            "heavy",
+            int(os.getenv("PITCH_ADMISSION_HEAVY_CONCURRENCY", pool_workers * 2)),
+            int(os.getenv("PITCH_ADMISSION_HEAVY_QUEUE", pool_workers * 4)),
+            max_wait
+        ),
+        "light": AdmissionLane(
+            "light",
+            int(os.getenv("PITCH_ADMISSION_LIGHT_CONCURRENCY", "64")),
+            int(os.getenv("PITCH_ADMISSION_LIGHT_QUEUE", "256")),
+            max_wait
+        ),
+    }
@@ -0,0 +1,169 @@
+"""
+Throughput of the parsed-resume export, and how long analytics scans of it take compared
+with re-parsing the corpus.
+
+    python benchmark_export.py --profiles 1000000
+    python benchmark_export.py --profiles 1000000 --out export.json
+
+Appends go through ResumeExport with real parsed results. The scan corpus is synthesised
+column by column straight into the dataset layout, spread over --days partitions of
+--parts-per-day part files each, and compacted before it is scanned.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from resume_corpus import CERTIFICATIONS, COMPANIES, DEGREES, FIRST_NAMES, LAST_NAMES, SCHOOLS, SKILLS, TITLES
+from resume_corpus import generate_corpus
+from resume_export import ResumeExport, pa, pc
+from resume_parser import build_structured_data, parse_resume_file
+
+ANALYTICS_COLUMNS = [
+    "candidate_name", "education_qualifications", "positions", "skills", "candidate_courses_and_certifications"
+]
+
+
+def _list_array(rng: np.random.RandomState, choices, count: int, low: int, high: int) -> "pa.ListArray":
+    lengths = rng.randint(low, high + 1, size=count)
+    offsets = np.zeros(count + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    values = pa.array(np.asarray(choices, dtype=object)[rng.randint(0, len(choices), size=offsets[-1])], pa.string())
+    return pa.ListArray.from_arrays(pa.array(offsets), values)
+
+
+def _struct_list(rng: np.random.RandomState, columns: Dict[str, Any], count: int, low: int, high: int,
+                 value_type: "pa.DataType") -> "pa.ListArray":
+    lengths = rng.randint(low, high + 1, size=count)
+    offsets = np.zeros(count + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    total = int(offsets[-1])
+    arrays = []
+    for field in value_type:
+        source = columns[field.name]
+        if pa.types.is_list(field.type):
+            arrays.append(_list_array(rng, source, total, 0, 3))
+        else:
+            arrays.append(pa.array(np.asarray(source, dtype=object)[rng.randint(0, len(source), size=total)], pa.string()))
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.StructArray.from_arrays(arrays, fields=list(value_type)))
+
+
+def synthetic_table(schema: "pa.Schema", count: int, start: int, parsed_at_ms: int, seed: int) -> "pa.Table":
+    """`count` profiles drawn from the corpus vocabularies, built without any per-row Python"""
+    rng = np.random.RandomState(seed)
+    names = np.char.add(np.char.add(np.asarray(FIRST_NAMES)[rng.randint(0, len(FIRST_NAMES), count)], " "),
+                        np.asarray(LAST_NAMES)[rng.randint(0, len(LAST_NAMES), count)])
+    doc_ids = np.char.add("c", np.char.zfill(np.arange(start, start + count).astype(str), 8))
+    education = {"degree_type": DEGREES, "school_name": SCHOOLS, "specialization_subjects": ("",), "end_date": ("",)}
+    positions = {"position_name": TITLES, "company_name": COMPANIES, "start_date": ("",),
+                 "job_details": ("built internal tools", "led a team of engineers"), "skills": SKILLS}
+    columns = {
+        "doc_id": pa.array(doc_ids.tolist(), pa.string()),
+        "filename": pa.array(np.char.add(doc_ids, ".pdf").tolist(), pa.string()),
+        "parsed_at": pa.array(np.full(count, parsed_at_ms, dtype=np.int64), pa.timestamp("ms", tz="UTC")),
+        "candidate_name": pa.array(names.tolist(), pa.string()),
+        "candidate_email": pa.array(np.char.add(doc_ids, "@example.com").tolist(), pa.string()),
+        "skills": _list_array(rng, SKILLS, count, 4, 12),
+        "candidate_courses_and_certifications": _list_array(rng, CERTIFICATIONS, count, 0, 3),
+        "education_qualifications": _struct_list(
+            rng, education, count, 1, 2, schema.field("education_qualifications").type.value_type
+        ),
+        "positions": _struct_list(rng, positions, count, 1, 4, schema.field("positions").type.value_type),
+    }
+    return pa.Table.from_arrays([columns[field.name] for field in schema], schema=schema)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmarks(directory: str, profiles: int, days: int, parts_per_day: int, appends: int,
+                   seed: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    documents = generate_corpus(max(1, min(appends, 50)), seed, ('short', 'long'))
+
+    # Appends of real parsed results, including the part files written every flush_rows
+    parsed = [build_structured_data(document.text)["data"]["attributes"]["result"] for document in documents]
+    export = ResumeExport(os.path.join(directory, "appends"))
+    start = time.perf_counter()
+    for number in range(appends):
+        export.append(f"a{number}", "resume.pdf", parsed[number % len(parsed)])
+    export.flush()
+    elapsed = time.perf_counter() - start
+    results["append"] = {"rows": appends, "seconds": elapsed, "per_sec": appends / elapsed if elapsed else 0.0}
+    export.close()
+
+    # What the analytics team does today: parse every resume again
+    files = [(document.filename('pdf'), document.render('pdf')) for document in documents]
+    _, seconds = timed(lambda: [parse_resume_file(name, content) for name, content in files])
+    results["reparse_estimate"] = {"per_resume_ms": seconds / len(files) * 1000,
+                                   "seconds_for_profiles": seconds / len(files) * profiles}
+
+    export = ResumeExport(os.path.join(directory, "corpus"), compact_files=0)
+    parts = days * parts_per_day
+    written = 0
+    start = time.perf_counter()
+    for number in range(parts):
+        count = profiles * (number + 1) // parts - written
+        day = number // parts_per_day
+        if count:
+            table = synthetic_table(export.schema, count, written, 1714521600000 + day * 24 * 3600 * 1000, seed + number)
+            export._write_part(f"day=2024-05-{day + 1:02d}", table)
+            written += count
+    results["write"] = {"rows": written, "seconds": time.perf_counter() - start}
+    stats, seconds = timed(export.compact)
+    results["compact"] = {**stats, "seconds": seconds}
+    results["dataset"] = export.stats()
+
+    table, seconds = timed(export.scan, ANALYTICS_COLUMNS)
+    results["scan_analytics_columns"] = {"rows": len(table), "seconds": seconds}
+    del table
+    skills, seconds = timed(export.scan, ["skills"])
+    counts, count_seconds = timed(lambda: pc.value_counts(pc.list_flatten(skills.column("skills"))))
+    results["skill_frequencies"] = {"seconds": seconds + count_seconds,
+                                    "top": sorted(counts.to_pylist(), key=lambda c: -c["counts"])[:5]}
+    flat = pc.list_flatten(skills.column("skills"))
+    parents = pc.list_parent_indices(skills.column("skills"))
+    matching, seconds = timed(lambda: len(pc.unique(pc.filter(parents, pc.equal(flat, "Python")))))
+    results["candidates_with_python"] = {"rows": matching, "seconds": seconds}
+    names, seconds = timed(export.scan, ["candidate_name"], pc.field("day") == "2024-05-01")
+    results["scan_one_partition"] = {"rows": len(names), "seconds": seconds}
+    export.close()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark appends, compaction and scans of the resume export")
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="rows in the scanned dataset")
+    parser.add_argument("--days", type=int, default=30, help="day partitions the rows are spread over (at most 31)")
+    parser.add_argument("--parts-per-day", type=int, default=8, help="part files per partition before compaction")
+    parser.add_argument("--appends", type=int, default=20_000, help="rows appended through ResumeExport.append")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--dir", help="dataset directory to keep (a temporary one by default)")
+    parser.add_argument("--out", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.dir:
+        results = run_benchmarks(args.dir, args.profiles, args.days, args.parts_per_day, args.appends, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_benchmarks(directory, args.profiles, args.days, args.parts_per_day, args.appends, args.seed)
+
+    for name, stats in results.items():
+        print(f"{name:24s} {json.dumps(stats)}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
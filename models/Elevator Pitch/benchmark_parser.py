@@ -0,0 +1,262 @@
+"""
+Offline micro-benchmarks for the resume parser and pitch generator.
+
+    python benchmark_parser.py --count 20 --out bench.json
+    python benchmark_parser.py --count 20 --compare bench.json
+
+Every run uses the same synthetic corpus for a given --seed, so results saved from two
+commits can be compared directly. Before timing anything, every pitch style is rendered for
+resume JSON with null fields, and the run fails if one raises.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from candidate_profile import CandidateProfile
+from pitch_templates import PITCH_STYLES
+from resume_corpus import FORMATS, LAYOUTS, ResumeDocument, generate_corpus
+from resume_parser import (
+    ResumeSections, build_structured_data, extract_certifications_from_text, extract_education_from_text,
+    extract_email_from_text, extract_experience_from_text, extract_name_from_text, extract_skills_from_text,
+    parse_resume_file
+)
+from resume_pitch_generator import ResumePitchGenerator
+from docx_extract import extract_docx_text, iter_docx_paragraphs
+
+TEXT_EXTRACTORS: Dict[str, Callable] = {
+    "extract_name_from_text": extract_name_from_text,
+    "extract_email_from_text": extract_email_from_text,
+    "extract_education_from_text": extract_education_from_text,
+    "extract_experience_from_text": extract_experience_from_text,
+    "extract_skills_from_text": extract_skills_from_text,
+    "extract_certifications_from_text": extract_certifications_from_text,
+}
+
+
+def python_docx_text(content: bytes) -> str:
+    """The extraction /parse-resume used before docx_extract: top-level paragraphs via python-docx"""
+    from docx import Document
+    document = Document(io.BytesIO(content))
+    return "\n".join([para.text for para in document.paragraphs if para.text.strip()])
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    """Latency distribution in milliseconds plus throughput in calls per second"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+        "per_sec": len(ordered) / total if total else 0.0,
+    }
+
+
+def time_calls(fn: Callable, inputs: Sequence[tuple], repeat: int) -> List[float]:
+    """Seconds per call of fn(*args) for every input, `repeat` times over, after one warm-up pass"""
+    for args in inputs:
+        fn(*args)
+    samples = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for args in inputs:
+            start = clock()
+            fn(*args)
+            samples.append(clock() - start)
+    return samples
+
+# Resume JSON with null fields that /generate-pitch must still render a pitch for
+NULL_FIELD_PAYLOADS = [
+    {"candidate_name": None},
+    {"candidate_name": "Ada Lovelace",
+     "education_qualifications": [{"degree_type": "BSc", "school_name": "MIT", "specialization_subjects": None}]},
+    {"candidate_name": "Ada Lovelace", "positions": [{"position_name": "", "company_name": "Acme", "job_details": None}],
+     "candidate_courses_and_certifications": None},
+]
+
+
+def check_null_fields() -> List[str]:
+    """Pitch styles that fail on a payload with null fields, as 'style: error' lines"""
+    failures = []
+    for result in NULL_FIELD_PAYLOADS:
+        profile = {"data": {"attributes": {"result": result}}}
+        for style in PITCH_STYLES:
+            try:
+                ResumePitchGenerator(profile).generate_pitch(style)
+            except Exception as e:
+                failures.append(f"{style}: {type(e).__name__}: {e} for {json.dumps(result)}")
+    return failures
+
+
+def run_benchmarks(documents: List[ResumeDocument], repeat: int, formats: Sequence[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    layouts = sorted({document.layout for document in documents})
+
+    for layout in layouts:
+        texts = [(document.text,) for document in documents if document.layout == layout]
+        indexed = [(text, ResumeSections(text)) for (text,) in texts]
+
+        results[f"ResumeSections/{layout}"] = summarise(time_calls(ResumeSections, texts, repeat))
+        for name, extractor in TEXT_EXTRACTORS.items():
+            # Standalone calls build their own section index, as an external caller would
+            results[f"{name}/{layout}"] = summarise(time_calls(extractor, texts, repeat))
+            results[f"{name}+sections/{layout}"] = summarise(time_calls(extractor, indexed, repeat))
+        results[f"build_structured_data/{layout}"] = summarise(time_calls(build_structured_data, texts, repeat))
+
+        layout_documents = [document for document in documents if document.layout == layout]
+        if 'docx' in formats:
+            docx = [(document.render('docx'),) for document in layout_documents]
+            tables = [(document.render_docx_table(),) for document in layout_documents]
+            results[f"extract_docx_text/{layout}"] = summarise(time_calls(extract_docx_text, docx, repeat))
+            results[f"extract_docx_text[table]/{layout}"] = summarise(time_calls(extract_docx_text, tables, repeat))
+            if python_docx_available():
+                results[f"python_docx_text/{layout}"] = summarise(time_calls(python_docx_text, docx, repeat))
+        if 'pdf' in formats:
+            from pdf_extract import extract_pdf_text
+            pdf = [(document.render('pdf'),) for document in layout_documents]
+            results[f"extract_pdf_text/{layout}"] = summarise(time_calls(extract_pdf_text, pdf, repeat))
+
+        for fmt in formats:
+            files = [(document.filename(fmt), document.render(fmt)) for document in layout_documents]
+            results[f"parse_resume_file[{fmt}]/{layout}"] = summarise(time_calls(parse_resume_file, files, repeat))
+
+    profiles = [
+        (CandidateProfile.from_result(build_structured_data(document.text)["data"]["attributes"]["result"]),)
+        for document in documents
+    ]
+    for style in PITCH_STYLES:
+        results[f"generate_pitch[{style}]"] = summarise(
+            time_calls(lambda profile: ResumePitchGenerator(profile).generate_pitch(style), profiles, repeat)
+        )
+    return results
+
+
+def python_docx_available() -> bool:
+    try:
+        import docx  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def docx_comparison(documents: List[ResumeDocument], scales: Sequence[int] = (1, 10, 100)) -> Dict[str, Any]:
+    """
+    For the first document repeated `scale` times over, in the plain and the table layout:
+    characters each DOCX extractor recovers, and the peak memory of streaming its paragraphs.
+    python-docx allocates inside lxml, which tracemalloc can't see, so only docx_extract is traced.
+    """
+    extractors = {"extract_docx_text": extract_docx_text}
+    if python_docx_available():
+        extractors["python_docx_text"] = python_docx_text
+    comparison: Dict[str, Any] = {}
+    for scale in scales:
+        document = ResumeDocument(documents[0].layout, 0, documents[0].lines * scale)
+        for variant, content in (("paragraphs", document.render('docx')), ("table", document.render_docx_table())):
+            stats = {"docx_kib": len(content) / 1024}
+            with zipfile.ZipFile(io.BytesIO(content)) as archive, archive.open("word/document.xml") as stream:
+                tracemalloc.start()
+                for _ in iter_docx_paragraphs(stream):
+                    pass
+                stats["stream_peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+            for name, extractor in extractors.items():
+                stats[f"{name}_chars"] = len(extractor(content))
+            comparison[f"docx[{variant}]/x{scale}"] = stats
+    return comparison
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """One line per benchmark present in both runs, flagging p50 changes beyond the threshold"""
+    lines = []
+    for name, stats in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if not before or not before["p50_ms"]:
+            continue
+        ratio = stats["p50_ms"] / before["p50_ms"]
+        flag = "  SLOWER" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        lines.append(f"{name:60s} {before['p50_ms']:9.3f} -> {stats['p50_ms']:9.3f} ms  x{ratio:5.2f}{flag}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the resume parser on a synthetic corpus")
+    parser.add_argument("--count", type=int, default=10, help="resumes generated per layout")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the corpus")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative p50 change reported as slower/faster")
+    args = parser.parse_args(argv)
+
+    failures = check_null_fields()
+    if failures:
+        print("Pitch generation fails on null fields:\n" + "\n".join(failures), file=sys.stderr)
+        return 1
+
+    documents = generate_corpus(args.count, args.seed, tuple(args.layouts))
+    started = time.perf_counter()
+    benchmarks = run_benchmarks(documents, args.repeat, args.formats)
+    docx = docx_comparison(documents) if 'docx' in args.formats else {}
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"count": args.count, "seed": args.seed, "layouts": args.layouts, "formats": args.formats},
+        "repeat": args.repeat,
+        "elapsed_seconds": time.perf_counter() - started,
+        "benchmarks": benchmarks,
+        "docx": docx,
+    }
+
+    for name, stats in benchmarks.items():
+        print(f"{name:60s} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+              f"p99 {stats['p99_ms']:9.3f} ms  {stats['per_sec']:10.1f}/s")
+    for name, stats in docx.items():
+        chars = "  ".join(f"{key[:-6]} {value} chars" for key, value in stats.items() if key.endswith("_chars"))
+        print(f"{name:60s} {stats['docx_kib']:9.1f} KiB  streaming peak {stats['stream_peak_kib']:7.1f} KiB  {chars}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline.get('commit')}):")
+        print("\n".join(compare(results, baseline, args.threshold)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Query latency and recall of the "more like this" index against an exact scan of every candidate.
+
+    python benchmark_similar.py --candidates 200000
+    python benchmark_similar.py --candidates 200000 --tables 16 --bits 16 --out similar.json
+
+Profiles are synthesised around a few hundred role archetypes, drawing skills from the skill
+dictionary and the rest from the corpus vocabularies, so candidates have genuine neighbours.
+Recall@k is the share of the exact top k that the LSH query also returns.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from benchmark_parser import summarise
+from resume_corpus import CERTIFICATIONS, DEGREES, SCHOOLS, TITLES
+from similar_candidates import SimilarCandidateIndex
+from skill_dictionary import get_skill_dictionary
+
+MAJORS = ('Computer Science', 'Electrical Engineering', 'Statistics', 'Economics', 'Design', 'Physics')
+
+
+def synthetic_profiles(count: int, archetypes: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """Parsed-profile dicts, each a noisy copy of one of `archetypes` random roles, generated lazily"""
+    rng = np.random.RandomState(seed)
+    skills_vocabulary = sorted(get_skill_dictionary().skills)
+    roles = [
+        {
+            "skills": list(rng.choice(skills_vocabulary, rng.randint(4, 11), replace=False)),
+            "title": TITLES[rng.randint(len(TITLES))],
+            "major": MAJORS[rng.randint(len(MAJORS))],
+        }
+        for _ in range(archetypes)
+    ]
+    for role in (roles[number] for number in rng.randint(0, archetypes, size=count)):
+        skills = [skill for skill in role["skills"] if rng.rand() > 0.2]
+        skills += list(rng.choice(skills_vocabulary, rng.randint(0, 4), replace=False))
+        yield {
+            "skills": skills,
+            "positions": [{"position_name": role["title"] if rng.rand() > 0.2 else TITLES[rng.randint(len(TITLES))]}],
+            "education_qualifications": [{
+                "degree_type": DEGREES[rng.randint(len(DEGREES))],
+                "school_name": SCHOOLS[rng.randint(len(SCHOOLS))],
+                "specialization_subjects": role["major"],
+            }],
+            "candidate_courses_and_certifications": list(rng.choice(CERTIFICATIONS, rng.randint(0, 2), replace=False)),
+        }
+
+
+def run_benchmarks(candidates: int, queries: int, k: int, tables: int, bits: int, dimensions: int,
+                   archetypes: int, seed: int) -> Dict[str, Any]:
+    index = SimilarCandidateIndex(None, dimensions=dimensions, tables=tables, bits=bits)
+    start = time.perf_counter()
+    for number, profile in enumerate(synthetic_profiles(candidates, archetypes, seed)):
+        index.add(f"c{number}", profile)
+    elapsed = time.perf_counter() - start
+    results: Dict[str, Any] = {"insert": {"candidates": candidates, "per_sec": candidates / elapsed}}
+
+    rng = np.random.RandomState(seed + 1)
+    ids = [f"c{number}" for number in rng.randint(0, candidates, size=queries)]
+    lsh_samples, exact_samples, recalls = [], [], []
+    for doc_id in ids:
+        start = time.perf_counter()
+        approximate = index.similar(doc_id, k)
+        lsh_samples.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        exact = index.similar(doc_id, k, exact=True)
+        exact_samples.append(time.perf_counter() - start)
+        # Ties at the k-th score make several exact answers equally right
+        cutoff = exact[-1]["score"] if exact else 0.0
+        found = sum(1 for match in approximate if match["score"] >= cutoff)
+        recalls.append(min(found, len(exact)) / len(exact) if exact else 1.0)
+    results["similar"] = summarise(lsh_samples)
+    results["similar_exact"] = summarise(exact_samples)
+    results["recall_at_k"] = {"k": k, "mean": float(np.mean(recalls)), "p10": float(np.percentile(recalls, 10))}
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LSH similarity queries against an exact scan")
+    parser.add_argument("--candidates", type=int, default=100_000, help="profiles in the index")
+    parser.add_argument("--queries", type=int, default=500, help="timed queries")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--tables", type=int, default=12, help="LSH hash tables")
+    parser.add_argument("--bits", type=int, default=14, help="bits per hash table")
+    parser.add_argument("--dimensions", type=int, default=128, help="vector length")
+    parser.add_argument("--archetypes", type=int, default=300, help="roles the profiles are drawn around")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--out", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.candidates, args.queries, args.k, args.tables, args.bits, args.dimensions,
+                             args.archetypes, args.seed)
+    for name in ("similar", "similar_exact"):
+        stats = results[name]
+        print(f"{name:16s} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+              f"p99 {stats['p99_ms']:8.3f} ms  {stats['per_sec']:9.1f}/s")
+    print(f"recall@{args.k:<8d} mean {results['recall_at_k']['mean']:.3f}  p10 {results['recall_at_k']['p10']:.3f}")
+    print(f"inserts          {results['insert']['per_sec']:.0f}/s")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
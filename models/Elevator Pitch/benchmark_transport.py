@@ -0,0 +1,140 @@
+"""
+Per-call overhead of the ways a co-located client can reach /generate-pitch:
+HTTP over TCP loopback, HTTP over a Unix socket, and framed JSON/msgpack over a Unix socket.
+
+    python benchmark_transport.py --calls 5000
+    python benchmark_transport.py --calls 5000 --out transport.json
+
+Starts main.py as a real server on a free port and temporary sockets. Pitches are served
+from the cache after the first call, so the numbers are dominated by transport and framing.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmark_parser import summarise, time_calls
+from framed_transport import FramedClient, msgpack
+from loadtest_pitch import resume_json
+from resume_corpus import generate_corpus
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, http_socket: str, framed_socket: str, timeout: float = 30) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PITCH_ENV": "production",
+        "PITCH_HOST": "127.0.0.1",
+        "PITCH_PORT": str(port),
+        "PITCH_UDS": http_socket,
+        "PITCH_FRAMED_UDS": framed_socket,
+        "PITCH_SERVER_WORKERS": "1",
+        "PITCH_WORKERS": "1",
+        "PITCH_WARMUP": "0",
+        "PITCH_DRAIN_DELAY_SECONDS": "0",
+        "PITCH_CACHE_DB": "",
+        "PITCH_JOB_DB": "",
+        "PITCH_REVISION_DB": "",
+        "PITCH_SEARCH_INDEX_DIR": "",
+        "PITCH_LOG_LEVEL": "warning",
+    }
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=SERVICE_DIR, env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200 and os.path.exists(framed_socket):
+                return server
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not become ready")
+
+
+def http_caller(client: httpx.Client) -> Callable[[Dict[str, Any]], Any]:
+    def call(body: Dict[str, Any]):
+        response = client.post("/generate-pitch", json=body)
+        response.raise_for_status()
+        return response.json()
+    return call
+
+
+def framed_caller(client: FramedClient) -> Callable[[Dict[str, Any]], Any]:
+    def call(body: Dict[str, Any]):
+        reply = client.call("generate-pitch", data=body["data"])
+        if reply["status"] != 200:
+            raise RuntimeError(reply["detail"])
+        return reply["body"]
+    return call
+
+
+def run_benchmarks(port: int, http_socket: str, framed_socket: str, bodies: List[Dict[str, Any]],
+                   repeat: int) -> Dict[str, Any]:
+    inputs = [(body,) for body in bodies]
+    results: Dict[str, Any] = {}
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+        results["http-json/tcp"] = summarise(time_calls(http_caller(client), inputs, repeat))
+    with httpx.Client(transport=httpx.HTTPTransport(uds=http_socket), base_url="http://pitch") as client:
+        results["http-json/unix"] = summarise(time_calls(http_caller(client), inputs, repeat))
+    encodings = ("json", "msgpack") if msgpack is not None else ("json",)
+    for encoding in encodings:
+        client = FramedClient(framed_socket, binary=encoding == "msgpack")
+        try:
+            results[f"framed-{encoding}/unix"] = summarise(time_calls(framed_caller(client), inputs, repeat))
+        finally:
+            client.close()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare TCP/HTTP, Unix/HTTP and framed Unix-socket calls")
+    parser.add_argument("--resumes", type=int, default=20, help="distinct resumes sent in turn")
+    parser.add_argument("--calls", type=int, default=2000, help="timed calls per transport")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--out", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    bodies = [resume_json(document) for document in generate_corpus(args.resumes, args.seed, ('short', 'long'))]
+    repeat = max(1, args.calls // len(bodies))
+    with tempfile.TemporaryDirectory() as directory:
+        http_socket = os.path.join(directory, "http.sock")
+        framed_socket = os.path.join(directory, "framed.sock")
+        port = free_port()
+        server = start_server(port, http_socket, framed_socket)
+        try:
+            benchmarks = run_benchmarks(port, http_socket, framed_socket, bodies, repeat)
+        finally:
+            server.terminate()
+            server.wait()
+
+    baseline = benchmarks["http-json/tcp"]["mean_ms"]
+    for name, stats in benchmarks.items():
+        print(f"{name:20s} mean {stats['mean_ms']:7.3f} ms  p50 {stats['p50_ms']:7.3f} ms  "
+              f"p99 {stats['p99_ms']:7.3f} ms  {stats['per_sec']:9.1f}/s  saved {baseline - stats['mean_ms']:6.3f} ms/call")
+    if msgpack is None:
+        print("msgpack is not installed, so only JSON framing was measured (pip install msgpack)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"calls_per_transport": repeat * len(bodies), "benchmarks": benchmarks}, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+
+@lru_cache(maxsize=4096)
+def _parse_start_date(start_date_str: str) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD start date; cached because strptime dominates bulk pitch generation"""
+    try:
+        return datetime.strptime(start_date_str, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+
+
+def calculate_experience_years(position: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    """Calculate years of experience from start date to present"""
+    start_date_str = position.get('start_date')
+    if not start_date_str:
+        return 0
+
+    try:
+        start_date = _parse_start_date(start_date_str)
+    except TypeError:  # Unhashable value
+        return 0
+    if start_date is None:
+        return 0
+    years = ((now or datetime.now()) - start_date).days / 365.25
+    return round(years, 1)
+
+
+# Marks a field that hasn't been computed yet
+_UNSET = object()
+
+
+class CandidateProfile:
+    """
+    The candidate fields every endpoint works with, read lazily from the parsed resume.
+
+    Fields are computed on first access and stored in slots, so asking for the name never
+    touches education or experience. Call compact() on profiles kept around for ranking:
+    it fills every field and drops the reference to the source resume JSON.
+    """
+
+    __slots__ = (
+        '_result',
+        '_name', '_email',
+        '_degree', '_major', '_school', '_year',
+        '_title', '_company', '_duration', '_description',
+        '_skills', '_certifications',
+    )
+
+    def __init__(self, resume_data: Dict[str, Any]):
+        """Wrap resume JSON in the {"data": {"attributes": {"result": {...}}}} layout"""
+        try:
+            result = resume_data.get('data', {}).get('attributes', {}).get('result', {})
+        except Exception as e:
+            raise ValueError(f"Error processing resume data: {str(e)}")
+        if not isinstance(result, dict):
+            raise ValueError("Error processing resume data: result must be an object")
+        self._reset(result)
+
+    def _reset(self, result: Dict[str, Any]):
+        self._result = result
+        self._name = self._email = _UNSET
+        self._degree = self._major = self._school = self._year = _UNSET
+        self._title = self._company = self._duration = self._description = _UNSET
+        self._skills = self._certifications = _UNSET
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "CandidateProfile":
+        """Wrap the inner result dict produced by the resume parser"""
+        if not isinstance(result, dict):
+            raise ValueError("Error processing resume data: result must be an object")
+        profile = cls.__new__(cls)
+        profile._reset(result)
+        return profile
+
+    def _source(self) -> Dict[str, Any]:
+        if self._result is None:
+            raise ValueError("Candidate profile was compacted and no longer holds resume data")
+        return self._result
+
+    def _load_education(self):
+        try:
+            qualifications = self._source().get('education_qualifications')
+            education = qualifications[0] if qualifications else {}
+            end_date = education.get('end_date')
+            self._degree = education.get('degree_type', '')
+            self._major = education.get('specialization_subjects', '')
+            self._school = education.get('school_name', '')
+            self._year = end_date.split('-')[0] if end_date else ''
+        except Exception as e:
+            raise ValueError(f"Error processing resume data: {str(e)}")
+
+    def _load_experience(self):
+        try:
+            positions = self._source().get('positions', [])
+            current_position = positions[0] if positions else {}
+            self._title = current_position.get('position_name', '')
+            self._company = current_position.get('company_name', '')
+            self._duration = calculate_experience_years(current_position)
+            self._description = current_position.get('job_details', '')
+            # Skills from the current position, else the resume-wide list; top 10 unique, in ranked order
+            skills = current_position.get('skills') or self._source().get('skills') or []
+            self._skills = tuple(dict.fromkeys(skills[:10]))
+        except Exception as e:
+            raise ValueError(f"Error processing resume data: {str(e)}")
+
+    @property
+    def name(self) -> str:
+        value = self._name
+        if value is _UNSET:
+            self._name = self._source().get('candidate_name', '')
+            value = self._name
+        return value
+
+    @property
+    def email(self) -> str:
+        value = self._email
+        if value is _UNSET:
+            self._email = self._source().get('candidate_email', '')
+            value = self._email
+        return value
+
+    @property
+    def degree(self) -> str:
+        value = self._degree
+        if value is _UNSET:
+            self._load_education()
+            value = self._degree
+        return value
+
+    @property
+    def major(self) -> str:
+        value = self._major
+        if value is _UNSET:
+            self._load_education()
+            value = self._major
+        return value
+
+    @property
+    def school(self) -> str:
+        value = self._school
+        if value is _UNSET:
+            self._load_education()
+            value = self._school
+        return value
+
+    @property
+    def year(self) -> str:
+        value = self._year
+        if value is _UNSET:
+            self._load_education()
+            value = self._year
+        return value
+
+    @property
+    def title(self) -> str:
+        value = self._title
+        if value is _UNSET:
+            self._load_experience()
+            value = self._title
+        return value
+
+    @property
+    def company(self) -> str:
+        value = self._company
+        if value is _UNSET:
+            self._load_experience()
+            value = self._company
+        return value
+
+    @property
+    def duration(self) -> float:
+        value = self._duration
+        if value is _UNSET:
+            self._load_experience()
+            value = self._duration
+        return value
+
+    @property
+    def description(self) -> str:
+        value = self._description
+        if value is _UNSET:
+            self._load_experience()
+            value = self._description
+        return value
+
+    @property
+    def skills(self) -> Tuple[str, ...]:
+        value = self._skills
+        if value is _UNSET:
+            self._load_experience()
+            value = self._skills
+        return value
+
+    @property
+    def certifications(self) -> Tuple[str, ...]:
+        value = self._certifications
+        if value is _UNSET:
+            self._certifications = tuple(self._source().get('candidate_courses_and_certifications') or ())
+            value = self._certifications
+        return value
+
+    def compact(self) -> "CandidateProfile":
+        """Compute every field and release the source resume JSON"""
+        # One field from each lazily loaded group fills the whole group
+        for field in ('name', 'email', 'degree', 'title', 'certifications'):
+            getattr(self, field)
+        self._result = None
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Every field as a flat dict, for logging and debugging"""
+        return {field[1:]: getattr(self, field[1:]) for field in self.__slots__[1:]}
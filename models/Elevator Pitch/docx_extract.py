@@ -0,0 +1,101 @@
+"""
+DOCX text extraction that streams the main document part straight out of the zip.
+
+python-docx builds an object tree for the whole document and only exposes top-level
+paragraphs through `Document.paragraphs`, so text laid out in tables was lost. Here
+word/document.xml is decompressed and parsed incrementally, every element is dropped as
+soon as it closes, and paragraphs are emitted in reading order wherever they sit: the
+body, table cells (row by row, nested tables included) and text boxes.
+"""
+import io
+import posixpath
+import zipfile
+from typing import Iterator, List
+from xml.etree.ElementTree import ParseError, XMLPullParser, fromstring
+
+from resume_parser import ResumeParseError
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+PARAGRAPH = W + "p"
+TEXT = W + "t"
+TAB = W + "tab"
+BREAKS = (W + "br", W + "cr")
+# Modern Word writes text boxes twice: as DrawingML in mc:Choice and as VML in mc:Fallback
+FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+OFFICE_DOCUMENT_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+RELATIONSHIP = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+# Decompressed bytes fed to the parser at a time; the elements one chunk produces are
+# what bounds memory, so this stays small
+READ_CHUNK_BYTES = 16 * 1024
+
+
+def main_document_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, from the package relationships when they say otherwise"""
+    try:
+        relationships = fromstring(archive.read("_rels/.rels"))
+    except (KeyError, ParseError):
+        return DEFAULT_DOCUMENT_PART
+    for relationship in relationships.iter(RELATIONSHIP):
+        if relationship.get("Type") == OFFICE_DOCUMENT_TYPE:
+            return posixpath.normpath(relationship.get("Target", DEFAULT_DOCUMENT_PART).lstrip("/"))
+    return DEFAULT_DOCUMENT_PART
+
+
+def iter_docx_paragraphs(stream) -> Iterator[str]:
+    """
+    Text of every paragraph in a WordprocessingML stream, in document order.
+    Only open elements are kept, so memory stays flat however long the document is.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    open_elements: List = []
+    # One buffer per open paragraph; a text box paragraph closes inside the one anchoring it
+    paragraphs: List[List[str]] = []
+    skipping = 0
+
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+        for event, element in parser.read_events():
+            tag = element.tag
+            if event == "start":
+                open_elements.append(element)
+                if tag == FALLBACK:
+                    skipping += 1
+                elif tag == PARAGRAPH and not skipping:
+                    paragraphs.append([])
+                continue
+
+            open_elements.pop()
+            if tag == FALLBACK:
+                skipping -= 1
+            elif skipping or not paragraphs:
+                pass
+            elif tag == TEXT:
+                paragraphs[-1].append(element.text or "")
+            elif tag == TAB:
+                paragraphs[-1].append("\t")
+            elif tag in BREAKS:
+                paragraphs[-1].append("\n")
+            elif tag == PARAGRAPH:
+                yield "".join(paragraphs.pop())
+            # Detach closed elements so the tree never grows past the current path
+            if open_elements:
+                open_elements[-1].remove(element)
+        if not chunk:
+            return
+
+
+def extract_docx_text(content: bytes) -> str:
+    """Non-blank paragraph text of DOCX bytes, one paragraph per line"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            with archive.open(main_document_part(archive)) as stream:
+                return "\n".join(text for text in iter_docx_paragraphs(stream) if text.strip())
+    except Exception as e:
+        raise ResumeParseError(f"Error processing DOCX file: {str(e)}", status_code=500)
@@ -0,0 +1,180 @@
+"""
+Length-prefixed request/response framing over a Unix domain socket, for callers on the
+same host that want to skip HTTP entirely.
+
+Every frame is a 4-byte big-endian payload length followed by the payload. A payload is a
+msgpack map, or a JSON object when it starts with "{"; each reply uses the request's encoding.
+
+    request:  {"id": 7, "op": "generate-pitch", "data": {...resume JSON...}, "style": "60s-formal"}
+    reply:    {"id": 7, "status": 200, "body": {"success": true, "pitch": "...", "word_count": 96}}
+    error:    {"id": 7, "status": 400, "detail": "Unknown pitch style ..."}
+
+Frames on one connection are answered in order, so clients may pipeline requests.
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from service_logging import logger
+
+try:
+    import msgpack
+except ImportError:  # JSON framing still works without it
+    msgpack = None
+
+HEADER = struct.Struct(">I")
+
+# An op handler takes the request map and returns (status, body or error detail)
+FramedHandler = Callable[[Dict[str, Any]], Awaitable[Tuple[int, Any]]]
+
+
+class FrameError(Exception):
+    """Raised for a frame that can't be decoded, carrying the status to reply with"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def encode_payload(message: Dict[str, Any], binary: bool) -> bytes:
+    if binary:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+
+def decode_payload(payload: bytes) -> Tuple[Dict[str, Any], bool]:
+    """The request map and whether it was msgpack-encoded"""
+    binary = not payload.startswith(b"{")
+    if binary and msgpack is None:
+        raise FrameError(
+            "msgpack is required for binary frames. Please install it with: pip install msgpack, or send JSON",
+            status_code=415
+        )
+    try:
+        message = msgpack.unpackb(payload, raw=False) if binary else json.loads(payload)
+    except Exception as e:
+        raise FrameError(f"Invalid frame payload: {str(e)}")
+    if not isinstance(message, dict):
+        raise FrameError("Frame payload must be a map")
+    return message, binary
+
+
+def frame(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload)) + payload
+
+
+def bind_unix_socket(path: str) -> socket.socket:
+    """
+    Listening Unix socket at path. A socket file left by a crashed process is replaced,
+    but one that still accepts connections raises OSError, as a busy TCP port would.
+    """
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError(f"{path} is already being served")
+        finally:
+            probe.close()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    os.chmod(path, 0o660)
+    sock.listen(2048)
+    return sock
+
+
+class FramedServer:
+    """Serves FramedHandlers by op name on a Unix socket, inside the running event loop"""
+
+    def __init__(self, handlers: Dict[str, FramedHandler], max_frame_bytes: int):
+        self.handlers = handlers
+        self.max_frame_bytes = max_frame_bytes
+        self.path: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, path: str):
+        self._server = await asyncio.start_unix_server(self._serve_connection, sock=bind_unix_socket(path))
+        self.path = path
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if self.path and os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = self.handlers.get(request.get("op"))
+        if handler is None:
+            return {"status": 404, "detail": f"Unknown op {request.get('op')!r}, choose one of: {', '.join(self.handlers)}"}
+        status, body = await handler(request)
+        return {"status": status, "body": body} if status < 400 else {"status": status, "detail": body}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = HEADER.unpack(header)
+                if length > self.max_frame_bytes:
+                    # The stream can't be resynchronised without reading the oversized frame, so close it
+                    writer.write(frame(encode_payload({"status": 413, "detail": "Frame too large"}, False)))
+                    break
+                payload = await reader.readexactly(length)
+                binary = False
+                try:
+                    request, binary = decode_payload(payload)
+                    reply = await self._reply(request)
+                    reply["id"] = request.get("id")
+                except FrameError as e:
+                    reply = {"status": e.status_code, "detail": e.detail}
+                except Exception as e:
+                    logger.exception("Framed request failed")
+                    reply = {"status": 500, "detail": str(e)}
+                writer.write(frame(encode_payload(reply, binary)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class FramedClient:
+    """Blocking client for the framed socket, for scripts and benchmarks"""
+
+    def __init__(self, path: str, binary: bool = True):
+        if binary and msgpack is None:
+            raise ImportError("msgpack is required for binary frames. Please install it with: pip install msgpack")
+        self.binary = binary
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._next_id = 0
+
+    def call(self, op: str, **fields: Any) -> Dict[str, Any]:
+        self._next_id += 1
+        self._sock.sendall(frame(encode_payload({"id": self._next_id, "op": op, **fields}, self.binary)))
+        (length,) = HEADER.unpack(self._read(HEADER.size))
+        reply, _ = decode_payload(self._read(length))
+        return reply
+
+    def _read(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self._sock.recv(size)
+            if not chunk:
+                raise ConnectionError("Framed socket closed")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        self._sock.close()
@@ -0,0 +1,235 @@
+"""
+In-process load test for the pitch service: drives main.app through httpx's ASGI transport,
+so no server or network is involved, while worker-pool jobs still run in real processes.
+
+    python loadtest_pitch.py --concurrency 16 --requests 2000
+    python loadtest_pitch.py --duration 30 --mix generate-pitch=6,parse-resume=4 --rss --out load.json
+
+The cache is disabled by default so every request does real work; pass --cache to measure hit paths.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmark_parser import percentile
+from resume_corpus import ResumeDocument, generate_corpus
+from resume_parser import build_structured_data
+
+ENDPOINTS = ('generate-pitch', 'generate-pitch-from-text', 'generate-pitch-from-file', 'parse-resume')
+DEFAULT_MIX = "generate-pitch=4,generate-pitch-from-text=2,generate-pitch-from-file=2,parse-resume=2"
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Turn "generate-pitch=4,parse-resume=1" into endpoint weights"""
+    weights = {}
+    for part in mix.split(","):
+        endpoint, _, weight = part.strip().partition("=")
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {endpoint!r} in --mix, choose from: {', '.join(ENDPOINTS)}")
+        weights[endpoint] = float(weight or 1)
+    return weights
+
+
+def resume_json(document: ResumeDocument) -> Dict[str, Any]:
+    """The /generate-pitch request body for a corpus resume"""
+    return {"data": build_structured_data(document.text)}
+
+
+def build_payloads(documents: List[ResumeDocument], file_formats: Tuple[str, ...]) -> Dict[str, List[Dict[str, Any]]]:
+    """Pre-rendered request arguments per endpoint, so the client spends its time waiting on the app"""
+    uploads = [(document.filename(fmt), document.render(fmt)) for document in documents for fmt in file_formats]
+    return {
+        'generate-pitch': [{"json": resume_json(document)} for document in documents],
+        'generate-pitch-from-text': [{"json": {"text": document.text}} for document in documents],
+        # This endpoint only understands JSON or plain text bodies
+        'generate-pitch-from-file': [{"files": {"file": (document.filename('txt'), document.render('txt'))}}
+                                     for document in documents],
+        'parse-resume': [{"files": {"file": upload}} for upload in uploads],
+    }
+
+
+def read_rss_bytes(pid: int) -> int:
+    """Resident set size of a process, via psutil when installed and /proc otherwise"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[int, int] = {}
+
+    def record(self, seconds: float, status_code: int):
+        self.latencies.append(seconds)
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        if status_code >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "error_rate": self.errors / len(ordered) if ordered else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+            "throughput_per_sec": len(ordered) / elapsed if elapsed else 0.0,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+        }
+
+
+async def run_load(
+    app,
+    payloads: Dict[str, List[Dict[str, Any]]],
+    weights: Dict[str, float],
+    concurrency: int,
+    requests: Optional[int],
+    duration: Optional[float],
+    seed: int,
+    rss_pids: Optional[Callable[[], List[int]]] = None,
+    rss_interval: float = 0.5
+) -> Dict[str, Any]:
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("httpx is required for the load test. Please install it with: pip install httpx")
+
+    rng = random.Random(seed)
+    endpoints = list(weights)
+    cumulative = list(weights.values())
+    stats = {endpoint: EndpointStats() for endpoint in endpoints}
+    rss_samples: List[Dict[str, Any]] = []
+    issued = 0
+    deadline = time.monotonic() + duration if duration else None
+
+    def next_request() -> Optional[Tuple[str, Dict[str, Any]]]:
+        nonlocal issued
+        if requests is not None and issued >= requests:
+            return None
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        issued += 1
+        endpoint = rng.choices(endpoints, cumulative)[0]
+        return endpoint, rng.choice(payloads[endpoint])
+
+    async def client_loop(client):
+        clock = time.perf_counter
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            endpoint, kwargs = request
+            start = clock()
+            try:
+                response = await client.post(f"/{endpoint}", **kwargs)
+                status_code = response.status_code
+            except Exception:
+                status_code = 599
+            stats[endpoint].record(clock() - start, status_code)
+
+    async def sample_rss():
+        while True:
+            pids = [os.getpid()] + rss_pids()
+            rss_samples.append({"t": time.perf_counter() - started,
+                                "rss_bytes": {str(pid): read_rss_bytes(pid) for pid in pids}})
+            await asyncio.sleep(rss_interval)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        started = time.perf_counter()
+        sampler = asyncio.ensure_future(sample_rss()) if rss_pids else None
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        if sampler is not None:
+            sampler.cancel()
+
+    total = EndpointStats()
+    for endpoint_stats in stats.values():
+        for seconds in endpoint_stats.latencies:
+            total.latencies.append(seconds)
+        for code, count in endpoint_stats.status_codes.items():
+            total.status_codes[code] = total.status_codes.get(code, 0) + count
+        total.errors += endpoint_stats.errors
+
+    report: Dict[str, Any] = {
+        "elapsed_seconds": elapsed,
+        "total": total.summary(elapsed),
+        "endpoints": {endpoint: endpoint_stats.summary(elapsed) for endpoint, endpoint_stats in stats.items()},
+    }
+    if rss_pids:
+        peaks: Dict[str, int] = {}
+        for sample in rss_samples:
+            for pid, rss in sample["rss_bytes"].items():
+                peaks[pid] = max(peaks.get(pid, 0), rss)
+        report["rss"] = {"peak_bytes": peaks, "peak_total_bytes": sum(peaks.values()), "samples": rss_samples}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="In-process load test for the pitch service")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, help="total requests to send (default 1000 unless --duration)")
+    parser.add_argument("--duration", type=float, help="seconds to run instead of a request count")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. generate-pitch=4,parse-resume=1")
+    parser.add_argument("--formats", nargs="+", choices=('txt', 'docx', 'pdf'), default=['txt', 'docx', 'pdf'],
+                        help="file types uploaded to /parse-resume")
+    parser.add_argument("--corpus", type=int, default=25, help="distinct resumes per corpus layout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the service cache enabled")
+    parser.add_argument("--rss", action="store_true", help="sample RSS of this process and the pool workers")
+    parser.add_argument("--out", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if not args.cache:
+        # Must be set before main is imported, since the cache is built at import time
+        os.environ["PITCH_CACHE_SIZE"] = "0"
+        os.environ["PITCH_CACHE_DB"] = ""
+    import main as service
+
+    weights = parse_mix(args.mix)
+    requests = args.requests if args.requests is not None or args.duration else 1000
+    payloads = build_payloads(generate_corpus(args.corpus, args.seed), tuple(args.formats))
+    try:
+        report = asyncio.run(run_load(
+            service.app, payloads, weights, args.concurrency, requests, args.duration, args.seed,
+            rss_pids=(lambda: service.pool.pids) if args.rss else None
+        ))
+    finally:
+        service.pool.shutdown()
+        service.cache.close()
+
+    report["config"] = {key: value for key, value in vars(args).items() if key != "out"}
+    report["config"]["pool_workers"] = service.pool.workers
+    for endpoint, summary in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        print(f"{endpoint:26s} {summary['requests']:7d} req  {summary['throughput_per_sec']:8.1f}/s  "
+              f"p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  p99 {summary['p99_ms']:8.2f} ms  "
+              f"errors {summary['error_rate']:.1%}")
+    if "rss" in report:
+        print(f"Peak RSS: {report['rss']['peak_total_bytes'] / 2 ** 20:.1f} MiB across "
+              f"{len(report['rss']['peak_bytes'])} processes")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
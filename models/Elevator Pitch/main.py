@@ -1,22 +1,95 @@
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from starlette.datastructures import UploadFile as FormFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from typing import Callable, Dict, Any, Optional, List
+import asyncio
+import hashlib
+import itertools
 import json
 import uvicorn
 import os
-import traceback
+from candidate_profile import CandidateProfile
 from resume_pitch_generator import ResumePitchGenerator
-import re
+from pitch_templates import DEFAULT_STYLE, PITCH_STYLES
+from resume_parser import (
+    ResumeParseError, SUPPORTED_RESUME_EXTENSIONS, parse_resume_timed, parse_resume_batch_item, iter_zip_resumes,
+    generate_pitch_from_content_timed, fingerprint_resume, parse_resume_text_timed, reparse_resume_timed
+)
+from metrics import ERRORS_TOTAL, STAGE_SECONDS, UPLOADS_TOTAL, observe_stages, registry
+from service_lifecycle import (
+    ReadinessState, drain_on_sigterm, production_server_options, run_server, wait_for_drain, warm_up_parsers,
+    warm_up_worker
+)
+from service_logging import PER_REQUEST, logger
+from resume_cache import create_cache_from_env, create_revision_store_from_env, digest_key, json_key
+from upload_reader import (
+    IngestedUpload, UploadRejected, UploadSizeMiddleware, read_upload, check_magic_bytes, file_too_large,
+    max_upload_bytes_from_env, MAGIC_PREFIX_LENGTH
+)
+from worker_pool import PoolSaturatedError, create_pool_from_env
+from skill_matcher import create_match_engine_from_env
+from resume_search import create_search_index_from_env, search_fields
+from near_duplicates import create_dedupe_index_from_env
+from pitch_jobs import JobQueueFull, create_job_manager_from_env, public_job
+from framed_transport import FramedServer
+from single_flight import SingleFlight
+from admission import AdmissionMiddleware, create_lanes_from_env
+from resume_export import create_export_from_env
+from similar_candidates import create_similar_index_from_env
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long the body took to serialise"""
+
+    def render(self, content: Any) -> bytes:
+        with STAGE_SECONDS.time("response_serialisation"):
+            return super().render(content)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Resume Pitch Generator API",
     description="API for generating elevator pitches from resume data",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse
 )
 
-# CORS middleware to allow requests from your React frontend
+# Worker processes for PDF/DOCX extraction and pitch work, so it never runs on the event loop
+pool = create_pool_from_env()
+
+# Admission control: uploads parsed in the pool and cheap JSON calls queue in separate lanes,
+# so a burst of PDFs can't starve /generate-pitch; a full lane answers 503 with Retry-After
+HEAVY_ROUTES = {"/parse-resume", "/parse-resume/batch", "/generate-pitch-from-file"}
+LIGHT_ROUTE_PREFIXES = ("/generate-pitch", "/match", "/search", "/similar")
+admission_lanes = create_lanes_from_env(pool.workers)
+
+def admission_lane(method: str, path: str) -> Optional[str]:
+    # Health, readiness, metrics and /jobs (bounded by its own queue) are never held back
+    if path in HEAVY_ROUTES:
+        return "heavy"
+    if path.startswith(LIGHT_ROUTE_PREFIXES):
+        return "light"
+    return None
+
+app.add_middleware(AdmissionMiddleware, lanes=admission_lanes, classify=admission_lane)
+
+# Largest single upload, and largest /parse-resume/batch request (zip or multipart)
+MAX_UPLOAD_BYTES = max_upload_bytes_from_env()
+MAX_BATCH_UPLOAD_BYTES = max_upload_bytes_from_env("PITCH_MAX_BATCH_UPLOAD_MB", 1024)
+# Files in one multipart /parse-resume/batch request; each is spooled to a temporary file before parsing
+MAX_BATCH_FILES = int(os.getenv("PITCH_MAX_BATCH_FILES", "1000"))
+
+# Oversized bodies are refused before Starlette spools them, and before they take an admission slot
+app.add_middleware(UploadSizeMiddleware, limits={
+    "/parse-resume": MAX_UPLOAD_BYTES,
+    "/generate-pitch-from-file": MAX_UPLOAD_BYTES,
+    "/jobs": MAX_UPLOAD_BYTES,
+    "/parse-resume/batch": MAX_BATCH_UPLOAD_BYTES,
+})
+
+# CORS middleware to allow requests from your React frontend; added last so it wraps 503s from admission
+# and 413s from the size check too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:8080", "http://127.0.0.1:3000", "http://127.0.0.1:8080"],  # Add your frontend URLs
@@ -25,6 +98,372 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Parsed resumes and pitches keyed by a hash of the upload (or canonical JSON)
+cache = create_cache_from_env()
+
+# Each candidate's latest revision for diff=true uploads, kept apart from the cache so eviction can't lose it
+revisions = create_revision_store_from_env()
+
+# Skill-incidence matrices of candidates and jobs for /match, journaled to disk; parsed resumes are added as candidates
+matcher = create_match_engine_from_env()
+
+# BM25 full-text index over parsed resumes for /search, persisted as memory-mapped segments
+search_index = create_search_index_from_env()
+
+# Hashed TF-IDF vectors of parsed profiles in an LSH index, for "more like this" on /similar
+similar_index = create_similar_index_from_env()
+registry.gauge("pitch_similar_candidates", "Candidates in the similarity index", lambda: len(similar_index))
+
+# Every parsed result as a row of a partitioned Parquet dataset, for analytics (None when disabled)
+resume_export = create_export_from_env()
+registry.gauge(
+    "pitch_export_buffered_rows", "Parsed resumes journaled but not yet written to a Parquet part",
+    lambda: resume_export.buffered if resume_export is not None else 0
+)
+export_flush_task: Optional[asyncio.Task] = None
+
+# MinHash/LSH index of recent uploads, so near-identical resumes reuse an earlier parse
+dedupe_index = create_dedupe_index_from_env()
+NEAR_DUPLICATES_TOTAL = registry.counter(
+    "pitch_near_duplicates_total", "Uploads matching an earlier resume, by whether its parse was reused", ("outcome",)
+)
+
+# Identical requests arriving while one is being computed wait for it instead of repeating it
+in_flight = SingleFlight()
+COALESCED_TOTAL = registry.counter(
+    "pitch_coalesced_requests_total", "Requests served by an identical computation already in flight", ("operation",)
+)
+registry.gauge("pitch_single_flight_keys", "Distinct computations in flight", lambda: len(in_flight))
+
+# Diff-mode uploads: extractors and pitches reused from the candidate's previous revision
+DIFF_REUSE_TOTAL = registry.counter(
+    "pitch_diff_reuse_total", "Fields and pitches of diff-mode uploads, by whether they were recomputed",
+    ("part", "outcome")
+)
+
+
+# /ready stays red until warm-up finishes and turns red again while draining on shutdown
+readiness = ReadinessState()
+WARMUP_ENABLED = os.getenv("PITCH_WARMUP", "1") != "0"
+DRAIN_SECONDS = float(os.getenv("PITCH_DRAIN_SECONDS", "30"))
+# Seconds /ready stays red after SIGTERM while the listener still accepts requests
+DRAIN_DELAY_SECONDS = float(os.getenv("PITCH_DRAIN_DELAY_SECONDS", "5"))
+warmup_task: Optional[asyncio.Task] = None
+
+def parse_cache_key(filename: str, sha256: str) -> str:
+    # The extension decides how the bytes are parsed, so it is part of the key
+    return digest_key("parse" + os.path.splitext(filename)[1], sha256)
+
+def count_upload(filename: str):
+    UPLOADS_TOTAL.inc(os.path.splitext(filename)[1].lower() or "none")
+
+def count_error(exc: Exception):
+    ERRORS_TOTAL.inc(type(exc).__name__)
+
+async def read_upload_timed(file: UploadFile, max_bytes: int, allowed_extensions=None) -> IngestedUpload:
+    with STAGE_SECONDS.time("upload_read"):
+        upload = await read_upload(file, max_bytes, allowed_extensions)
+    count_upload(upload.filename)
+    return upload
+
+def set_cache_headers(response: Response, tier: Optional[str]):
+    response.headers["X-Cache"] = "HIT" if tier else "MISS"
+    if tier:
+        response.headers["X-Cache-Tier"] = tier
+
+def parsed_result(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The extracted fields inside a /parse-resume response body"""
+    result = (body.get("data") or {}).get("data", {}).get("attributes", {}).get("result")
+    return result if isinstance(result, dict) else None
+
+async def index_parsed_resume(doc_id: str, filename: str, body: Dict[str, Any], text: Optional[str] = None):
+    result = parsed_result(body)
+    if result is None:
+        return
+    meta = {"filename": filename, "candidate_name": result.get("candidate_name", "")}
+    try:
+        # Journal writes and the occasional compaction stay off the event loop
+        await asyncio.to_thread(search_index.add, doc_id, search_fields(result, text), meta)
+    except Exception as e:
+        logger.warning("Could not index %s for search: %s", filename, e)
+    try:
+        await asyncio.to_thread(similar_index.add, doc_id, result, meta)
+    except Exception as e:
+        logger.warning("Could not index %s for similar candidates: %s", filename, e)
+    skills = result.get("skills")
+    try:
+        await asyncio.to_thread(
+            matcher.upsert, "candidates", doc_id, [skill for skill in skills or () if isinstance(skill, str)]
+        )
+    except Exception as e:
+        logger.warning("Could not index %s for matching: %s", filename, e)
+    await export_parsed_resume(doc_id, filename, result)
+
+async def export_parsed_resume(doc_id: str, filename: str, result: Dict[str, Any]):
+    if resume_export is None:
+        return
+    try:
+        # Every flush_rows appends one write a Parquet part, so this stays off the event loop too
+        await asyncio.to_thread(resume_export.append, doc_id, filename, result)
+    except Exception as e:
+        logger.warning("Could not export %s: %s", filename, e)
+
+async def flush_export_periodically():
+    # Buffered rows reach a part file within flush_seconds even when uploads stop
+    while True:
+        await asyncio.sleep(resume_export.flush_seconds)
+        try:
+            await asyncio.to_thread(resume_export.flush_if_due)
+        except Exception as e:
+            logger.warning("Could not flush the resume export: %s", e)
+
+async def reuse_near_duplicate(signature, owner: str, matches) -> Optional[Dict[str, Any]]:
+    """
+    The cached parse of the most similar earlier upload with the same owner. Resumes built
+    from a shared template look alike but belong to other people, so those are only flagged.
+    """
+    for doc_id, similarity, meta in matches:
+        if not owner or meta.get("owner") != owner:
+            continue
+        earlier, _ = await cache.get_async(parse_cache_key(meta["filename"], doc_id))
+        if earlier is not None:
+            NEAR_DUPLICATES_TOTAL.inc("reused")
+            return {**earlier, "near_duplicate": {"of": doc_id, "similarity": similarity, "reused": True}}
+    return None
+
+def no_progress(stage: str):
+    pass
+
+async def parse_upload(
+    upload: IngestedUpload, progress: Callable[[str], None] = no_progress, block: bool = False
+):
+    """
+    Parse an upload in the worker pool: returns (response body, stage timings, extracted text).
+    Text uploads are fingerprinted first and reuse the parse of a near-duplicate when there is one.
+    progress is called with each stage as it starts; block waits for a worker instead of failing.
+    """
+    if dedupe_index is None or upload.filename.endswith('.json'):
+        progress("parsing")
+        return await pool.run(parse_resume_timed, upload.filename, upload.content, block=block)
+
+    progress("text_extraction")
+    text, signature, owner, timings = await pool.run(fingerprint_resume, upload.filename, upload.content, block=block)
+    matches = dedupe_index.query(signature)
+    result = await reuse_near_duplicate(signature, owner, matches)
+    if result is None:
+        progress("field_extraction")
+        result, parse_timings = await pool.run(parse_resume_text_timed, text, block=block)
+        timings.update(parse_timings)
+        if matches:
+            NEAR_DUPLICATES_TOTAL.inc("flagged")
+            doc_id, similarity, _ = matches[0]
+            result["near_duplicate"] = {"of": doc_id, "similarity": similarity, "reused": False}
+    dedupe_index.add(upload.sha256, signature, {"filename": upload.filename, "owner": owner})
+    return result, timings, text
+
+async def coalesced(operation: str, key: str, fn: Callable[[], Any]):
+    result, shared = await in_flight.do(key, fn)
+    if shared:
+        COALESCED_TOTAL.inc(operation)
+    return result
+
+async def parse_and_cache(
+    upload: IngestedUpload, cache_key: str, progress: Callable[[str], None] = no_progress, block: bool = False
+):
+    """
+    parse_upload once for any number of concurrent requests with the same bytes; the result
+    is cached and its timings recorded once. Returns (response body, extracted text).
+    """
+    async def parse():
+        result, timings, text = await parse_upload(upload, progress, block)
+        observe_stages(timings)
+        await cache.set_async(cache_key, result)
+        return result, text
+    # Blocking callers (jobs) don't share with rejecting ones, so a 503 never fails a queued job
+    return await coalesced("parse-resume", f"{cache_key}:{block}", parse)
+
+async def pitch_file_and_cache(content: bytes, style: str, cache_key: str, block: bool = False) -> Dict[str, Any]:
+    """generate_pitch_from_content once for concurrent requests with the same bytes and style"""
+    async def generate():
+        result, timings = await pool.run(generate_pitch_from_content_timed, content, style, block=block)
+        observe_stages(timings)
+        await cache.set_async(cache_key, result)
+        return result
+    return await coalesced("generate-pitch-from-file", f"{cache_key}:{block}", generate)
+
+async def parse_revision(upload: IngestedUpload, candidate_id: str):
+    """
+    Parse an upload as the next revision of a candidate's resume, reusing what the
+    previous revision extracted wherever its input lines are unchanged.
+    Returns (response body, changes, extracted text); repeated uploads of the same revision
+    while it is being parsed share one parse.
+    """
+    # Uploads of the same revision while it is being parsed share one parse
+    revision_key = digest_key("revision", hashlib.sha256(candidate_id.encode('utf-8')).hexdigest())
+
+    async def reparse():
+        previous = await asyncio.to_thread(revisions.get, candidate_id)
+        body, changes, revision, timings, text = await pool.run(
+            reparse_resume_timed, upload.filename, upload.content, previous
+        )
+        observe_stages(timings)
+        reparsed = len(changes["reparsed_fields"])
+        DIFF_REUSE_TOTAL.inc("field", "reparsed", amount=reparsed)
+        DIFF_REUSE_TOTAL.inc("field", "reused", amount=len(revision["result"]) - reparsed)
+        DIFF_REUSE_TOTAL.inc("pitch", "regenerated" if changes["pitch_changed"] else "reused")
+        await asyncio.to_thread(revisions.set, candidate_id, {**revision, "sha256": upload.sha256})
+        await cache.set_async(parse_cache_key(upload.filename, upload.sha256), body)
+        changes = {
+            "previous": previous.get("sha256") if previous else None,
+            # Without a stored revision every field is reported as changed
+            "baseline": "previous" if previous else "missing",
+            **changes
+        }
+        return body, changes, text
+    return await coalesced("parse-resume-diff", f"{revision_key}:{upload.sha256}", reparse)
+
+async def run_parse_job(job: Dict[str, Any], content: bytes, progress: Callable[[str], None]) -> Dict[str, Any]:
+    """/parse-resume as a job: the same cache, near-duplicate check and search indexing"""
+    upload = IngestedUpload(job["filename"], content, hashlib.sha256(content).hexdigest())
+    doc_id = job["params"].get("candidate_id") or upload.sha256
+    cache_key = parse_cache_key(upload.filename, upload.sha256)
+    cached, _ = await cache.get_async(cache_key)
+    if cached is not None:
+        if doc_id not in search_index:
+            await index_parsed_resume(doc_id, upload.filename, cached)
+        return cached
+    try:
+        result, text = await parse_and_cache(upload, cache_key, progress, block=True)
+    except ResumeParseError as e:
+        count_error(e)
+        raise
+    progress("indexing")
+    await index_parsed_resume(doc_id, upload.filename, result, text)
+    return result
+
+async def run_pitch_job(job: Dict[str, Any], content: bytes, progress: Callable[[str], None]) -> Dict[str, Any]:
+    """/generate-pitch-from-file as a job"""
+    style = job["params"].get("style", DEFAULT_STYLE)
+    cache_key = digest_key(f"pitch-file:{style}", hashlib.sha256(content).hexdigest())
+    cached, _ = await cache.get_async(cache_key)
+    if cached is None:
+        progress("pitch_generation")
+        cached = await pitch_file_and_cache(content, style, cache_key, block=True)
+    return {**cached, "filename": job["filename"]}
+
+# Jobs for POST /jobs, persisted in SQLite and run a few at a time on the worker pool
+jobs = create_job_manager_from_env({"parse-resume": run_parse_job, "generate-pitch": run_pitch_job}, pool.workers)
+registry.gauge("pitch_jobs_queued", "Jobs waiting for a runner", lambda: jobs.queued)
+registry.gauge("pitch_jobs_running", "Jobs being run", lambda: jobs.running)
+
+async def pitch_for_resume(data: Dict[str, Any], style: str):
+    """The /generate-pitch body for resume JSON and the cache tier it came from, None when generated"""
+    cache_key = json_key(f"pitch:{style}", data)
+    cached, tier = await cache.get_async(cache_key)
+    if cached is not None:
+        return cached, tier
+    
+    # Initialize the generator with the candidate profile
+    with STAGE_SECONDS.time("pitch_generation"):
+        generator = ResumePitchGenerator(CandidateProfile(data))
+        pitch = generator.generate_pitch(style)
+    
+    result = {
+        "success": True,
+        "pitch": pitch,
+        "word_count": len(pitch.split()) if pitch else 0
+    }
+    await cache.set_async(cache_key, result)
+    return result, None
+
+async def framed_generate_pitch(request: Dict[str, Any]):
+    """/generate-pitch over the framed socket: {"data": {...}, "style": "..."}"""
+    style = request.get("style") or DEFAULT_STYLE
+    if style not in PITCH_STYLES:
+        return 400, f"Unknown pitch style '{style}'. Choose one of: {', '.join(PITCH_STYLES)}"
+    if not isinstance(request.get("data"), dict):
+        return 400, "data must be the resume JSON object"
+    try:
+        result, _ = await pitch_for_resume(request["data"], style)
+    except Exception as e:
+        count_error(e)
+        return 500, f"Error generating pitch: {str(e)}"
+    return 200, result
+
+# Length-prefixed msgpack/JSON frames on a Unix socket, for the co-located Node backend
+FRAMED_SOCKET_PATH = os.getenv("PITCH_FRAMED_UDS", "")
+framed_server = FramedServer({"generate-pitch": framed_generate_pitch}, MAX_UPLOAD_BYTES)
+
+def validate_style(style: str):
+    if style not in PITCH_STYLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown pitch style '{style}'. Choose one of: {', '.join(PITCH_STYLES)}"
+        )
+
+registry.gauge(
+    "pitch_admission_in_flight", "Requests admitted and running, by lane",
+    lambda: {(name,): lane.active for name, lane in admission_lanes.items()}, ("lane",)
+)
+registry.gauge(
+    "pitch_admission_queue_depth", "Requests waiting for admission, by lane",
+    lambda: {(name,): lane.waiting for name, lane in admission_lanes.items()}, ("lane",)
+)
+registry.gauge("pitch_pool_in_flight", "Jobs running or queued in the worker pool", lambda: pool.in_flight)
+registry.gauge("pitch_cache_memory_hits", "Cache hits served from memory", lambda: cache.stats["memory_hits"])
+registry.gauge("pitch_cache_disk_hits", "Cache hits served from the SQLite cache", lambda: cache.stats["disk_hits"])
+registry.gauge("pitch_cache_misses", "Cache lookups that missed both tiers", lambda: cache.stats["misses"])
+
+async def warm_up_service():
+    # Warm this process first so forked workers inherit the imports, then start every worker
+    seconds = await asyncio.to_thread(warm_up_parsers)
+    await pool.warm_up(warm_up_worker)
+    readiness.warmup_seconds = round(seconds, 3)
+    readiness.warmed_up = True
+    logger.info("Warm-up finished in %.2fs with %d workers", seconds, pool.workers)
+
+@app.on_event("startup")
+async def start_warm_up():
+    global warmup_task, export_flush_task
+    drain_on_sigterm(readiness, pool, DRAIN_DELAY_SECONDS, DRAIN_SECONDS)
+    jobs.start()
+    if resume_export is not None:
+        export_flush_task = asyncio.ensure_future(flush_export_periodically())
+    if FRAMED_SOCKET_PATH:
+        try:
+            await framed_server.start(FRAMED_SOCKET_PATH)
+        except OSError as e:
+            # With several server workers the first to bind serves the socket
+            logger.info("Framed socket not started in this worker: %s", e)
+    if not WARMUP_ENABLED:
+        readiness.warmed_up = True
+        return
+    # Runs in the background so /health answers while /ready is still red
+    warmup_task = asyncio.ensure_future(warm_up_service())
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    readiness.draining = True
+    if warmup_task is not None:
+        warmup_task.cancel()
+    # Unfinished jobs stay in the database and are picked up again on the next start
+    await framed_server.close()
+    await jobs.stop(DRAIN_SECONDS)
+    await asyncio.to_thread(jobs.store.close)
+    if not await wait_for_drain(pool, DRAIN_SECONDS):
+        logger.warning("Shutting down with %d jobs still in the worker pool", pool.in_flight)
+    pool.shutdown()
+    cache.close()
+    revisions.close()
+    # Write the delta out as a segment so the next start only maps files, and release the directory
+    await asyncio.to_thread(search_index.close)
+    await asyncio.to_thread(similar_index.compact)
+    await asyncio.to_thread(matcher.compact)
+    if export_flush_task is not None:
+        export_flush_task.cancel()
+    if resume_export is not None:
+        await asyncio.to_thread(resume_export.close)
+
 class ResumeData(BaseModel):
     data: Dict[str, Any]
 
@@ -44,6 +483,28 @@ class Position(BaseModel):
     job_details: str = ""
     skills: List[str] = []
 
+class SkillProfile(BaseModel):
+    id: str
+    skills: List[str] = []
+
+class SkillProfiles(BaseModel):
+    items: List[SkillProfile]
+
+class MatchRequest(BaseModel):
+    # "jobs" ranks jobs for a candidate, "candidates" ranks candidates for a job
+    target: str
+    candidate_id: Optional[str] = None
+    job_id: Optional[str] = None
+    skills: Optional[List[str]] = None
+    k: int = 10
+
+def match_matrix(kind: str):
+    if kind == "candidates":
+        return matcher.candidates
+    if kind == "jobs":
+        return matcher.jobs
+    raise HTTPException(status_code=404, detail=f"Unknown profile kind '{kind}'. Use candidates or jobs")
+
 @app.get("/")
 async def root():
     """Root endpoint to verify service is running"""
@@ -62,43 +523,49 @@ async def health_check():
         "port": 8000
     }
 
+@app.get("/ready")
+async def ready_check():
+    """Readiness probe: 200 once warm-up has finished, 503 while warming up or draining"""
+    return TimedJSONResponse(readiness.to_dict(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/generate-pitch")
-async def generate_pitch(resume_data: ResumeData):
+async def generate_pitch(resume_data: ResumeData, response: Response, style: str = DEFAULT_STYLE):
     """
     Generate an elevator pitch from resume JSON data
     
     Request body should be a JSON object with the resume data
+    The optional `style` query parameter picks a pitch template, e.g. 30s-casual
     """
+    validate_style(style)
     try:
-        # Print the received data for debugging
-        print("Received resume data:", json.dumps(resume_data.dict(), indent=2))
-        
-        # Initialize the generator with the data
-        generator = ResumePitchGenerator(resume_data.data)
-        pitch = generator.generate_pitch()
-        
-        return {
-            "success": True,
-            "pitch": pitch,
-            "word_count": len(pitch.split()) if pitch else 0
-        }
+        logger.debug("Received resume data with keys: %s", list(resume_data.data), extra=PER_REQUEST)
+        result, tier = await pitch_for_resume(resume_data.data, style)
+        set_cache_headers(response, tier)
+        return result
     except Exception as e:
         error_msg = f"Error generating pitch: {str(e)}"
-        print(error_msg)
-        print("Traceback:", traceback.format_exc())
+        count_error(e)
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 @app.post("/generate-pitch-from-text")
-async def generate_pitch_from_text(resume_text: ResumeText):
+async def generate_pitch_from_text(resume_text: ResumeText, style: str = DEFAULT_STYLE):
     """
     Generate pitch from resume text content
     """
+    validate_style(style)
     try:
-        print("Received resume text:", resume_text.text[:200] + "..." if len(resume_text.text) > 200 else resume_text.text)
+        logger.debug("Received resume text of %d characters", len(resume_text.text), extra=PER_REQUEST)
         
         # If your ResumePitchGenerator expects text instead of structured data
-        generator = ResumePitchGenerator({"text": resume_text.text})
-        pitch = generator.generate_pitch()
+        with STAGE_SECONDS.time("pitch_generation"):
+            generator = ResumePitchGenerator(CandidateProfile({"text": resume_text.text}))
+            pitch = generator.generate_pitch(style)
         
         return {
             "success": True,
@@ -107,388 +574,388 @@ async def generate_pitch_from_text(resume_text: ResumeText):
         }
     except Exception as e:
         error_msg = f"Error generating pitch from text: {str(e)}"
-        print(error_msg)
-        print("Traceback:", traceback.format_exc())
+        count_error(e)
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 @app.post("/generate-pitch-from-file")
-async def generate_pitch_from_file(file: UploadFile = File(...)):
+async def generate_pitch_from_file(response: Response, file: UploadFile = File(...), style: str = DEFAULT_STYLE):
     """
     Generate pitch from a file upload
     """
+    validate_style(style)
     try:
-        # Check file type
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file uploaded")
-        
-        # Read file content
-        content = await file.read()
-        
-        # Try to parse as JSON first
+        # Read file content in bounded chunks, hashing as it arrives
         try:
-            resume_data = json.loads(content.decode('utf-8'))
-            generator = ResumePitchGenerator(resume_data)
-        except json.JSONDecodeError:
-            # If not JSON, treat as plain text
-            text_content = content.decode('utf-8')
-            generator = ResumePitchGenerator({"text": text_content})
+            upload = await read_upload_timed(file, MAX_UPLOAD_BYTES)
+        except UploadRejected as e:
+            count_error(e)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
-        pitch = generator.generate_pitch()
+        cache_key = digest_key(f"pitch-file:{style}", upload.sha256)
+        cached, tier = await cache.get_async(cache_key)
+        set_cache_headers(response, tier)
+        if cached is not None:
+            return {**cached, "filename": file.filename}
         
-        return {
-            "success": True,
-            "pitch": pitch,
-            "word_count": len(pitch.split()) if pitch else 0,
-            "filename": file.filename
-        }
+        try:
+            result = await pitch_file_and_cache(upload.content, style, cache_key)
+        except PoolSaturatedError as e:
+            count_error(e)
+            raise HTTPException(status_code=503, detail=str(e))
+        return {**result, "filename": file.filename}
     except HTTPException:
         raise
     except Exception as e:
         error_msg = f"Error processing file: {str(e)}"
-        print(error_msg)
-        print("Traceback:", traceback.format_exc())
+        count_error(e)
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
-def extract_name_from_text(text: str) -> str:
-    """Extract candidate name from resume text"""
-    lines = text.strip().split('\n')
-    for line in lines[:5]:  # Check first 5 lines
-        line = line.strip()
-        if line and not any(keyword in line.lower() for keyword in ['resume', 'cv', 'curriculum', 'email', 'phone', 'address', '@']):
-            # Additional check to ensure it looks like a name (not too long, contains letters)
-            if len(line) < 50 and re.search(r'[a-zA-Z]', line):
-                return line
-    return ""
-
-def extract_email_from_text(text: str) -> str:
-    """Extract email address from resume text"""
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    emails = re.findall(email_pattern, text)
-    return emails[0] if emails else ""
-
-def extract_education_from_text(text: str) -> List[Dict[str, str]]:
-    """Extract education information from resume text"""
-    education_section = ""
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        if re.search(r'\b(education|degree|university|college|school|academic)\b', line.lower()):
-            education_section = line + "\n"
-            j = i + 1
-            # Continue reading until we hit another major section
-            while j < len(lines) and lines[j].strip():
-                next_line = lines[j].lower()
-                if re.search(r'\b(experience|work|employment|skills|projects|certifications)\b', next_line):
-                    break
-                education_section += lines[j] + "\n"
-                j += 1
-            break
-    
-    # Extract degree information
-    degree_pattern = r'\b(B\.?S\.?|M\.?S\.?|Ph\.?D\.?|Bachelor|Master|Doctor|B\.?A\.?|M\.?A\.?|MBA|B\.?Tech|M\.?Tech)\b'
-    degree_match = re.search(degree_pattern, education_section, re.IGNORECASE)
-    degree = degree_match.group(0) if degree_match else ""
-    
-    # Try to extract school/university name
-    school_pattern = r'\b(University|College|Institute|School)\b[^,\n]*'
-    school_match = re.search(school_pattern, education_section, re.IGNORECASE)
-    school = school_match.group(0) if school_match else ""
-    
-    return [{
-        "degree_type": degree,
-        "school_name": school,
-        "specialization_subjects": "",
-        "end_date": ""
-    }] if degree or school else []
-
-def extract_experience_from_text(text: str) -> List[Dict[str, Any]]:
-    """Extract work experience from resume text"""
-    experience_section = ""
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        if re.search(r'\b(experience|work|employment|career|professional)\b', line.lower()):
-            j = i + 1
-            # Continue reading until we hit another major section
-            while j < len(lines) and lines[j].strip():
-                next_line = lines[j].lower()
-                if re.search(r'\b(education|skills|projects|certifications)\b', next_line):
-                    break
-                experience_section += lines[j] + "\n"
-                j += 1
-            break
-    
-    # Simple extraction - in a real app, you'd want more sophisticated parsing
-    positions = []
-    if experience_section:
-        # Try to identify job titles and companies
-        job_pattern = r'([A-Za-z\s]+(?:Engineer|Developer|Manager|Analyst|Consultant|Specialist|Lead|Senior|Junior))'
-        jobs = re.findall(job_pattern, experience_section)
-        
-        positions.append({
-            "position_name": jobs[0] if jobs else "",
-            "company_name": "",
-            "start_date": "",
-            "job_details": experience_section.strip(),
-            "skills": []
-        })
-    
-    return positions
-
-def extract_skills_from_text(text: str) -> List[str]:
-    """Extract skills from resume text"""
-    skills_section = ""
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        if re.search(r'\b(skills|technologies|tools|technical|programming)\b', line.lower()):
-            j = i + 1
-            # Continue reading until we hit another major section
-            while j < len(lines) and lines[j].strip():
-                next_line = lines[j].lower()
-                if re.search(r'\b(education|experience|projects|certifications)\b', next_line):
-                    break
-                skills_section += lines[j] + "\n"
-                j += 1
-            break
-    
-    # Extract individual skills
-    skills = []
-    if skills_section:
-        # Split by common separators
-        skills = re.split(r'[,;\n•·]', skills_section)
-        skills = [skill.strip() for skill in skills if skill.strip() and len(skill.strip()) > 1]
-        # Remove empty strings and overly long entries
-        skills = [skill for skill in skills if 2 <= len(skill) <= 50]
-    
-    return skills
-
-def extract_certifications_from_text(text: str) -> List[str]:
-    """Extract certifications from resume text"""
-    certifications_section = ""
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        if re.search(r'\b(certifications?|certificates?|courses?|training)\b', line.lower()):
-            j = i + 1
-            # Continue reading until we hit another major section
-            while j < len(lines) and lines[j].strip():
-                next_line = lines[j].lower()
-                if re.search(r'\b(education|experience|projects|skills)\b', next_line):
-                    break
-                certifications_section += lines[j] + "\n"
-                j += 1
-            break
-    
-    # Extract individual certifications
-    certifications = []
-    if certifications_section:
-        # Split by common separators
-        certifications = re.split(r'[,;\n•·]', certifications_section)
-        certifications = [cert.strip() for cert in certifications if cert.strip() and len(cert.strip()) > 1]
-        # Remove empty strings and overly long entries
-        certifications = [cert for cert in certifications if 2 <= len(cert) <= 100]
-    
-    return certifications
-
 @app.post("/parse-resume")
-async def parse_resume(file: UploadFile = File(...)):
+async def parse_resume(
+    response: Response, file: UploadFile = File(...), candidate_id: Optional[str] = None, diff: bool = False
+):
     """
     Parse resume file and return structured data
     This endpoint matches what your Node.js backend is calling
+    The resume is added to the /search index under candidate_id, or the upload's hash without one
+    With diff=true the upload is parsed as a revision of candidate_id's previous resume, and
+    the response's "changes" lists which fields changed and whether the pitch did
     """
     try:
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file uploaded")
         
-        print(f"Received file: {file.filename}, Content-Type: {file.content_type}")
-        
-        # Read file content
-        content = await file.read()
-        
-        # Handle different file types
-        if file.filename.endswith('.json'):
-            try:
-                resume_data = json.loads(content.decode('utf-8'))
-                return {
-                    "success": True,
-                    "data": resume_data,
-                    "message": "Resume parsed successfully"
-                }
-            except json.JSONDecodeError as e:
-                raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
-        
-        elif file.filename.endswith('.txt'):
-            # For text files, decode as text
-            try:
-                text_content = content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    text_content = content.decode('latin-1')
-                except UnicodeDecodeError:
-                    raise HTTPException(status_code=400, detail="Unable to decode text file")
-            
-            # Create a structured data format with the extracted information
-            structured_data = {
-                "data": {
-                    "attributes": {
-                        "result": {
-                            "candidate_name": extract_name_from_text(text_content),
-                            "candidate_email": extract_email_from_text(text_content),
-                            "education_qualifications": extract_education_from_text(text_content),
-                            "positions": extract_experience_from_text(text_content),
-                            "skills": extract_skills_from_text(text_content),
-                            "candidate_courses_and_certifications": extract_certifications_from_text(text_content)
-                        }
-                    }
-                }
-            }
-            
-            # Generate pitch from the structured data
-            generator = ResumePitchGenerator(structured_data)
-            pitch = generator.generate_pitch()
-            
-            return {
-                "success": True,
-                "data": structured_data,
-                "pitch": pitch,
-                "message": "Resume parsed successfully"
-            }
+        logger.info("Received file: %s, Content-Type: %s", file.filename, file.content_type, extra=PER_REQUEST)
         
-        elif file.filename.endswith(('.doc', '.docx')):
-            # For DOCX files, use python-docx library
-            temp_file_path = f"temp_{file.filename}"
-            try:
-                with open(temp_file_path, "wb") as f:
-                    f.write(content)
-                
-                # Import docx here to handle import errors gracefully
-                try:
-                    from docx import Document
-                except ImportError:
-                    raise HTTPException(
-                        status_code=500, 
-                        detail="python-docx library is required to parse DOCX files. Please install it with: pip install python-docx"
-                    )
-                
-                doc = Document(temp_file_path)
-                text_content = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
-                
-                # Create a structured data format with the extracted information
-                structured_data = {
-                    "data": {
-                        "attributes": {
-                            "result": {
-                                "candidate_name": extract_name_from_text(text_content),
-                                "candidate_email": extract_email_from_text(text_content),
-                                "education_qualifications": extract_education_from_text(text_content),
-                                "positions": extract_experience_from_text(text_content),
-                                "skills": extract_skills_from_text(text_content),
-                                "candidate_courses_and_certifications": extract_certifications_from_text(text_content)
-                            }
-                        }
-                    }
-                }
-                
-                # Generate pitch from the structured data
-                generator = ResumePitchGenerator(structured_data)
-                pitch = generator.generate_pitch()
-                
-                return {
-                    "success": True,
-                    "data": structured_data,
-                    "pitch": pitch,
-                    "message": "Resume parsed successfully"
-                }
-            
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error processing DOCX file: {str(e)}")
-            finally:
-                # Clean up the temp file
-                try:
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                except:
-                    pass  # Ignore cleanup errors
+        # Read file content in bounded chunks, rejecting bad types before the body is buffered
+        try:
+            upload = await read_upload_timed(file, MAX_UPLOAD_BYTES, SUPPORTED_RESUME_EXTENSIONS)
+        except UploadRejected as e:
+            count_error(e)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
-        elif file.filename.endswith('.pdf'):
-            # For PDF files, you need to use a library like PyPDF2 or pdfplumber
-            try:
-                import PyPDF2
-            except ImportError:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="PyPDF2 library is required to parse PDF files. Please install it with: pip install PyPDF2"
-                )
-            
-            # Basic PDF text extraction
-            temp_file_path = f"temp_{file.filename}"
+        if diff:
+            if not candidate_id:
+                raise HTTPException(status_code=400, detail="diff=true requires a candidate_id")
+            if upload.filename.endswith('.json'):
+                raise HTTPException(status_code=400, detail="diff=true requires a TXT, PDF, DOC or DOCX upload")
             try:
-                with open(temp_file_path, "wb") as f:
-                    f.write(content)
-                
-                with open(temp_file_path, "rb") as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    text_content = ""
-                    for page in pdf_reader.pages:
-                        text_content += page.extract_text() + "\n"
-                
-                # Create structured data from extracted text
-                structured_data = {
-                    "data": {
-                        "attributes": {
-                            "result": {
-                                "candidate_name": extract_name_from_text(text_content),
-                                "candidate_email": extract_email_from_text(text_content),
-                                "education_qualifications": extract_education_from_text(text_content),
-                                "positions": extract_experience_from_text(text_content),
-                                "skills": extract_skills_from_text(text_content),
-                                "candidate_courses_and_certifications": extract_certifications_from_text(text_content)
-                            }
-                        }
-                    }
-                }
-                
-                # Generate pitch from the structured data
-                generator = ResumePitchGenerator(structured_data)
-                pitch = generator.generate_pitch()
-                
-                return {
-                    "success": True,
-                    "data": structured_data,
-                    "pitch": pitch,
-                    "message": "Resume parsed successfully"
-                }
-            
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error processing PDF file: {str(e)}")
-            finally:
-                # Clean up the temp file
-                try:
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                except:
-                    pass  # Ignore cleanup errors
+                result, changes, text = await parse_revision(upload, candidate_id)
+            except ResumeParseError as e:
+                count_error(e)
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            except PoolSaturatedError as e:
+                count_error(e)
+                raise HTTPException(status_code=503, detail=str(e))
+            await index_parsed_resume(candidate_id, upload.filename, result, text)
+            return {**result, "changes": changes}
+
+        doc_id = candidate_id or upload.sha256
+        cache_key = parse_cache_key(upload.filename, upload.sha256)
+        cached, tier = await cache.get_async(cache_key)
+        set_cache_headers(response, tier)
+        if cached is not None:
+            if doc_id not in search_index:
+                await index_parsed_resume(doc_id, upload.filename, cached)
+            return cached
         
-        else:
-            raise HTTPException(
-                status_code=400, 
-                detail="Unsupported file format. Please upload JSON, TXT, PDF, DOC, or DOCX files."
-            )
+        try:
+            result, text = await parse_and_cache(upload, cache_key)
+        except ResumeParseError as e:
+            count_error(e)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except PoolSaturatedError as e:
+            count_error(e)
+            raise HTTPException(status_code=503, detail=str(e))
+        await index_parsed_resume(doc_id, upload.filename, result, text)
+        return result
     
     except HTTPException:
         raise
     except Exception as e:
         error_msg = f"Error parsing resume: {str(e)}"
-        print(error_msg)
-        print("Traceback:", traceback.format_exc())
+        count_error(e)
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+async def read_batch_form(request: Request):
+    """
+    The multipart form of a batch request, allowing up to MAX_BATCH_FILES files rather than
+    Starlette's default of 1000
+    """
+    try:
+        return await request.form(max_files=MAX_BATCH_FILES, max_fields=MAX_BATCH_FILES)
+    except StarletteHTTPException as e:
+        if str(e.detail).startswith("Too many"):
+            raise HTTPException(
+                status_code=413,
+                detail=f"A batch request takes at most {MAX_BATCH_FILES} files; send larger imports as a single zip archive"
+            )
+        raise
+
+@app.post("/parse-resume/batch")
+async def parse_resume_batch(request: Request):
+    """
+    Parse many resumes in one request, either as several files (form field `files`) or a single
+    zip archive. Each result is streamed back as one NDJSON line as soon as it is ready.
+    """
+    form = await read_batch_form(request)
+    files = [f for f in form.getlist("files") if isinstance(f, FormFile)]
+    if not files or not any(f.filename for f in files):
+        await form.close()
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    archive = None
+    if len(files) == 1 and files[0].filename.endswith('.zip'):
+        try:
+            archive = await read_upload_timed(files[0], MAX_BATCH_UPLOAD_BYTES, ('.zip',))
+            # Open the archive up front so a corrupt zip fails the request instead of the stream
+            entries = iter_zip_resumes(archive.content, MAX_UPLOAD_BYTES)
+            first = next(entries, None)
+        except (UploadRejected, ResumeParseError) as e:
+            count_error(e)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        finally:
+            await form.close()
+
+    def ingest_entry(filename: str, content: Optional[bytes]) -> IngestedUpload:
+        if content is None:
+            raise file_too_large(MAX_UPLOAD_BYTES)
+        if not filename.endswith(SUPPORTED_RESUME_EXTENSIONS):
+            raise UploadRejected("Unsupported file format. Please upload JSON, TXT, PDF, DOC, or DOCX files.")
+        check_magic_bytes(filename, content[:MAGIC_PREFIX_LENGTH])
+        count_upload(filename)
+        return IngestedUpload(filename, content, hashlib.sha256(content).hexdigest())
+
+    async def iter_resumes():
+        # Yields (filename, upload, rejection) with exactly one of upload/rejection set
+        if archive is not None:
+            for filename, content in itertools.chain([first] if first is not None else [], entries):
+                try:
+                    yield filename, ingest_entry(filename, content), None
+                except UploadRejected as e:
+                    yield filename, None, e
+        else:
+            for file in files:
+                try:
+                    yield file.filename, await read_upload_timed(file, MAX_UPLOAD_BYTES, SUPPORTED_RESUME_EXTENSIONS), None
+                except UploadRejected as e:
+                    yield file.filename, None, e
+
+    async def stream_results():
+        try:
+            async for line in parse_results():
+                yield line
+        finally:
+            # The form was read here rather than by FastAPI, so its spooled files are closed here too
+            await form.close()
+
+    async def parse_results():
+        # Keep a bounded number of files in flight so large batches are not all held in memory
+        window = pool.workers * 2
+        pending = {}
+        index = 0
+
+        async def finish(future) -> str:
+            result, timings = future.result()
+            observe_stages(timings)
+            if result["success"]:
+                cache_key, sha256 = pending[future]
+                body = {k: v for k, v in result.items() if k not in ("index", "filename")}
+                await cache.set_async(cache_key, body)
+                await index_parsed_resume(sha256, result["filename"], body)
+            else:
+                ERRORS_TOTAL.inc(result.pop("error_class"))
+            result["cache"] = "MISS"
+            return json.dumps(result) + "\n"
+
+        async for filename, upload, rejection in iter_resumes():
+            if rejection is not None:
+                count_error(rejection)
+                yield json.dumps({"index": index, "filename": filename, "success": False,
+                                  "status_code": rejection.status_code, "error": rejection.detail}) + "\n"
+                index += 1
+                continue
+            cache_key = parse_cache_key(filename, upload.sha256)
+            cached, tier = await cache.get_async(cache_key)
+            if cached is not None:
+                if upload.sha256 not in search_index:
+                    await index_parsed_resume(upload.sha256, filename, cached)
+                yield json.dumps({**cached, "index": index, "filename": filename, "cache": "HIT"}) + "\n"
+            else:
+                # Batch items wait for a free worker rather than being rejected
+                future = asyncio.ensure_future(
+                    pool.run(parse_resume_batch_item, index, filename, upload.content, block=True)
+                )
+                pending[future] = (cache_key, upload.sha256)
+            index += 1
+            if len(pending) >= window:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield await finish(future)
+                    del pending[future]
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield await finish(future)
+                del pending[future]
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.put("/match/{kind}")
+async def upsert_match_profiles(kind: str, profiles: SkillProfiles):
+    """
+    Add or update candidates or jobs in the match index. Only skills that changed are touched,
+    so call this whenever a profile or job posting is saved.
+    """
+    matrix = match_matrix(kind)
+
+    def upsert_all():
+        for profile in profiles.items:
+            matcher.upsert(kind, profile.id, profile.skills)
+
+    # Each change is journaled, so the updates run off the event loop
+    await asyncio.to_thread(upsert_all)
+    return {"success": True, "updated": len(profiles.items), "total": len(matrix)}
+
+@app.delete("/match/{kind}/{profile_id}")
+async def delete_match_profile(kind: str, profile_id: str):
+    """Remove a candidate or job from the match index"""
+    match_matrix(kind)  # 404 for an unknown kind
+    if not await asyncio.to_thread(matcher.remove, kind, profile_id):
+        raise HTTPException(status_code=404, detail=f"No {kind[:-1]} '{profile_id}' in the match index")
+    return {"success": True}
+
+@app.post("/match")
+async def match(request: MatchRequest):
+    """
+    Top-k jobs for a candidate, or top-k candidates for a job.
+    The query skills come from `skills`, or from the indexed candidate_id / job_id.
+    """
+    if request.target not in ("jobs", "candidates"):
+        raise HTTPException(status_code=400, detail="target must be 'jobs' or 'candidates'")
+    if request.k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+
+    skills = request.skills
+    if skills is None:
+        source, source_id = (
+            ("candidates", request.candidate_id) if request.target == "jobs" else ("jobs", request.job_id)
+        )
+        if source_id is None:
+            raise HTTPException(status_code=400, detail="Provide skills, or candidate_id for jobs / job_id for candidates")
+        skills = await asyncio.to_thread(matcher.skills, source, source_id)
+        if skills is None:
+            raise HTTPException(status_code=404, detail=f"'{source_id}' is not in the match index")
+
+    with STAGE_SECONDS.time("match"):
+        # The matrices are shared with journaling threads, so queries take their lock off the event loop
+        if request.target == "jobs":
+            matches = await asyncio.to_thread(matcher.jobs_for_candidate, skills, request.k)
+        else:
+            matches = await asyncio.to_thread(matcher.candidates_for_job, skills, request.k)
+    return {"success": True, "target": request.target, "matches": matches}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...), kind: str = "parse-resume", candidate_id: Optional[str] = None,
+    style: str = DEFAULT_STYLE
+):
+    """
+    Queue a /parse-resume (kind=parse-resume) or /generate-pitch-from-file (kind=generate-pitch)
+    request and return its id at once. Poll GET /jobs/{id} or follow GET /jobs/{id}/events.
+    """
+    if kind not in jobs.handlers:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{kind}'. Choose one of: {', '.join(jobs.handlers)}")
+    if kind == "generate-pitch":
+        validate_style(style)
+    try:
+        upload = await read_upload_timed(
+            file, MAX_UPLOAD_BYTES, SUPPORTED_RESUME_EXTENSIONS if kind == "parse-resume" else None
+        )
+    except UploadRejected as e:
+        count_error(e)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    params = {"candidate_id": candidate_id} if kind == "parse-resume" else {"style": style}
+    try:
+        job = await jobs.submit(kind, upload.filename, upload.content, params)
+    except JobQueueFull as e:
+        count_error(e)
+        raise HTTPException(status_code=503, detail=str(e))
+    return public_job(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}'")
+    return public_job(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's state, then one event per stage until it succeeds or fails"""
+    if await asyncio.to_thread(jobs.store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}'")
+
+    async def stream():
+        async for event in jobs.events(job_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/search")
+async def search_resumes(q: str, page: int = 1, size: int = 10):
+    """
+    Full-text search over parsed resumes, ranked by BM25 with skills, titles and schools boosted
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query parameter q must not be empty")
+    if page < 1 or not 1 <= size <= 100:
+        raise HTTPException(status_code=400, detail="page must be at least 1 and size between 1 and 100")
+    with STAGE_SECONDS.time("search"):
+        # Off the event loop: a search waits while a written-out delta or merged segment is swapped in
+        results = await asyncio.to_thread(search_index.search, q, page, size)
+    return {"success": True, "query": q, **results}
+
+@app.delete("/search/{doc_id}")
+async def delete_search_document(doc_id: str):
+    """Remove a resume from the search index"""
+    if not await asyncio.to_thread(search_index.remove, doc_id):
+        raise HTTPException(status_code=404, detail=f"No resume '{doc_id}' in the search index")
+    return {"success": True}
+
+@app.get("/similar/{candidate}")
+async def similar_candidates(candidate: str, k: int = 10):
+    """
+    The k parsed candidates most like this one by skills, titles, education and certifications,
+    with cosine similarity as the score
+    """
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    with STAGE_SECONDS.time("similar"):
+        # Scoring up to 50,000 vectors is numpy work that shouldn't block the event loop
+        results = await asyncio.to_thread(similar_index.similar, candidate, k)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"No candidate '{candidate}' in the similarity index")
+    return {"success": True, "candidate": candidate, "results": results}
+
+@app.delete("/similar/{candidate}")
+async def delete_similar_candidate(candidate: str):
+    """Remove a candidate from the similarity index"""
+    if not await asyncio.to_thread(similar_index.remove, candidate):
+        raise HTTPException(status_code=404, detail=f"No candidate '{candidate}' in the similarity index")
+    return {"success": True}
+
 # Error handler for debugging
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print(f"Global exception handler caught: {str(exc)}")
-    print("Traceback:", traceback.format_exc())
+    count_error(exc)
+    logger.error("Global exception handler caught: %s", exc, exc_info=exc)
     return {
         "error": "Internal server error",
         "detail": str(exc),
@@ -497,10 +964,13 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Only run uvicorn if this file is executed directly
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    # PITCH_UDS also serves HTTP on a Unix socket, next to the TCP port
+    unix_socket = os.getenv("PITCH_UDS", "")
+    if os.getenv("PITCH_ENV", "development") == "production":
+        run_server("main:app", production_server_options(), unix_socket)
+    else:
+        run_server(
+            "main:app",
+            {"host": "0.0.0.0", "port": 8000, "reload": True, "log_level": "info"},
+            unix_socket
+        )
\ No newline at end of file
@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Universal hashing modulo a Mersenne prime; a < 2**31 and x < 2**32 keep a*x + b inside uint64
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def normalise_text(text: str) -> List[str]:
+    """Lowercase words with punctuation, layout and case differences removed"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+def shingles(words: List[str], size: int) -> np.ndarray:
+    """CRC32 of every run of `size` consecutive words, as unique uint64 values"""
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams)))
+
+
+class MinHasher:
+    """MinHash signatures over word shingles; the permutations are fixed by the seed"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        values = shingles(normalise_text(text), self.shingle_size)
+        if not len(values):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        hashed = ((values[:, None] * self._a + self._b) % MERSENNE_PRIME) & MAX_HASH
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Share of equal MinHash slots, an unbiased estimate of the shingle sets' Jaccard similarity"""
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) splitting the signature so that pairs near the threshold collide.
+    Picks the highest collision point (1/bands) ** (1/rows) that is still at or below the
+    threshold, favouring recall; candidates are verified against the threshold afterwards.
+    """
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1 / bands) ** (1 / rows)
+        if best_point < point <= threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index of MinHash signatures. Each signature is split into
+    bands and bucketed by band; documents sharing any bucket are candidates, and only those
+    are compared in full. Holds at most max_entries documents, evicting the oldest.
+    """
+
+    def __init__(self, num_perm: int = 128, threshold: float = 0.9, max_entries: int = 100000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, doc_id: str, signature: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self._remove(doc_id)
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, []).append(doc_id)
+            self._entries[doc_id] = (signature, meta or {})
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> bool:
+        entry = self._entries.pop(doc_id, None)
+        if entry is None:
+            return False
+        for band, key in enumerate(self._band_keys(entry[0])):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[band][key]
+        return True
+
+    def query(self, signature: np.ndarray) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """(id, estimated Jaccard, meta) of indexed documents at or above the threshold, most similar first"""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            matches = []
+            for doc_id in candidates:
+                stored, meta = self._entries[doc_id]
+                similarity = estimate_jaccard(signature, stored)
+                if similarity >= self.threshold:
+                    matches.append((doc_id, similarity, meta))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+
+# Worker processes hash with the same permutations as the index in the main process
+MINHASH_PERMUTATIONS = int(os.getenv("PITCH_DEDUPE_PERMUTATIONS", "128"))
+minhasher = MinHasher(MINHASH_PERMUTATIONS)
+
+
+def create_dedupe_index_from_env() -> Optional[NearDuplicateIndex]:
+    """
+    Build the near-duplicate index from PITCH_DEDUPE_THRESHOLD (estimated Jaccard similarity
+    of word 5-gram sets; 0 disables detection) and PITCH_DEDUPE_MAX_ENTRIES.
+    """
+    threshold = float(os.getenv("PITCH_DEDUPE_THRESHOLD", "0.9"))
+    if threshold <= 0:
+        return None
+    return NearDuplicateIndex(
+        MINHASH_PERMUTATIONS, min(threshold, 1.0), int(os.getenv("PITCH_DEDUPE_MAX_ENTRIES", "100000"))
+    )
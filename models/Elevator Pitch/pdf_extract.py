@@ -0,0 +1,112 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from resume_parser import ResumeParseError, ResumeSections
+from service_logging import logger
+
+# Pages beyond this are never extracted; academic CVs rarely need more for the fields we use
+PDF_MAX_PAGES = int(os.getenv("PITCH_PDF_MAX_PAGES", "40"))
+# Seconds a single document may spend in page extraction before we parse what we have
+PDF_TIME_BUDGET = float(os.getenv("PITCH_PDF_TIME_BUDGET", "10"))
+# Pages extracted concurrently per document; each thread keeps its own reader.
+# PyPDF2 holds the GIL outside zlib, so this only pays off for heavily compressed PDFs;
+# documents already run in parallel across the worker pool.
+PDF_PAGE_THREADS = int(os.getenv("PITCH_PDF_PAGE_THREADS", "1"))
+# Stop once every section has been found and closed. Off by default: skills are ranked over the
+# whole resume, so pages after that point still add skills and change their order.
+PDF_STOP_WHEN_SECTIONS_CLOSED = os.getenv("PITCH_PDF_STOP_WHEN_SECTIONS_CLOSED", "0") == "1"
+
+
+class PdfPageExtractor:
+    """
+    Extracts page text with one PdfReader per thread, since a reader and its
+    underlying stream can't be shared between threads.
+    """
+
+    def __init__(self, pypdf, content: bytes):
+        self._pypdf = pypdf
+        self._content = content
+        self._local = threading.local()
+        self.reader = self._new_reader()
+        self._local.reader = self.reader
+        self.page_count = len(self.reader.pages)
+
+    def _new_reader(self):
+        return self._pypdf.PdfReader(io.BytesIO(self._content))
+
+    def extract(self, page_number: int) -> str:
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            reader = self._local.reader = self._new_reader()
+        return reader.pages[page_number].extract_text()
+
+
+def extract_pdf_text(
+    content: bytes,
+    max_pages: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    threads: Optional[int] = None,
+    stop_when_sections_closed: Optional[bool] = None
+) -> str:
+    """
+    Extract PDF text page-parallel, in windows of `threads` pages taken in reading order.
+    Stops at the page cap or when the time budget runs out. With stop_when_sections_closed it
+    also stops once every section has been found and closed, at the cost of skills that only
+    appear on later pages.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    time_budget = PDF_TIME_BUDGET if time_budget is None else time_budget
+    threads = max(1, PDF_PAGE_THREADS if threads is None else threads)
+    if stop_when_sections_closed is None:
+        stop_when_sections_closed = PDF_STOP_WHEN_SECTIONS_CLOSED
+
+    try:
+        import PyPDF2
+    except ImportError:
+        raise ResumeParseError(
+            "PyPDF2 library is required to parse PDF files. Please install it with: pip install PyPDF2",
+            status_code=500
+        )
+
+    try:
+        extractor = PdfPageExtractor(PyPDF2, content)
+        page_count = min(extractor.page_count, max_pages) if max_pages > 0 else extractor.page_count
+        deadline = time.monotonic() + time_budget
+        pages: List[str] = []
+        # Sections are re-indexed each time the text has doubled, so the checks cost at most
+        # twice one index of the final text instead of one index per page
+        characters = 0
+        next_check = 0
+
+        executor = ThreadPoolExecutor(max_workers=threads) if threads > 1 and page_count > 1 else None
+        try:
+            for start in range(0, page_count, threads):
+                window = range(start, min(start + threads, page_count))
+                if executor is not None:
+                    pages.extend(executor.map(extractor.extract, window))
+                else:
+                    pages.extend(extractor.extract(page_number) for page_number in window)
+
+                characters += sum(len(page) + 1 for page in pages[-len(window):])
+                if len(pages) == page_count:
+                    break
+                if time.monotonic() > deadline:
+                    logger.warning("PDF time budget exhausted after %d of %d pages", len(pages), extractor.page_count)
+                    break
+                if stop_when_sections_closed and characters >= next_check:
+                    next_check = 2 * characters
+                    if ResumeSections("".join(page + "\n" for page in pages)).sections_closed():
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        return "".join(page + "\n" for page in pages)
+    except ResumeParseError:
+        raise
+    except Exception as e:
+        raise ResumeParseError(f"Error processing PDF file: {str(e)}", status_code=500)
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from service_logging import logger
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+# A handler gets the job row, the uploaded bytes and a callback to report the stage it reached
+JobHandler = Callable[[Dict[str, Any], bytes, Callable[[str], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    """Raised when the number of unfinished jobs has reached the limit"""
+
+
+class JobStore:
+    """
+    Jobs persisted in SQLite. The upload is kept until the job finishes, so queued and
+    interrupted jobs can be run again after a restart; results are kept for the TTL.
+    A running job is leased to the process that claimed it, which keeps renewing the lease;
+    only jobs whose lease ran out are requeued, so server processes sharing the database
+    never take over each other's live jobs.
+    """
+
+    COLUMNS = ("id", "kind", "status", "stage", "filename", "params", "result", "error", "status_code",
+               "created_at", "updated_at")
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT NOT NULL, "
+            "filename TEXT NOT NULL, params TEXT NOT NULL, content BLOB, result TEXT, error TEXT, "
+            "status_code INTEGER, created_at REAL NOT NULL, updated_at REAL NOT NULL, owner TEXT, lease_until REAL)"
+        )
+        # Databases created before jobs were leased
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):  # Added by a process starting alongside
+                        raise
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self.purge_expired()
+
+    def _row(self, row) -> Dict[str, Any]:
+        job = dict(zip(self.COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create(self, job_id: str, kind: str, filename: str, params: Dict[str, Any], content: bytes):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, stage, filename, params, content, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, json.dumps(params), content, now, now)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def content(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, job_id: str, owner: str, lease: float) -> bool:
+        """Move a queued job to running, leased to owner for `lease` seconds; False when another runner got it first"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (owner, now + lease, now, job_id)
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, owner: str, lease: float):
+        """Extend the lease on every job owner is running"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'", (time.time() + lease, owner)
+            )
+
+    def release(self, owner: str):
+        """End owner's leases now, so the jobs it stopped running are requeued without waiting them out"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status = 'running'", (owner,))
+
+    def set_stage(self, job_id: str, stage: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job_id))
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, status_code: int = 200):
+        """Record the outcome and drop the upload, which is no longer needed"""
+        status = "failed" if error is not None else "succeeded"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, result = ?, error = ?, status_code = ?, content = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, status, json.dumps(result) if result is not None else None, error, status_code,
+                 time.time(), job_id)
+            )
+
+    def requeue_expired(self) -> List[str]:
+        """Requeue running jobs whose lease ran out, because their process died or stopped, and return their ids"""
+        # Jobs claimed before leases existed have none, and are treated as expired
+        expired = "status = 'running' AND COALESCE(lease_until, 0) < ?"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(f"SELECT id FROM jobs WHERE {expired} ORDER BY created_at", (now,)).fetchall()
+                self._conn.execute(
+                    f"UPDATE jobs SET status = 'queued', stage = 'queued', owner = NULL, lease_until = NULL "
+                    f"WHERE {expired}", (now,)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    def recover(self) -> List[str]:
+        """Requeue running jobs whose lease ran out, and return the ids of every queued job, oldest first"""
+        self.requeue_expired()
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def count_unfinished(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (time.time() - self.ttl,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """A job as returned by GET /jobs/{id}: the result when it succeeded, the error when it failed"""
+    view = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "filename": job["filename"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "succeeded":
+        view["result"] = job["result"]
+    elif job["status"] == "failed":
+        view["error"] = job["error"]
+        view["status_code"] = job["status_code"]
+    return view
+
+
+class JobManager:
+    """
+    Runs persisted jobs with a fixed number of runner tasks, so a burst of submissions
+    becomes a queue drained at the pool's pace instead of a pile of open requests.
+    Stage changes are pushed to subscribers of the job's event stream.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], concurrency: int, max_unfinished: int,
+                 lease: float = 30):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.max_unfinished = max_unfinished
+        self.lease = lease
+        # Identifies this process's leases; unique per start, so a reused pid never inherits them
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._runners: List[asyncio.Task] = []
+        self._renewer: Optional[asyncio.Task] = None
+        self._running: Set[str] = set()
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._stopping = False
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        for job_id in self.store.recover():
+            self._queue.put_nowait(job_id)
+        if self._queue.qsize():
+            logger.info("Resuming %d queued jobs", self._queue.qsize())
+        self._runners = [asyncio.ensure_future(self._run_forever()) for _ in range(self.concurrency)]
+        self._renewer = asyncio.ensure_future(self._renew_forever())
+
+    async def _renew_forever(self):
+        """Keep this process's leases alive, and pick up jobs whose process stopped renewing its own"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if self._running:
+                    await asyncio.to_thread(self.store.renew, self.owner, self.lease)
+                requeued = await asyncio.to_thread(self.store.requeue_expired)
+            except sqlite3.Error as e:
+                logger.warning("Could not renew job leases: %s", e)
+                continue
+            if requeued:
+                logger.info("Requeued %d jobs whose lease expired", len(requeued))
+            for job_id in requeued:
+                self._queue.put_nowait(job_id)
+
+    async def stop(self, timeout: float):
+        """
+        Stop picking up jobs, give running ones `timeout` seconds, then cancel them.
+        Cancelled jobs stay marked as running with their lease ended, so another server
+        process or the next start runs them again.
+        """
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for runner in self._runners + [self._renewer]:
+            if runner is not None:
+                runner.cancel()
+        await asyncio.gather(*self._runners, self._renewer, return_exceptions=True)
+        self._runners, self._renewer = [], None
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def submit(self, kind: str, filename: str, content: bytes, params: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind!r}, choose one of: {', '.join(self.handlers)}")
+        # Every SQLite call waits on the store's lock and the disk, so none of them runs on the event loop
+        if await asyncio.to_thread(self.store.count_unfinished) >= self.max_unfinished:
+            raise JobQueueFull(f"Job queue full: {self.max_unfinished} jobs waiting, please retry shortly")
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create, job_id, kind, filename, params, content)
+        self._queue.put_nowait(job_id)
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def _publish(self, job: Dict[str, Any]):
+        event = public_job(job)
+        for listener in self._listeners.get(job["id"], ()):
+            listener.put_nowait(event)
+
+    async def _run_forever(self):
+        while True:
+            job_id = await self._queue.get()
+            # Jobs left queued while stopping are picked up again on the next start
+            if not self._stopping and await asyncio.to_thread(self.store.claim, job_id, self.owner, self.lease):
+                self._running.add(job_id)
+                try:
+                    await self._run(job_id)
+                finally:
+                    self._running.discard(job_id)
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        self._publish(job)
+        stage_written: Optional[asyncio.Future] = None
+
+        def progress(stage: str):
+            # Handlers report stages synchronously; each write waits for the one before, so they land in order
+            nonlocal stage_written
+            previous = stage_written
+
+            async def write_stage():
+                if previous is not None:
+                    await previous
+                await asyncio.to_thread(self.store.set_stage, job_id, stage)
+
+            stage_written = asyncio.ensure_future(write_stage())
+            job["stage"] = stage
+            self._publish(job)
+
+        try:
+            content = await asyncio.to_thread(self.store.content, job_id)
+            result = await self.handlers[job["kind"]](job, content or b"", progress)
+            if stage_written is not None:
+                await stage_written
+            await asyncio.to_thread(self.store.finish, job_id, result=result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            if status_code >= 500:
+                logger.exception("Job %s failed", job_id)
+            if stage_written is not None:
+                await asyncio.gather(stage_written, return_exceptions=True)
+            await asyncio.to_thread(
+                self.store.finish, job_id, error=getattr(e, "detail", None) or str(e), status_code=status_code
+            )
+        self._publish(await asyncio.to_thread(self.store.get, job_id))
+
+    async def events(
+        self, job_id: str, poll_interval: float = 1.0, heartbeat: float = 15.0
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        The job's current state, then every change until it finishes. Changes made by
+        other server processes sharing the database are picked up by polling. None is
+        yielded after `heartbeat` quiet seconds, so idle connections can be kept alive.
+        """
+        listener: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(listener)
+        try:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None:
+                return
+            last = public_job(job)
+            yield last
+            quiet_since = time.monotonic()
+            while last["status"] not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(listener.get(), poll_interval)
+                except asyncio.TimeoutError:
+                    event = public_job(await asyncio.to_thread(self.store.get, job_id))
+                    if (event["status"], event["stage"]) == (last["status"], last["stage"]):
+                        if time.monotonic() - quiet_since >= heartbeat:
+                            quiet_since = time.monotonic()
+                            yield None
+                        continue
+                last = event
+                quiet_since = time.monotonic()
+                yield event
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del self._listeners[job_id]
+
+
+def create_job_manager_from_env(handlers: Dict[str, JobHandler], default_concurrency: int) -> JobManager:
+    """
+    Build the job manager from PITCH_JOB_DB (SQLite path, empty for an in-memory database),
+    PITCH_JOB_TTL (seconds finished jobs are kept), PITCH_JOB_CONCURRENCY (jobs run at once,
+    defaults to the worker pool size), PITCH_JOB_MAX_PENDING (unfinished jobs accepted) and
+    PITCH_JOB_LEASE_SECONDS (how long a running job stays with a process that stops renewing it).
+    """
+    default_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pitch_jobs.sqlite3")
+    store = JobStore(
+        os.getenv("PITCH_JOB_DB", default_db) or ":memory:",
+        ttl=float(os.getenv("PITCH_JOB_TTL", str(7 * 24 * 3600)))
+    )
+    return JobManager(
+        store,
+        handlers,
+        concurrency=int(os.getenv("PITCH_JOB_CONCURRENCY", default_concurrency)),
+        max_unfinished=int(os.getenv("PITCH_JOB_MAX_PENDING", "10000")),
+        lease=float(os.getenv("PITCH_JOB_LEASE_SECONDS", "30"))
+    )
@@ -0,0 +1,133 @@
+import re
+from typing import Callable, Dict, List, Tuple
+
+# Template syntax:
+#   {field}        the value of a view field
+#   {?a&b} ... {/} a section rendered only when every listed field is non-empty
+# Every view field is a string, see ResumePitchGenerator.pitch_view for the available names.
+
+DEFAULT_STYLE = "60s-formal"
+
+CLOSING_FORMAL = (
+    "I'm now eager to contribute to a forward-thinking organization where I can apply "
+    "my skills and expertise to make a meaningful impact."
+)
+CLOSING_CASUAL = "I'd love to bring that energy to a team that's building something great."
+
+PITCH_TEMPLATES: Dict[str, str] = {
+    # The original one-minute pitch, kept byte-for-byte so existing pitches don't change
+    "60s-formal": (
+        "Hi, I'm {name}."
+        "{?degree&school} I hold a {degree} in {major} from {school}{?year}, completed in {year}{/}.{/}"
+        "{?title&company}\n\nI've worked as a {title} at {company}{?duration} for {duration} years{/}"
+        ", where I {responsibility}{/}"
+        "{?skills}\n\nMy key skills include {skills}, and more.{/}"
+        "{?certifications}\n\nI'm also {certifications} certified.{/}"
+        "\n\n" + CLOSING_FORMAL
+    ),
+    "60s-casual": (
+        "Hey there, I'm {name}!"
+        "{?degree&school} I studied {degree}{?major} in {major}{/} at {school}{?year} and wrapped up in {year}{/}.{/}"
+        "{?title&company}\n\nThese days I'm a {title} at {company}{?duration}, going on {duration} years{/}"
+        "{?responsibility}, where I {responsibility}{/}{/}"
+        "{?skills}\n\nI spend most of my time with {skills}.{/}"
+        "{?certifications}\n\nI'm also {certifications} certified.{/}"
+        "\n\n" + CLOSING_CASUAL
+    ),
+    "30s-formal": (
+        "Hi, I'm {name}."
+        "{?title&company} I'm a {title} at {company}{?duration} with {duration} years in the role{/}.{/}"
+        "{?degree&school} I hold a {degree} from {school}.{/}"
+        "{?top_skills} My core skills are {top_skills}.{/}"
+        " " + CLOSING_FORMAL
+    ),
+    "30s-casual": (
+        "Hey, I'm {name}!"
+        "{?title&company} I work as a {title} at {company}.{/}"
+        "{?top_skills} I'm at my best with {top_skills}.{/}"
+        " " + CLOSING_CASUAL
+    ),
+    "short-formal": (
+        "{name}"
+        "{?title} | {title}{?company} at {company}{/}{/}"
+        "{?top_skill} | {top_skill}{/}"
+    ),
+    "short-casual": (
+        "Hi, I'm {name}"
+        "{?title}, {title}{?company} at {company}{/}{/}"
+        "{?top_skill}, big on {top_skill}{/}."
+    ),
+}
+
+TOKEN_PATTERN = re.compile(r'\{(\?[\w&]+|/|\w+)\}')
+
+
+class PitchTemplate:
+    """A pitch template parsed once and compiled into a Python render function"""
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        self.fields: List[str] = []
+        self.render: Callable[[Dict[str, str]], str] = self._compile()
+
+    def _compile(self) -> Callable[[Dict[str, str]], str]:
+        lines = ["def render(v):", "    o = []", "    x = o.extend"]
+        depth = 1
+        run: List[str] = []
+
+        def flush():
+            if run:
+                lines.append("    " * depth + f"x(({', '.join(run)},))")
+                run.clear()
+
+        position = 0
+        for match in TOKEN_PATTERN.finditer(self.source):
+            if match.start() > position:
+                run.append(repr(self.source[position:match.start()]))
+            position = match.end()
+            token = match.group(1)
+            if token.startswith('?'):
+                flush()
+                names = token[1:].split('&')
+                self.fields.extend(names)
+                condition = " and ".join(f"v[{name!r}]" for name in names)
+                lines.append("    " * depth + f"if {condition}:")
+                depth += 1
+            elif token == '/':
+                flush()
+                if depth == 1:
+                    raise ValueError(f"Unbalanced {{/}} in pitch template {self.name!r}")
+                if lines[-1].rstrip().endswith(':'):
+                    lines.append("    " * depth + "pass")
+                depth -= 1
+            else:
+                self.fields.append(token)
+                run.append(f"v[{token!r}]")
+        if position < len(self.source):
+            run.append(repr(self.source[position:]))
+        flush()
+        if depth != 1:
+            raise ValueError(f"Unclosed section in pitch template {self.name!r}")
+        lines.append("    return ''.join(o)")
+
+        namespace: Dict[str, Callable] = {}
+        exec(compile("\n".join(lines), f"<pitch template {self.name}>", "exec"), namespace)
+        return namespace["render"]
+
+
+def compile_templates(sources: Dict[str, str]) -> Dict[str, PitchTemplate]:
+    return {name: PitchTemplate(name, source) for name, source in sources.items()}
+
+
+# Compiled once at import so request handlers only ever call the render functions
+TEMPLATES: Dict[str, PitchTemplate] = compile_templates(PITCH_TEMPLATES)
+
+PITCH_STYLES: Tuple[str, ...] = tuple(TEMPLATES)
+
+
+def get_template(style: str) -> PitchTemplate:
+    template = TEMPLATES.get(style)
+    if template is None:
+        raise ValueError(f"Unknown pitch style {style!r}, choose one of: {', '.join(PITCH_STYLES)}")
+    return template
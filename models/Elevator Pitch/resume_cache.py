@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from service_logging import logger
+
+
+def digest_key(namespace: str, sha256: str) -> str:
+    """Cache key for content whose SHA-256 hex digest is already known"""
+    return f"{namespace}:{sha256}"
+
+
+def content_key(namespace: str, content: bytes) -> str:
+    """Cache key for raw uploaded bytes"""
+    return digest_key(namespace, hashlib.sha256(content).hexdigest())
+
+
+def json_key(namespace: str, data: Any) -> str:
+    """Cache key for JSON data, canonicalised so key order and whitespace don't matter"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return content_key(namespace, canonical.encode('utf-8'))
+
+
+class MemoryCache:
+    """In-process LRU cache with a maximum entry count and a time-to-live"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk cache tier that survives restarts; values are stored as JSON"""
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value, separators=(',', ':'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + self.ttl)
+            )
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RevisionStore:
+    """
+    The latest parsed revision of each candidate's resume, with the line digests diff mode
+    compares against. Kept in SQLite without a TTL or size limit, since losing a revision
+    would make every field of the candidate's next upload look changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS revisions (candidate TEXT PRIMARY KEY, revision TEXT NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    def get(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT revision FROM revisions WHERE candidate = ?", (candidate_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Revision read failed: %s", e)
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, candidate_id: str, revision: Dict[str, Any]):
+        payload = json.dumps(revision, separators=(',', ':'))
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO revisions (candidate, revision, updated_at) VALUES (?, ?, ?)",
+                    (candidate_id, payload, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("Revision write failed: %s", e)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResumeCache:
+    """
+    Two-tier cache for parsed resumes and generated pitches.
+    Lookups try the in-memory LRU first, then SQLite; disk hits are promoted to memory.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Return (value, tier) where tier is "memory", "disk" or None on a miss"""
+        value = self._memory_get(key)
+        if value is not None:
+            return value, "memory"
+        return self._disk_get(key)
+
+    async def get_async(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """get for the event loop: memory hits are served inline, SQLite is read on a worker thread"""
+        value = self._memory_get(key)
+        if value is not None:
+            return value, "memory"
+        if self.disk is None:
+            self.stats["misses"] += 1
+            return None, None
+        return await asyncio.to_thread(self._disk_get, key)
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+        return value
+
+    def _disk_get(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("Cache read failed: %s", e)
+                value = None
+            if value is not None:
+                self.stats["disk_hits"] += 1
+                self.memory.set(key, value)
+                return value, "disk"
+        self.stats["misses"] += 1
+        return None, None
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self._disk_set(key, value)
+
+    async def set_async(self, key: str, value: Any):
+        """set for the event loop: the SQLite write, which can wait on a WAL commit, runs on a worker thread"""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self._disk_set, key, value)
+
+    def _disk_set(self, key: str, value: Any):
+        try:
+            self.disk.set(key, value)
+        except sqlite3.Error as e:
+            logger.warning("Cache write failed: %s", e)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def create_cache_from_env() -> ResumeCache:
+    """
+    Build the service cache from environment variables:
+    PITCH_CACHE_SIZE (entries kept in memory), PITCH_CACHE_TTL (seconds in memory),
+    PITCH_CACHE_DB (SQLite path, empty to disable) and PITCH_CACHE_DB_TTL (seconds on disk).
+    """
+    memory = MemoryCache(
+        max_entries=int(os.getenv("PITCH_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("PITCH_CACHE_TTL", "3600"))
+    )
+    default_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pitch_cache.sqlite3")
+    db_path = os.getenv("PITCH_CACHE_DB", default_db)
+    disk = None
+    if db_path:
+        try:
+            disk = SQLiteCache(db_path, ttl=float(os.getenv("PITCH_CACHE_DB_TTL", str(7 * 24 * 3600))))
+        except sqlite3.Error as e:
+            logger.warning("Disk cache disabled, could not open %s: %s", db_path, e)
+    return ResumeCache(memory, disk)
+
+
+def create_revision_store_from_env() -> RevisionStore:
+    """Build the diff-mode revision store from PITCH_REVISION_DB (SQLite path, empty for an in-memory database)"""
+    default_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pitch_revisions.sqlite3")
+    db_path = os.getenv("PITCH_REVISION_DB", default_db) or ":memory:"
+    try:
+        return RevisionStore(db_path)
+    except sqlite3.Error as e:
+        logger.warning("Revisions kept in memory only, could not open %s: %s", db_path, e)
+        return RevisionStore(":memory:")
@@ -0,0 +1,210 @@
+import io
+import random
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# Deterministic synthetic resumes for benchmarks; the same seed always yields the same bytes
+
+LAYOUTS = ('short', 'long', 'many_positions', 'pathological')
+FORMATS = ('txt', 'docx', 'pdf')
+
+FIRST_NAMES = ('Asha', 'Ben', 'Chen', 'Dana', 'Elif', 'Farah', 'Goran', 'Hana', 'Ivan', 'Jia', 'Kofi', 'Lena')
+LAST_NAMES = ('Okafor', 'Silva', 'Nguyen', 'Kowalski', 'Haddad', 'Moreau', 'Tanaka', 'Reyes', 'Novak', 'Iyer')
+DEGREES = ('Bachelor of Science', 'Master of Science', 'B.Tech', 'M.Tech', 'MBA', 'PhD', 'Bachelor of Arts')
+MAJORS = ('Computer Science', 'Electrical Engineering', 'Statistics', 'Economics', 'Design', 'Physics')
+SCHOOLS = ('University of Lagos', 'State University', 'Institute of Technology', 'City College', 'School of Design')
+TITLES = ('Software Engineer', 'Data Scientist', 'Product Manager', 'Designer', 'Developer', 'Analyst', 'Consultant')
+COMPANIES = ('Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Hooli', 'Stark Industries', 'Wayne Tech')
+SKILLS = (
+    'Python', 'Java', 'JavaScript', 'TypeScript', 'React', 'Node.js', 'SQL', 'PostgreSQL', 'AWS', 'Docker',
+    'Kubernetes', 'Machine Learning', 'Pandas', 'NumPy', 'Go', 'Rust', 'Figma', 'Tableau', 'Excel', 'Git'
+)
+CERTIFICATIONS = ('AWS Certified Developer', 'PMP', 'Scrum Master', 'Google Data Analytics', 'CKA', 'CISSP')
+DUTIES = (
+    'built internal tools', 'led a team of engineers', 'shipped features weekly', 'cut costs by a third',
+    'designed data pipelines', 'mentored interns', 'owned the billing service', 'improved test coverage'
+)
+
+
+class ResumeDocument:
+    """A synthetic resume: its plain-text lines, rendered to bytes per format on demand"""
+
+    def __init__(self, layout: str, index: int, lines: List[str]):
+        self.layout = layout
+        self.index = index
+        self.lines = lines
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    def filename(self, fmt: str) -> str:
+        return f"{self.layout}_{self.index:04d}.{fmt}"
+
+    def render(self, fmt: str) -> bytes:
+        if fmt == 'txt':
+            return self.text.encode('utf-8')
+        if fmt == 'docx':
+            return make_docx(self.lines)
+        if fmt == 'pdf':
+            return make_pdf(paginate(self.lines, 50))
+        raise ValueError(f"Unknown corpus format {fmt!r}, choose one of: {', '.join(FORMATS)}")
+
+    def render_docx_table(self) -> bytes:
+        """
+        DOCX in the two-column template layout: contact details and education in the left
+        cell, the rest in the right, so reading order still matches `text`
+        """
+        split = self.lines.index("Experience") if "Experience" in self.lines else len(self.lines) // 2
+        return make_docx([], [[self.lines[:split], self.lines[split:]]])
+
+
+def _position_lines(rng: random.Random, count: int, duties: int) -> List[str]:
+    lines = []
+    for _ in range(count):
+        year = rng.randint(2005, 2023)
+        lines.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)}, {year} - {year + rng.randint(1, 4)}")
+        lines.extend(f"- {rng.choice(DUTIES)}" for _ in range(duties))
+    return lines
+
+
+def _resume_lines(rng: random.Random, layout: str) -> List[str]:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = f"{name.lower().replace(' ', '.')}@example.com"
+    degree = f"{rng.choice(DEGREES)} in {rng.choice(MAJORS)}"
+    school = f"{rng.choice(SCHOOLS)}, {rng.randint(2000, 2022)}"
+    skills = ", ".join(rng.sample(SKILLS, rng.randint(4, 12)))
+    certifications = rng.sample(CERTIFICATIONS, rng.randint(0, 3))
+
+    if layout == 'pathological':
+        # No headings, keyword-dense noise, one very long line and non-ASCII text
+        noise = " ".join(rng.choice(DUTIES + SKILLS + TITLES) for _ in range(400))
+        return (
+            ["Curriculum Vitae", f"Résumé — {name} · {email}", noise]
+            + [f"{rng.choice(TITLES)} {rng.choice(DEGREES)} {rng.choice(SCHOOLS)}" for _ in range(60)]
+            + ["experience education skills certifications" for _ in range(20)]
+        )
+
+    positions, duties = {'short': (1, 1), 'long': (4, 6), 'many_positions': (40, 2)}[layout]
+    lines = [name, email, "+1 555 0100", ""]
+    if layout == 'long':
+        lines += ["Summary", " ".join(rng.choice(DUTIES) for _ in range(60)), ""]
+    lines += ["Education", degree, school, ""]
+    lines += ["Experience"] + _position_lines(rng, positions, duties) + [""]
+    lines += ["Skills", skills, ""]
+    if certifications:
+        lines += ["Certifications"] + certifications
+    if layout == 'long':
+        lines += ["", "Projects"] + [f"- {rng.choice(DUTIES)} with {rng.choice(SKILLS)}" for _ in range(30)]
+    return lines
+
+
+def generate_corpus(count: int, seed: int = 0, layouts: Tuple[str, ...] = LAYOUTS) -> List[ResumeDocument]:
+    """`count` resumes per layout, identical for the same seed"""
+    rng = random.Random(seed)
+    return [
+        ResumeDocument(layout, index, _resume_lines(rng, layout))
+        for layout in layouts
+        for index in range(count)
+    ]
+
+
+def iter_corpus_files(documents: List[ResumeDocument], formats: Tuple[str, ...] = FORMATS) -> Iterator[Tuple[str, bytes]]:
+    for document in documents:
+        for fmt in formats:
+            yield document.filename(fmt), document.render(fmt)
+
+
+def paginate(lines: List[str], per_page: int) -> List[List[str]]:
+    return [lines[start:start + per_page] for start in range(0, len(lines), per_page)] or [[]]
+
+
+def _docx_paragraphs(paragraphs: List[str]) -> str:
+    return "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>' for text in paragraphs
+    )
+
+
+def make_docx(paragraphs: List[str], table: Optional[List[List[List[str]]]] = None) -> bytes:
+    """
+    The smallest DOCX package python-docx opens: one paragraph per line, followed by
+    a table given as rows of cells of paragraphs
+    """
+    body = _docx_paragraphs(paragraphs)
+    if table:
+        rows = "".join(
+            "<w:tr>" + "".join(f"<w:tc>{_docx_paragraphs(cell) or '<w:p/>'}</w:tc>" for cell in row) + "</w:tr>"
+            for row in table
+        )
+        body += f"<w:tbl>{rows}</w:tbl>"
+    files: Dict[str, str] = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="word/document.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ),
+        'word/document.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in files.items():
+            # Fixed timestamps keep the bytes, and so the cache keys, reproducible
+            archive.writestr(zipfile.ZipInfo(name, (2020, 1, 1, 0, 0, 0)), xml)
+    return buffer.getvalue()
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal uncompressed PDF with one Helvetica text line per entry, one page per list"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")
+    kids = []
+    for lines in pages:
+        operations = ["BT /F1 10 Tf 14 TL 50 780 Td"] + [f"({_pdf_string(line)}) Tj T*" for line in lines] + ["ET"]
+        stream = "\n".join(operations).encode('latin-1', 'replace')
+        contents = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, contents, font)
+        ))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(output)
@@ -0,0 +1,431 @@
+"""
+Columnar export of parsed resumes, so analytics can scan the corpus without re-parsing it.
+
+Every parsed result is appended as one row to a Parquet dataset partitioned by parse day:
+
+    resume_export/day=2024-05-01/part-1714567890123-<uuid>.parquet
+
+Skills, certifications, education and positions are list columns (positions and education
+as lists of structs). Rows are journaled to a hidden per-process file as they arrive and
+written out as a new part file every `flush_rows` rows, so appends never rewrite existing
+files. compact() merges each partition into one file and keeps only the latest row per
+doc_id; partitions collecting `compact_files` part files are compacted automatically, on a
+background thread so appends carry on meanwhile.
+
+    python resume_export.py stats
+    python resume_export.py compact
+    python resume_export.py scan --columns candidate_name skills --limit 5
+
+Readers open the directory as a hive-partitioned Parquet dataset, e.g.
+pyarrow.dataset.dataset("resume_export", partitioning="hive"); hidden files are skipped.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from service_logging import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # The service runs without the export
+    pa = None
+
+EDUCATION_FIELDS = ("degree_type", "school_name", "specialization_subjects", "end_date")
+POSITION_FIELDS = ("position_name", "company_name", "start_date", "job_details")
+
+
+def export_schema() -> "pa.Schema":
+    return pa.schema([
+        ("doc_id", pa.string()),
+        ("filename", pa.string()),
+        ("parsed_at", pa.timestamp("ms", tz="UTC")),
+        ("candidate_name", pa.string()),
+        ("candidate_email", pa.string()),
+        ("skills", pa.list_(pa.string())),
+        ("candidate_courses_and_certifications", pa.list_(pa.string())),
+        ("education_qualifications", pa.list_(pa.struct([(field, pa.string()) for field in EDUCATION_FIELDS]))),
+        ("positions", pa.list_(pa.struct(
+            [(field, pa.string()) for field in POSITION_FIELDS] + [("skills", pa.list_(pa.string()))]
+        ))),
+    ])
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else "" if value is None else str(value)
+
+
+def _texts(values: Any) -> List[str]:
+    return [_text(value) for value in values] if isinstance(values, list) else []
+
+
+def _records(values: Any, fields: Sequence[str], list_fields: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    if not isinstance(values, list):
+        return []
+    return [
+        {**{field: _text(value.get(field)) for field in fields}, **{field: _texts(value.get(field)) for field in list_fields}}
+        for value in values if isinstance(value, dict)
+    ]
+
+
+def export_row(doc_id: str, filename: str, result: Dict[str, Any], parsed_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    One dataset row for a parsed result. Uploaded JSON resumes can have any shape, so
+    missing or mistyped fields become empty values instead of failing the append.
+    """
+    return {
+        "doc_id": doc_id,
+        "filename": filename,
+        "parsed_at": int((time.time() if parsed_at is None else parsed_at) * 1000),
+        "candidate_name": _text(result.get("candidate_name")),
+        "candidate_email": _text(result.get("candidate_email")),
+        "skills": _texts(result.get("skills")),
+        "candidate_courses_and_certifications": _texts(result.get("candidate_courses_and_certifications")),
+        "education_qualifications": _records(result.get("education_qualifications"), EDUCATION_FIELDS),
+        "positions": _records(result.get("positions"), POSITION_FIELDS, ("skills",)),
+    }
+
+
+def partition_of(parsed_at_ms: int) -> str:
+    return "day=" + datetime.fromtimestamp(parsed_at_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+def lock_file(file, blocking: bool = False) -> bool:
+    """
+    Take an exclusive lock on an open file, held until the file is closed. Returns False when
+    another process holds it and blocking is not set.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    # msvcrt locks a byte range from the current position, so the first byte stands for the file
+    position = file.tell()
+    file.seek(0)
+    try:
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+    finally:
+        file.seek(position)
+
+
+class ResumeExport:
+    """
+    Append-only Parquet dataset of parsed resumes. Several server processes can share a
+    directory: each journals to its own locked file and writes uniquely named parts, and
+    compaction is serialised by a lock file. A journal left by a process that died is
+    written out by the next one to open the directory.
+    """
+
+    def __init__(self, directory: str, flush_rows: int = 1000, flush_seconds: float = 60,
+                 compact_files: int = 16):
+        if pa is None:
+            raise ImportError("pyarrow is required for the resume export. Please install it with: pip install pyarrow")
+        self.directory = directory
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self.compact_files = compact_files
+        self.schema = export_schema()
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        # Held while automatic compaction runs, so one thread does that at a time
+        self._compacting = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._journal_path = os.path.join(directory, f".pending-{uuid.uuid4().hex}.jsonl")
+        self._journal = open(self._journal_path, "a", encoding='utf-8')
+        lock_file(self._journal)
+
+    @property
+    def buffered(self) -> int:
+        return len(self._rows)
+
+    def _recover(self):
+        """Write out journals whose process is gone; a live process still holds its lock"""
+        recovered = 0
+        for path in glob.glob(os.path.join(self.directory, ".pending-*.jsonl")):
+            try:
+                journal = open(path, "r+", encoding='utf-8')
+            except FileNotFoundError:
+                continue  # Recovered by another process since the listing
+            with journal:
+                if not lock_file(journal):
+                    continue
+                rows = []
+                for line in journal:
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # A write cut short by a crash; everything before it is intact
+                self._write_rows(rows)
+                if fcntl is not None:
+                    os.unlink(path)
+            if fcntl is None:
+                # Windows can't delete an open file. A process locking it in between writes the rows
+                # again, and compaction keeps one row per doc_id.
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            recovered += len(rows)
+        if recovered:
+            logger.info("Resume export recovered %d journaled rows", recovered)
+
+    # Appends
+
+    def append(self, doc_id: str, filename: str, result: Dict[str, Any]):
+        """Journal one parsed result, writing a part file once enough rows are buffered"""
+        row = export_row(doc_id, filename, result)
+        with self._lock:
+            self._journal.write(json.dumps(row) + "\n")
+            self._journal.flush()
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._rows) >= self.flush_rows:
+                self._flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds:
+                self._flush()
+
+    def flush(self):
+        """Write buffered rows out, making them visible to readers"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        partitions = self._write_rows(self._rows)
+        self._rows = []
+        self._oldest = None
+        self._journal.seek(0)
+        self._journal.truncate()
+        crowded = [partition for partition in partitions if len(self._part_files(partition)) >= self.compact_files]
+        # A partition still crowded while a compaction runs is picked up by a later flush
+        if self.compact_files and crowded and self._compacting.acquire(blocking=False):
+            threading.Thread(target=self._compact_in_background, args=(crowded,),
+                             name="export-compaction", daemon=True).start()
+
+    def _compact_in_background(self, partitions: List[str]):
+        try:
+            self.compact(partitions)
+        except Exception as e:
+            logger.warning("Resume export compaction failed: %s", e)
+        finally:
+            self._compacting.release()
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> List[str]:
+        by_partition: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_partition.setdefault(partition_of(row["parsed_at"]), []).append(row)
+        for partition, partition_rows in by_partition.items():
+            self._write_part(partition, pa.Table.from_pylist(partition_rows, schema=self.schema))
+        return list(by_partition)
+
+    def _write_part(self, partition: str, table: "pa.Table"):
+        directory = os.path.join(self.directory, partition)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{int(time.time() * 1000):013d}-{uuid.uuid4().hex}.parquet"
+        # Written under a hidden name and renamed, so readers never see a half-written file
+        staging = os.path.join(directory, "." + name)
+        pq.write_table(table, staging, compression="zstd")
+        os.replace(staging, os.path.join(directory, name))
+
+    # Compaction
+
+    def _part_files(self, partition: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, partition, "part-*.parquet")))
+
+    def partitions(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("day=") and os.path.isdir(os.path.join(self.directory, name))
+        )
+
+    @contextmanager
+    def _compaction_lock(self) -> Iterator[None]:
+        with open(os.path.join(self.directory, ".compact.lock"), "w") as lock:
+            lock_file(lock, blocking=True)
+            yield
+
+    def compact(self, partitions: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Rewrite each of the given partitions (all by default) as a single part file,
+        dropping rows superseded by a later row with the same doc_id. A later row has a later
+        parse time, so it is in the same or a later day: only those partitions' keys are read.
+        Returns the number of files and rows in the given partitions before and after.
+        """
+        with self._compaction_lock():
+            existing = self.partitions()
+            targets = sorted(set(existing if partitions is None else partitions).intersection(existing))
+            # Partition names sort by day
+            files = [path for partition in existing if targets and partition >= targets[0]
+                     for path in self._part_files(partition)]
+            target_files = [path for partition in targets for path in self._part_files(partition)]
+            stats = {
+                "files_before": len(target_files),
+                "rows_before": sum(pq.ParquetFile(path).metadata.num_rows for path in target_files),
+            }
+            if not target_files:
+                stats.update(files_after=0, rows_after=0)
+                return stats
+
+            # Latest row per doc_id: order by doc_id, then newest parse, file and row first
+            keys = []
+            for number, path in enumerate(files):
+                table = pq.read_table(path, columns=["doc_id", "parsed_at"])
+                keys.append(table.append_column("file", pa.array([number] * len(table), pa.int32()))
+                                 .append_column("row", pa.array(range(len(table)), pa.int32())))
+            keys = pa.concat_tables(keys)
+            order = pc.sort_indices(keys, sort_keys=[
+                ("doc_id", "ascending"), ("parsed_at", "descending"), ("file", "descending"), ("row", "descending")
+            ])
+            ordered = keys.take(order)
+            doc_ids = ordered.column("doc_id")
+            # A row is the latest for its doc_id when the doc_id differs from the row before it
+            changed = pc.not_equal(doc_ids.slice(1), doc_ids.slice(0, len(doc_ids) - 1))
+            latest = ordered.filter(pa.concat_arrays([pa.array([True]), changed.combine_chunks()]))
+            keep: Dict[int, List[int]] = {}
+            for number, row in zip(latest.column("file").to_pylist(), latest.column("row").to_pylist()):
+                keep.setdefault(number, []).append(row)
+            file_numbers = {path: number for number, path in enumerate(files)}
+
+            for partition in targets:
+                # Parts written since the keys were read are left alone until the next compaction
+                numbers = [file_numbers[path] for path in self._part_files(partition) if path in file_numbers]
+                if not numbers:
+                    continue
+                kept_rows = sum(len(keep.get(number, ())) for number in numbers)
+                total_rows = sum(pq.ParquetFile(files[number]).metadata.num_rows for number in numbers)
+                if len(numbers) == 1 and kept_rows == total_rows:
+                    continue
+                tables = [
+                    pq.read_table(files[number]).take(sorted(keep[number]))
+                    for number in numbers if keep.get(number)
+                ]
+                if tables:
+                    self._write_part(partition, pa.concat_tables(tables))
+                for number in numbers:
+                    os.unlink(files[number])
+
+            remaining = [path for partition in targets for path in self._part_files(partition)]
+            stats["files_after"] = len(remaining)
+            stats["rows_after"] = sum(pq.ParquetFile(path).metadata.num_rows for path in remaining)
+            return stats
+
+    # Reading
+
+    def dataset(self) -> "ds.Dataset":
+        # The partition directory is exposed as a "day" column, so filters on it skip whole partitions
+        schema = self.schema.append(pa.field("day", pa.string()))
+        return ds.dataset(self.directory, format="parquet", partitioning="hive", schema=schema)
+
+    def scan(self, columns: Optional[List[str]] = None, filter: Optional["pc.Expression"] = None) -> "pa.Table":
+        """
+        Flushed rows, with only the requested columns read from disk,
+        e.g. scan(["skills"], pc.field("day") >= "2024-05-01")
+        """
+        return self.dataset().to_table(columns=columns, filter=filter)
+
+    def stats(self) -> Dict[str, Any]:
+        files = [path for partition in self.partitions() for path in self._part_files(partition)]
+        return {
+            "partitions": len(self.partitions()),
+            "files": len(files),
+            # Row counts come from the Parquet footers, so nothing is scanned
+            "rows": sum(pq.ParquetFile(path).metadata.num_rows for path in files),
+            "buffered": self.buffered,
+            "bytes": sum(os.path.getsize(path) for path in files),
+        }
+
+    def close(self):
+        """Flush, wait for a running compaction, then drop this process's journal"""
+        with self._lock:
+            self._flush()
+            self._journal.close()
+            os.unlink(self._journal_path)
+        with self._compacting:
+            pass
+
+
+def create_export_from_env() -> Optional[ResumeExport]:
+    """
+    Build the export from PITCH_EXPORT_DIR (dataset directory, empty to disable),
+    PITCH_EXPORT_FLUSH_ROWS and PITCH_EXPORT_FLUSH_SECONDS (rows, or seconds since the
+    oldest buffered row, before a part file is written) and PITCH_EXPORT_COMPACT_FILES
+    (part files in a partition before it is compacted, 0 to only compact on request).
+    """
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resume_export")
+    directory = os.getenv("PITCH_EXPORT_DIR", default_dir)
+    if not directory:
+        return None
+    try:
+        return ResumeExport(
+            directory,
+            flush_rows=int(os.getenv("PITCH_EXPORT_FLUSH_ROWS", "1000")),
+            flush_seconds=float(os.getenv("PITCH_EXPORT_FLUSH_SECONDS", "60")),
+            compact_files=int(os.getenv("PITCH_EXPORT_COMPACT_FILES", "16")),
+        )
+    except (ImportError, OSError) as e:
+        logger.warning("Resume export disabled, could not open %s: %s", directory, e)
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and compact the parsed-resume export")
+    parser.add_argument("command", choices=("stats", "compact", "scan"))
+    parser.add_argument("--dir", default=os.getenv("PITCH_EXPORT_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "resume_export"
+    ), help="dataset directory")
+    parser.add_argument("--columns", nargs="+", help="columns read by scan")
+    parser.add_argument("--limit", type=int, default=10, help="rows printed by scan")
+    args = parser.parse_args(argv)
+
+    export = ResumeExport(args.dir)
+    try:
+        if args.command == "stats":
+            print(json.dumps(export.stats(), indent=2))
+        elif args.command == "compact":
+            print(json.dumps(export.compact(), indent=2))
+        else:
+            started = time.perf_counter()
+            table = export.scan(args.columns)
+            print(f"{len(table)} rows in {time.perf_counter() - started:.3f}s")
+            for row in table.slice(0, args.limit).to_pylist():
+                print(json.dumps(row, default=str))
+    finally:
+        export.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
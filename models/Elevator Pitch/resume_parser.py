@@ -0,0 +1,536 @@
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from candidate_profile import CandidateProfile
+from resume_pitch_generator import ResumePitchGenerator
+from pitch_templates import DEFAULT_STYLE, get_template
+from metrics import timed_stage
+from skill_dictionary import get_skill_dictionary, rank_matches
+from near_duplicates import minhasher
+
+# Every keyword that can open or close a resume section, matched in one pass
+SECTION_KEYWORD_PATTERN = re.compile(
+    r'\b(education|degree|university|college|school|academic'
+    r'|experience|work|employment|career|professional'
+    r'|skills|technologies|tools|technical|programming'
+    r'|projects|certifications?|certificates?|courses?|training)\b'
+)
+
+# Keywords that start each section, and keywords that end it
+SECTION_HEADINGS = {
+    "education": frozenset(["education", "degree", "university", "college", "school", "academic"]),
+    "experience": frozenset(["experience", "work", "employment", "career", "professional"]),
+    "skills": frozenset(["skills", "technologies", "tools", "technical", "programming"]),
+    "certifications": frozenset(["certifications", "certification", "certificates", "certificate",
+                                 "courses", "course", "training"]),
+}
+
+SECTION_STOPS = {
+    "education": frozenset(["experience", "work", "employment", "skills", "projects", "certifications"]),
+    "experience": frozenset(["education", "skills", "projects", "certifications"]),
+    "skills": frozenset(["education", "experience", "projects", "certifications"]),
+    "certifications": frozenset(["education", "experience", "projects", "skills"]),
+}
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+LETTER_PATTERN = re.compile(r'[a-zA-Z]')
+DEGREE_PATTERN = re.compile(
+    r'\b(B\.?S\.?|M\.?S\.?|Ph\.?D\.?|Bachelor|Master|Doctor|B\.?A\.?|M\.?A\.?|MBA|B\.?Tech|M\.?Tech)\b',
+    re.IGNORECASE
+)
+SCHOOL_PATTERN = re.compile(r'\b(University|College|Institute|School)\b[^,\n]*', re.IGNORECASE)
+JOB_TITLE_PATTERN = re.compile(
+    r'([A-Za-z\s]+(?:Engineer|Developer|Manager|Analyst|Consultant|Specialist|Lead|Senior|Junior))'
+)
+LIST_SEPARATOR_PATTERN = re.compile(r'[,;\n•·]')
+
+SUPPORTED_RESUME_EXTENSIONS = ('.json', '.txt', '.doc', '.docx', '.pdf')
+
+NAME_EXCLUDED_KEYWORDS = ('resume', 'cv', 'curriculum', 'email', 'phone', 'address', '@')
+
+
+class ResumeSections:
+    """Line-level index of a resume's sections, built in a single pass over the text"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split('\n')
+        # (heading line index, end line index exclusive) for every section found
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        self._skill_matches = None
+        self._index()
+
+    def _index(self):
+        lines = self.lines
+        keywords: List[frozenset] = []
+        blank: List[bool] = []
+        for line, lowered in zip(lines, _lower_lines(self.text, len(lines))):
+            keywords.append(frozenset(SECTION_KEYWORD_PATTERN.findall(lowered)))
+            blank.append(not line.strip())
+
+        for i, found in enumerate(keywords):
+            if not found:
+                continue
+            for section, headings in SECTION_HEADINGS.items():
+                if section in self.spans or not (found & headings):
+                    continue
+                stops = SECTION_STOPS[section]
+                j = i + 1
+                # A section runs until a blank line or the heading of another major section
+                while j < len(lines) and not blank[j] and not (keywords[j] & stops):
+                    j += 1
+                self.spans[section] = (i, j)
+            if len(self.spans) == len(SECTION_HEADINGS):
+                break
+
+    def sections_closed(self) -> bool:
+        """
+        True when the name lines, an email and every section have been seen and each section
+        is closed by later content. Appending text can then no longer change the name, email,
+        education, experience or certifications, but it can still change the skills: those
+        are ranked by how often they occur anywhere in the resume.
+        """
+        if len(self.spans) < len(SECTION_HEADINGS) or not EMAIL_PATTERN.search(self.text):
+            return False
+        lines = self.lines
+        first = 0
+        while first < len(lines) and not lines[first].strip():
+            first += 1
+        last = len(lines) - 1
+        while last >= 0 and not lines[last].strip():
+            last -= 1
+        if last < first + 5:
+            return False
+        return all(end <= last for _, end in self.spans.values())
+
+    def skills_in(self, start: int = 0, end: Optional[int] = None) -> List[str]:
+        """
+        Dictionary skills on lines [start, end), ranked by frequency. The whole resume is
+        scanned once, on first use, and every later range is a filter over those matches.
+        """
+        if self._skill_matches is None:
+            # One-letter skills (R, C) only count under the skills heading, or on its line ("Skills: R, SQL")
+            self._skill_matches = get_skill_dictionary().find_lines(self.lines, self.spans.get("skills"))
+        matches, token_lines = self._skill_matches
+        if start == 0 and end is None:
+            return rank_matches(matches)
+        end = len(self.lines) if end is None else end
+        return rank_matches(match for match in matches if start <= token_lines[match.start] < end)
+
+    def section_lines(self, section: str, include_heading: bool = False) -> List[str]:
+        """Return the lines of a section, optionally including its heading line"""
+        span = self.spans.get(section)
+        if span is None:
+            return []
+        start, end = span
+        return self.lines[start if include_heading else start + 1:end]
+
+    def section_text(self, section: str, include_heading: bool = False) -> str:
+        """Return a section's lines joined with a trailing newline each"""
+        lines = self.section_lines(section, include_heading)
+        return "".join(line + "\n" for line in lines)
+
+
+def _lower_lines(text: str, count: int) -> List[str]:
+    """Lowercase the text once and split it into lines aligned with the original"""
+    lowered = text.lower().split('\n')
+    if len(lowered) != count:
+        # Some characters change length when lowercased; fall back to per-line lowering
+        lowered = [line.lower() for line in text.split('\n')]
+    return lowered
+
+
+def _sections(text: str, sections: Optional[ResumeSections]) -> ResumeSections:
+    return sections if sections is not None else ResumeSections(text)
+
+
+def _split_list(section_text: str, max_length: int) -> List[str]:
+    """Split a section into list entries on common separators"""
+    items = [item.strip() for item in LIST_SEPARATOR_PATTERN.split(section_text)]
+    return [item for item in items if 2 <= len(item) <= max_length]
+
+
+def extract_name_from_text(text: str, sections: Optional[ResumeSections] = None) -> str:
+    """Extract candidate name from resume text"""
+    lines = _sections(text, sections).lines
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    for line in lines[start:start + 5]:  # Check first 5 lines
+        line = line.strip()
+        if line and not any(keyword in line.lower() for keyword in NAME_EXCLUDED_KEYWORDS):
+            # Additional check to ensure it looks like a name (not too long, contains letters)
+            if len(line) < 50 and LETTER_PATTERN.search(line):
+                return line
+    return ""
+
+
+def extract_email_from_text(text: str, sections: Optional[ResumeSections] = None) -> str:
+    """Extract email address from resume text"""
+    match = EMAIL_PATTERN.search(text)
+    return match.group(0) if match else ""
+
+
+def extract_education_from_text(text: str, sections: Optional[ResumeSections] = None) -> List[Dict[str, str]]:
+    """Extract education information from resume text"""
+    education_section = _sections(text, sections).section_text("education", include_heading=True)
+
+    # Extract degree information
+    degree_match = DEGREE_PATTERN.search(education_section)
+    degree = degree_match.group(0) if degree_match else ""
+
+    # Try to extract school/university name
+    school_match = SCHOOL_PATTERN.search(education_section)
+    school = school_match.group(0) if school_match else ""
+
+    return [{
+        "degree_type": degree,
+        "school_name": school,
+        "specialization_subjects": "",
+        "end_date": ""
+    }] if degree or school else []
+
+
+def extract_experience_from_text(text: str, sections: Optional[ResumeSections] = None) -> List[Dict[str, Any]]:
+    """Extract work experience from resume text"""
+    sections = _sections(text, sections)
+    experience_section = sections.section_text("experience")
+
+    # Simple extraction - in a real app, you'd want more sophisticated parsing
+    positions = []
+    if experience_section:
+        # Try to identify job titles and companies
+        job_match = JOB_TITLE_PATTERN.search(experience_section)
+
+        positions.append({
+            "position_name": job_match.group(1) if job_match else "",
+            "company_name": "",
+            "start_date": "",
+            "job_details": experience_section.strip(),
+            "skills": sections.skills_in(sections.spans["experience"][0] + 1, sections.spans["experience"][1])
+        })
+
+    return positions
+
+
+def extract_skills_from_text(text: str, sections: Optional[ResumeSections] = None) -> List[str]:
+    """
+    Extract skills from resume text: known skills anywhere in the text, normalised and most
+    frequent first, then entries of the skills section the dictionary doesn't know
+    """
+    sections = _sections(text, sections)
+    skills = sections.skills_in()
+    skills_section = sections.section_text("skills")
+    if skills_section:
+        dictionary = get_skill_dictionary()
+        seen = {skill.lower() for skill in skills}
+        for item in _split_list(skills_section, 50):
+            # Listed under the skills heading, so "excel" here means Excel even in lowercase
+            skill = dictionary.canonical(item) or item
+            if skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+def extract_certifications_from_text(text: str, sections: Optional[ResumeSections] = None) -> List[str]:
+    """Extract certifications from resume text"""
+    certifications_section = _sections(text, sections).section_text("certifications")
+    return _split_list(certifications_section, 100) if certifications_section else []
+
+
+# Result field -> extractor, in response order
+FIELD_EXTRACTORS = (
+    ("candidate_name", extract_name_from_text),
+    ("candidate_email", extract_email_from_text),
+    ("education_qualifications", extract_education_from_text),
+    ("positions", extract_experience_from_text),
+    ("skills", extract_skills_from_text),
+    ("candidate_courses_and_certifications", extract_certifications_from_text),
+)
+
+
+def extract_resume_fields(text: str) -> Dict[str, Any]:
+    """Segment the text once and run every field extractor against the shared index"""
+    sections = ResumeSections(text)
+    return {field: extractor(text, sections) for field, extractor in FIELD_EXTRACTORS}
+
+
+def _digest(lines: List[str]) -> str:
+    return hashlib.sha1("\n".join(lines).encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def extractor_inputs(sections: ResumeSections) -> Dict[str, str]:
+    """
+    A digest of the lines each extractor reads, per result field. A field whose digest
+    matches an earlier revision's would be extracted identically, so it can be reused.
+    """
+    lines = sections.lines
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    return {
+        "candidate_name": _digest(lines[start:start + 5]),
+        # An email never spans lines, so only lines with an @ can change the first match
+        "candidate_email": _digest([line for line in lines if '@' in line]),
+        "education_qualifications": _digest(sections.section_lines("education", include_heading=True)),
+        "positions": _digest(sections.section_lines("experience")),
+        # Skills are ranked by mentions anywhere in the resume
+        "skills": _digest(lines),
+        "candidate_courses_and_certifications": _digest(sections.section_lines("certifications")),
+    }
+
+
+def build_structured_data(text: str) -> Dict[str, Any]:
+    """Wrap the extracted fields in the structure ResumePitchGenerator expects"""
+    return {
+        "data": {
+            "attributes": {
+                "result": extract_resume_fields(text)
+            }
+        }
+    }
+
+
+class ResumeParseError(Exception):
+    """Raised when an uploaded resume cannot be parsed, carrying the HTTP status to report"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def _decode_text(content: bytes) -> str:
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        try:
+            return content.decode('latin-1')
+        except UnicodeDecodeError:
+            raise ResumeParseError("Unable to decode text file")
+
+
+def parse_resume_file(filename: str, content: bytes, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Parse an uploaded resume and return the /parse-resume response body.
+    JSON files are passed through, TXT/DOCX/PDF files are extracted and pitched.
+    When a timings dict is passed, seconds spent per stage are added to it.
+    """
+    if filename.endswith('.json'):
+        try:
+            with timed_stage(timings, "decode"):
+                resume_data = json.loads(content.decode('utf-8'))
+        except json.JSONDecodeError as e:
+            raise ResumeParseError(f"Invalid JSON format: {str(e)}")
+        return {
+            "success": True,
+            "data": resume_data,
+            "message": "Resume parsed successfully"
+        }
+
+    return parse_resume_text(extract_resume_text(filename, content, timings), timings)
+
+
+def extract_resume_text(filename: str, content: bytes, timings: Optional[Dict[str, float]] = None) -> str:
+    """Plain text of a TXT/DOCX/PDF upload"""
+    if filename.endswith('.txt'):
+        with timed_stage(timings, "decode"):
+            return _decode_text(content)
+    if filename.endswith(('.doc', '.docx')):
+        # Imported here because the DOCX and PDF stages raise ResumeParseError defined above
+        from docx_extract import extract_docx_text
+        with timed_stage(timings, "text_extraction"):
+            return extract_docx_text(content)
+    if filename.endswith('.pdf'):
+        # Imported here because the PDF stage builds on the section index defined above
+        from pdf_extract import extract_pdf_text
+        with timed_stage(timings, "text_extraction"):
+            return extract_pdf_text(content)
+    raise ResumeParseError("Unsupported file format. Please upload JSON, TXT, PDF, DOC, or DOCX files.")
+
+
+def parse_resume_text(text_content: str, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Extract fields from resume text and pitch them, as the /parse-resume response body"""
+    # Create a structured data format with the extracted information
+    with timed_stage(timings, "field_extraction"):
+        structured_data = build_structured_data(text_content)
+
+    # Generate pitch from the structured data
+    with timed_stage(timings, "pitch_generation"):
+        profile = CandidateProfile.from_result(structured_data["data"]["attributes"]["result"])
+        generator = ResumePitchGenerator(profile)
+        pitch = generator.generate_pitch()
+
+    return {
+        "success": True,
+        "data": structured_data,
+        "pitch": pitch,
+        "message": "Resume parsed successfully"
+    }
+
+
+def reparse_resume_text(
+    text_content: str, previous: Optional[Dict[str, Any]] = None, timings: Optional[Dict[str, float]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Parse a revised resume against the revision stored for its previous version.
+
+    Only extractors whose input lines changed are run, and the pitch is rendered again only
+    when a value it shows changed. Returns the /parse-resume response body, a summary of
+    the changes, and the new revision to store for the next upload.
+    """
+    previous = previous or {}
+    old_inputs = previous.get("inputs", {})
+    old_result = previous.get("result", {})
+    with timed_stage(timings, "field_extraction"):
+        sections = ResumeSections(text_content)
+        inputs = extractor_inputs(sections)
+        result: Dict[str, Any] = {}
+        reparsed: List[str] = []
+        for field, extractor in FIELD_EXTRACTORS:
+            if field in old_result and old_inputs.get(field) == inputs[field]:
+                result[field] = old_result[field]
+            else:
+                result[field] = extractor(text_content, sections)
+                reparsed.append(field)
+
+    with timed_stage(timings, "pitch_generation"):
+        view = ResumePitchGenerator.pitch_view(CandidateProfile.from_result(result))
+        pitch_changed = view != previous.get("view")
+        pitch = get_template(DEFAULT_STYLE).render(view) if pitch_changed else previous["pitch"]
+
+    body = {
+        "success": True,
+        "data": {"data": {"attributes": {"result": result}}},
+        "pitch": pitch,
+        "message": "Resume parsed successfully"
+    }
+    changes = {
+        "changed_fields": [field for field, _ in FIELD_EXTRACTORS if result[field] != old_result.get(field)],
+        "reparsed_fields": reparsed,
+        "pitch_changed": pitch_changed,
+        "pitch_fields_changed": [key for key, value in view.items() if value != previous.get("view", {}).get(key)],
+    }
+    revision = {"inputs": inputs, "result": result, "view": view, "pitch": pitch}
+    return body, changes, revision
+
+
+def generate_pitch_from_content(
+    content: bytes, style: str = DEFAULT_STYLE, timings: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Generate a pitch from uploaded bytes holding either resume JSON or plain text"""
+    # Try to parse as JSON first
+    with timed_stage(timings, "decode"):
+        try:
+            resume_data = json.loads(content.decode('utf-8'))
+            profile = CandidateProfile(resume_data)
+        except json.JSONDecodeError:
+            # If not JSON, treat as plain text
+            text_content = content.decode('utf-8')
+            profile = CandidateProfile({"text": text_content})
+
+    with timed_stage(timings, "pitch_generation"):
+        generator = ResumePitchGenerator(profile)
+        pitch = generator.generate_pitch(style)
+
+    return {
+        "success": True,
+        "pitch": pitch,
+        "word_count": len(pitch.split()) if pitch else 0
+    }
+
+
+def parse_resume_timed(filename: str, content: bytes) -> Tuple[Dict[str, Any], Dict[str, float], Optional[str]]:
+    """
+    parse_resume_file for worker processes: returns the result with its stage timings
+    and the extracted text (None for JSON uploads), for indexing in the main process
+    """
+    timings: Dict[str, float] = {}
+    if filename.endswith('.json'):
+        return parse_resume_file(filename, content, timings), timings, None
+    text_content = extract_resume_text(filename, content, timings)
+    return parse_resume_text(text_content, timings), timings, text_content
+
+
+def resume_owner(text: str) -> str:
+    """Who a resume belongs to: its email, else its name line, lowercased"""
+    sections = ResumeSections(text)
+    return (extract_email_from_text(text, sections) or extract_name_from_text(text, sections)).lower()
+
+
+def fingerprint_resume(filename: str, content: bytes) -> Tuple[str, Any, str, Dict[str, float]]:
+    """
+    First half of parsing for worker processes: the extracted text, its MinHash signature
+    and owner, so the main process can check for a near-duplicate before parsing the fields
+    """
+    timings: Dict[str, float] = {}
+    text_content = extract_resume_text(filename, content, timings)
+    with timed_stage(timings, "fingerprint"):
+        signature = minhasher.signature(text_content)
+        owner = resume_owner(text_content)
+    return text_content, signature, owner, timings
+
+
+def reparse_resume_timed(
+    filename: str, content: bytes, previous: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, float], str]:
+    """reparse_resume_text of an upload for worker processes, with stage timings and the extracted text"""
+    timings: Dict[str, float] = {}
+    text_content = extract_resume_text(filename, content, timings)
+    body, changes, revision = reparse_resume_text(text_content, previous, timings)
+    return body, changes, revision, timings, text_content
+
+
+def parse_resume_text_timed(text_content: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Second half of parsing for worker processes: parse_resume_text with its stage timings"""
+    timings: Dict[str, float] = {}
+    return parse_resume_text(text_content, timings), timings
+
+
+def generate_pitch_from_content_timed(content: bytes, style: str = DEFAULT_STYLE) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """generate_pitch_from_content for worker processes: returns the result with its stage timings"""
+    timings: Dict[str, float] = {}
+    return generate_pitch_from_content(content, style, timings), timings
+
+
+def parse_resume_batch_item(index: int, filename: str, content: bytes) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Parse one resume of a batch, turning failures into a per-file error entry"""
+    timings: Dict[str, float] = {}
+    try:
+        result = parse_resume_file(filename, content, timings)
+    except ResumeParseError as e:
+        return {"index": index, "filename": filename, "success": False, "status_code": e.status_code,
+                "error": e.detail, "error_class": type(e).__name__}, timings
+    except Exception as e:
+        return {"index": index, "filename": filename, "success": False, "status_code": 500,
+                "error": f"Error parsing resume: {str(e)}", "error_class": type(e).__name__}, timings
+    result["index"] = index
+    result["filename"] = filename
+    return result, timings
+
+
+def iter_zip_resumes(content: bytes, max_entry_bytes: Optional[int] = None) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Yield (filename, bytes) for every file in a zip archive, reading entries lazily.
+    Entries larger than max_entry_bytes are yielded with None instead of being decompressed.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile as e:
+        raise ResumeParseError(f"Invalid zip archive: {str(e)}")
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            # Skip directories and macOS resource forks
+            if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('._'):
+                continue
+            if max_entry_bytes is not None and info.file_size > max_entry_bytes:
+                yield name, None
+                continue
+            yield name, archive.read(info)
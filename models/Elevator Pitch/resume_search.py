@@ -0,0 +1,554 @@
+import json
+import math
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so the directory lock is skipped
+    fcntl = None
+
+from service_logging import logger
+from skill_dictionary import tokenize
+
+# Indexed fields and how much a match in each counts towards the score (BM25F)
+FIELD_BOOSTS: Dict[str, float] = {
+    "skills": 3.0,
+    "title": 2.5,
+    "school": 2.0,
+    "name": 2.0,
+    "body": 1.0,
+}
+FIELDS: Tuple[str, ...] = tuple(FIELD_BOOSTS)
+BOOSTS = np.array([FIELD_BOOSTS[field] for field in FIELDS], dtype=np.float32)
+
+# Standard BM25 parameters: term-frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEGMENT_ARRAYS = ("offsets", "postings_docs", "postings_tf", "numbers", "doc_lengths")
+# Segments of about the same size are merged once there are this many of them
+MERGE_FACTOR = 10
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercase search terms of the text; the skill tokenizer keeps c++, c#, node.js intact"""
+    return [token.lower() for token in tokenize(text)]
+
+
+def search_fields(result: Dict[str, Any], text: Optional[str] = None) -> Dict[str, str]:
+    """The indexed fields of a parsed resume: the extracted result plus the full text when known"""
+    education = (result.get('education_qualifications') or [{}])[0] or {}
+    positions = result.get('positions') or []
+    title = " ".join(position.get('position_name', '') for position in positions[:3])
+    if text is None:
+        # JSON uploads and cache hits have no extracted text, so index what the result holds
+        text = " ".join(
+            [position.get('job_details', '') for position in positions]
+            + list(result.get('candidate_courses_and_certifications') or [])
+        )
+    return {
+        "skills": " ".join(result.get('skills') or []),
+        "title": title,
+        "school": " ".join(filter(None, [education.get('school_name', ''), education.get('degree_type', '')])),
+        "name": result.get('candidate_name', '') or '',
+        "body": text,
+    }
+
+
+def _term_frequencies(fields: Dict[str, str]) -> Tuple[Dict[str, List[float]], List[float]]:
+    """Per-field frequencies of every term in the document, and each field's length in terms"""
+    frequencies: Dict[str, List[float]] = {}
+    lengths = []
+    for field_number, field in enumerate(FIELDS):
+        terms = analyze(fields.get(field) or "")
+        lengths.append(float(len(terms)))
+        for term in terms:
+            tf = frequencies.get(term)
+            if tf is None:
+                tf = frequencies[term] = [0.0] * len(FIELDS)
+            tf[field_number] += 1
+    return frequencies, lengths
+
+
+class IndexLocked(OSError):
+    """The index directory is already open in another process"""
+
+
+class _Segment:
+    """
+    Immutable postings for a set of documents: term -> slice of the postings arrays. Document
+    numbers are shared by the whole index and never reused, so a document is in one segment only.
+    """
+
+    __slots__ = ("name", "terms", "offsets", "postings_docs", "postings_tf", "numbers")
+
+    def __init__(self, name: str, terms: Dict[str, int], offsets: np.ndarray, postings_docs: np.ndarray,
+                 postings_tf: np.ndarray, numbers: np.ndarray):
+        self.name = name
+        self.terms = terms
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.numbers = numbers
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        number = self.terms.get(term)
+        if number is None:
+            return None
+        start, end = self.offsets[number], self.offsets[number + 1]
+        return np.asarray(self.postings_docs[start:end]), np.asarray(self.postings_tf[start:end])
+
+
+def _build_segment(name: str, postings: Dict[str, Tuple[np.ndarray, np.ndarray]], numbers: np.ndarray) -> _Segment:
+    terms = sorted(postings)
+    counts = np.array([len(postings[term][0]) for term in terms], dtype=np.int64)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    postings_docs = np.concatenate([postings[term][0] for term in terms]) if terms else np.zeros(0, np.int32)
+    postings_tf = (
+        np.concatenate([postings[term][1] for term in terms]) if terms else np.zeros((0, len(FIELDS)), np.float32)
+    )
+    return _Segment(name, {term: number for number, term in enumerate(terms)}, offsets,
+                    postings_docs.astype(np.int32), postings_tf.astype(np.float32), numbers.astype(np.int64))
+
+
+class ResumeSearchIndex:
+    """
+    BM25F inverted index over parsed resumes.
+
+    Documents live in persisted, immutable segments of flat NumPy arrays, opened with
+    mmap_mode='r' so a restart maps the files instead of rebuilding anything, plus an
+    in-memory delta for documents added since. Every change is appended to a journal,
+    replayed on load. Every `compact_every` additions the delta becomes a new small segment,
+    and once MERGE_FACTOR segments of about the same size exist they are merged into one,
+    so each document is rewritten a logarithmic number of times. Merges run outside the lock
+    searches take. Replaced and removed documents are tombstoned until their segment is merged.
+
+    A directory is used by one process at a time; it is locked while the index is open.
+    """
+
+    def __init__(self, directory: Optional[str] = None, compact_every: int = 500):
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        # Held while the delta is written out and segments are merged, so one thread does that at a time
+        self._maintenance = threading.Lock()
+        self._directory_lock = None
+
+        self._segments: List[_Segment] = []
+        self._next_segment = 0
+
+        # Delta segment: term -> [(doc, per-field term frequencies)], and the delta being written out
+        self._delta: Dict[str, List[Tuple[int, Tuple[float, ...]]]] = {}
+        self._delta_numbers: List[int] = []
+        self._frozen: Dict[str, List[Tuple[int, Tuple[float, ...]]]] = {}
+        self._frozen_numbers: List[int] = []
+
+        # Per document number: stored fields for results (None once removed), field lengths,
+        # and whether the document is live
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._lengths = np.zeros((1024, len(FIELDS)), dtype=np.float32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._doc_of: Dict[str, int] = {}
+        self._tombstones: Set[int] = set()
+        self._length_totals = np.zeros(len(FIELDS), dtype=np.float64)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._lock_directory()
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_of
+
+    # Persistence
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _lock_directory(self):
+        # Two processes appending to one journal and rewriting one manifest would corrupt both
+        self._directory_lock = open(self._path(".lock"), "w")
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._directory_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._directory_lock.close()
+            raise IndexLocked(f"{self.directory} is open in another process")
+
+    def _load(self):
+        names: List[str] = []
+        tombstones: List[int] = []
+        if os.path.exists(self._path("manifest.json")):
+            with open(self._path("manifest.json"), encoding='utf-8') as f:
+                manifest = json.load(f)
+            names, tombstones = manifest["segments"], manifest["tombstones"]
+            self._next_segment = manifest["next_segment"]
+        elif os.path.exists(self._path(os.path.join("segment", "terms.json"))):
+            names = ["segment"]  # Single-segment layout written before segments were merged by size
+
+        for name in names:
+            segment, docs, lengths = self._open_segment(name)
+            self._segments.append(segment)
+            numbers = segment.numbers.tolist()
+            self._ensure_rows(max(numbers, default=-1) + 1)
+            for number, doc in zip(numbers, docs):
+                self._docs[number] = doc
+            self._lengths[segment.numbers] = lengths
+            self._live[segment.numbers] = True
+        for number in tombstones:
+            # Only documents of a loaded segment; anything else is rebuilt by the journal replay
+            if number >= len(self._docs) or not self._live[number]:
+                continue
+            self._docs[number] = None
+            self._live[number] = False
+            self._tombstones.add(number)
+        for number, doc in enumerate(self._docs):
+            if doc is not None:
+                self._doc_of[doc["id"]] = number
+                self._length_totals += self._lengths[number]
+
+        # Segments and staging directories a crash left behind
+        for name in os.listdir(self.directory):
+            if (name.startswith("seg-") and name not in names) or name.endswith(".tmp"):
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+        journal = self._path("journal.jsonl")
+        self._fold_journals()
+        if os.path.exists(journal):
+            replayed = 0
+            with open(journal, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # A write cut short by a crash; everything before it is intact
+                    if entry.get("op") == "remove":
+                        self._remove(entry["id"])
+                    else:
+                        self._insert(entry["id"], *_term_frequencies(entry["fields"]), entry.get("meta") or {})
+                    replayed += 1
+            logger.info("Search index loaded %d documents in %d segments, replayed %d journal entries",
+                        len(self), len(self._segments), replayed)
+
+    def _fold_journals(self):
+        """
+        Journals set aside for a delta that a crash kept from becoming a segment are older than
+        journal.jsonl; put them in front of it, so one journal replays in order
+        """
+        set_aside = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith("journal-seg-") and name.endswith(".jsonl"))
+        if not set_aside:
+            return
+        staging = self._path("journal.jsonl.tmp")
+        with open(staging, "wb") as out:
+            for name in set_aside + ["journal.jsonl"]:
+                if os.path.exists(self._path(name)):
+                    with open(self._path(name), "rb") as f:
+                        content = f.read()
+                    # A line cut short by a crash would swallow the first entry of the next journal
+                    out.write(content if not content or content.endswith(b"\n") else content[:content.rfind(b"\n") + 1])
+        os.replace(staging, self._path("journal.jsonl"))
+        for name in set_aside:
+            os.remove(self._path(name))
+
+    def _open_segment(self, name: str) -> Tuple[_Segment, List[Dict[str, Any]], np.ndarray]:
+        path = self._path(name)
+        with open(os.path.join(path, "terms.json"), encoding='utf-8') as f:
+            terms = {term: number for number, term in enumerate(json.load(f))}
+        with open(os.path.join(path, "docs.json"), encoding='utf-8') as f:
+            docs = json.load(f)
+        arrays = {
+            array: np.load(os.path.join(path, f"{array}.npy"), mmap_mode='r')
+            for array in SEGMENT_ARRAYS if os.path.exists(os.path.join(path, f"{array}.npy"))
+        }
+        numbers = np.asarray(arrays["numbers"]) if "numbers" in arrays else np.arange(len(docs), dtype=np.int64)
+        segment = _Segment(name, terms, arrays["offsets"], arrays["postings_docs"], arrays["postings_tf"], numbers)
+        return segment, docs, np.asarray(arrays["doc_lengths"])
+
+    def _write_segment(self, segment: _Segment, docs: List[Dict[str, Any]], lengths: np.ndarray) -> _Segment:
+        """Persist a segment and reopen it memory-mapped, so memory stays flat as the index grows"""
+        # Written to a staging directory and renamed, so a crash never leaves a half-written segment
+        staging = self._path(segment.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        with open(os.path.join(staging, "terms.json"), "w", encoding='utf-8') as f:
+            json.dump(sorted(segment.terms, key=segment.terms.get), f)
+        with open(os.path.join(staging, "docs.json"), "w", encoding='utf-8') as f:
+            json.dump(docs, f)
+        arrays = (segment.offsets, segment.postings_docs, segment.postings_tf, segment.numbers, lengths)
+        for name, array in zip(SEGMENT_ARRAYS, arrays):
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+        os.rename(staging, self._path(segment.name))
+        return self._open_segment(segment.name)[0]
+
+    def _write_manifest(self):
+        """Record the live segments and their tombstones; the manifest is what a restart loads"""
+        if not self.directory:
+            return
+        # Documents of the delta are in no segment yet; the journal replays their removals
+        unsaved = set(self._delta_numbers).union(self._frozen_numbers)
+        staging = self._path("manifest.json.tmp")
+        with open(staging, "w", encoding='utf-8') as f:
+            json.dump({
+                "segments": [segment.name for segment in self._segments],
+                "tombstones": sorted(self._tombstones.difference(unsaved)),
+                "next_segment": self._next_segment,
+            }, f)
+        os.replace(staging, self._path("manifest.json"))
+
+    def _delete_segments(self, segments: List[_Segment]):
+        if self.directory:
+            for segment in segments:
+                shutil.rmtree(self._path(segment.name), ignore_errors=True)
+
+    def _journal(self, entry: Dict[str, Any]):
+        if self.directory:
+            with open(self._path("journal.jsonl"), "a", encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _segment_name(self) -> str:
+        self._next_segment += 1
+        return f"seg-{self._next_segment:08d}"
+
+    def _persist(self, segment: _Segment, docs: List[Dict[str, Any]], lengths: np.ndarray) -> _Segment:
+        return self._write_segment(segment, docs, lengths) if self.directory else segment
+
+    def _write_delta(self):
+        """
+        Turn the delta into a new segment. The delta is frozen and its journal set aside under
+        the lock; the segment is built and written outside it, while searches still see the
+        frozen delta, and swapped in under the lock again.
+        """
+        with self._lock:
+            if not self._delta_numbers:
+                return
+            delta, covered = self._delta, np.array(self._delta_numbers, dtype=np.int64)
+            self._frozen, self._delta, self._delta_numbers = delta, {}, []
+            self._frozen_numbers = covered.tolist()
+            # A copy: documents removed from here on keep their postings and tombstones
+            dead = ~self._live[:len(self._docs)]
+            numbers = covered[~dead[covered]]
+            docs = [self._docs[number] for number in numbers.tolist()]
+            lengths = self._lengths[numbers]
+            name = self._segment_name()
+            journal = None
+            if self.directory and os.path.exists(self._path("journal.jsonl")):
+                journal = self._path(f"journal-{name}.jsonl")
+                os.replace(self._path("journal.jsonl"), journal)
+
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in delta.items():
+            term_docs = np.array([doc for doc, _ in entries], dtype=np.int32)
+            keep = ~dead[term_docs]
+            if keep.any():
+                postings[term] = (term_docs[keep], np.array([tf for _, tf in entries], dtype=np.float32)[keep])
+        segment = self._persist(_build_segment(name, postings, numbers), docs, lengths)
+
+        with self._lock:
+            self._segments.append(segment)
+            self._frozen, self._frozen_numbers = {}, []
+            self._tombstones.difference_update(covered[dead[covered]].tolist())
+            self._write_manifest()
+        if journal:
+            os.remove(journal)
+
+    def _merge_candidates(self) -> List[_Segment]:
+        """MERGE_FACTOR segments from the smallest size tier that has that many, else none"""
+        tiers: Dict[int, List[_Segment]] = {}
+        for segment in self._segments:
+            size = max(len(segment), 1) / max(self.compact_every, 1)
+            tiers.setdefault(int(math.log(size, MERGE_FACTOR)) if size > 1 else 0, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= MERGE_FACTOR:
+                return tiers[tier][:MERGE_FACTOR]
+        return []
+
+    def _merge_due(self):
+        """Merge segments tier by tier until no tier is full, outside the lock searches take"""
+        while True:
+            with self._lock:
+                group = self._merge_candidates()
+                if not group:
+                    return
+                covered = np.concatenate([segment.numbers for segment in group])
+                dead = ~self._live[:len(self._docs)]
+                numbers = covered[~dead[covered]]
+                docs = [self._docs[number] for number in numbers.tolist()]
+                lengths = self._lengths[numbers]
+                name = self._segment_name()
+
+            # Segments are immutable, so they are read while searches carry on
+            postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+            for term in set().union(*(segment.terms for segment in group)):
+                parts = [part for part in (segment.postings(term) for segment in group) if part is not None]
+                term_docs = np.concatenate([part[0] for part in parts])
+                keep = ~dead[term_docs]
+                if keep.any():
+                    postings[term] = (term_docs[keep], np.concatenate([part[1] for part in parts])[keep])
+            merged = self._persist(_build_segment(name, postings, numbers), docs, lengths)
+
+            with self._lock:
+                self._segments = [segment for segment in self._segments if segment not in group] + [merged]
+                self._tombstones.difference_update(covered[dead[covered]].tolist())
+                self._write_manifest()
+            self._delete_segments(group)
+
+    def _maintain(self):
+        try:
+            self._write_delta()
+            self._merge_due()
+        except Exception as e:
+            logger.warning("Search index maintenance failed: %s", e)
+        finally:
+            self._maintenance.release()
+
+    def compact(self):
+        """Write the delta out as a segment and run any merges that are due"""
+        self._maintenance.acquire()  # Waits for background maintenance already running
+        self._maintain()
+
+    def close(self):
+        """Compact, then release the directory to the next process"""
+        self.compact()
+        if self._directory_lock is not None:
+            self._directory_lock.close()
+            self._directory_lock = None
+
+    # Updates
+
+    def add(self, doc_id: str, fields: Dict[str, str], meta: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any earlier version with the same id"""
+        # Text is analysed before taking the lock, so searches don't wait for it
+        frequencies, lengths = _term_frequencies(fields)
+        with self._lock:
+            self._insert(doc_id, frequencies, lengths, meta or {})
+            self._journal({"id": doc_id, "fields": fields, "meta": meta or {}})
+            due = bool(self.compact_every) and len(self._delta_numbers) >= self.compact_every
+        # Segments are written and merged in the background; while that runs the delta keeps growing
+        if due and self._maintenance.acquire(blocking=False):
+            threading.Thread(target=self._maintain, name="search-index-maintenance", daemon=True).start()
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(doc_id)
+            if removed:
+                self._journal({"op": "remove", "id": doc_id})
+            return removed
+
+    def _ensure_rows(self, size: int):
+        if size > len(self._lengths):
+            grown = np.zeros((max(size, 2 * len(self._lengths)), len(FIELDS)), dtype=np.float32)
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
+            self._live = np.concatenate([self._live, np.zeros(len(grown) - len(self._live), dtype=bool)])
+        if size > len(self._docs):
+            self._docs.extend([None] * (size - len(self._docs)))
+
+    def _insert(self, doc_id: str, frequencies: Dict[str, List[float]], lengths: List[float], meta: Dict[str, Any]):
+        self._remove(doc_id)
+        number = len(self._docs)
+        for term, tf in frequencies.items():
+            self._delta.setdefault(term, []).append((number, tuple(tf)))
+        self._ensure_rows(number + 1)
+        self._lengths[number] = lengths
+        self._docs[number] = {"id": doc_id, **meta}
+        self._live[number] = True
+        self._delta_numbers.append(number)
+        self._doc_of[doc_id] = number
+        self._length_totals += lengths
+
+    def _remove(self, doc_id: str) -> bool:
+        number = self._doc_of.pop(doc_id, None)
+        if number is None:
+            return False
+        # Tombstone: postings stay until their segment is merged, but the document no longer scores
+        self._docs[number] = None
+        self._live[number] = False
+        self._tombstones.add(number)
+        self._length_totals -= self._lengths[number]
+        return True
+
+    # Search
+
+    def _term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        docs, tfs = [], []
+        for segment in self._segments:
+            part = segment.postings(term)
+            if part is not None:
+                docs.append(part[0])
+                tfs.append(part[1])
+        for delta in (self._frozen.get(term), self._delta.get(term)):
+            if delta:
+                docs.append(np.array([doc for doc, _ in delta], dtype=np.int32))
+                tfs.append(np.array([tf for _, tf in delta], dtype=np.float32))
+        if not docs:
+            return np.zeros(0, dtype=np.int32), np.zeros((0, len(FIELDS)), dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def search(self, query: str, page: int = 1, size: int = 10) -> Dict[str, Any]:
+        """BM25F-ranked documents for the query, one page at a time"""
+        with self._lock:
+            terms = list(dict.fromkeys(analyze(query)))
+            live_count = len(self._doc_of)
+            if not terms or not live_count:
+                return {"total": 0, "page": page, "size": size, "results": []}
+
+            lengths = self._lengths
+            average = np.maximum(self._length_totals / live_count, 1.0).astype(np.float32)
+            scores = np.zeros(len(self._docs), dtype=np.float32)
+            for term in terms:
+                docs, tfs = self._term_postings(term)
+                if self._tombstones:
+                    live = self._live[docs]
+                    docs, tfs = docs[live], tfs[live]
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (live_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = (1 - BM25_B) + BM25_B * lengths[docs] / average
+                weighted = (tfs * BOOSTS / norm).sum(axis=1)
+                scores[docs] += idf * weighted * (BM25_K1 + 1) / (weighted + BM25_K1)
+
+            hits = np.flatnonzero(scores)
+            wanted = page * size
+            if len(hits) > wanted:
+                hits = hits[np.argpartition(scores[hits], -wanted)[-wanted:]]
+            ranked = hits[np.argsort(-scores[hits], kind='stable')][(page - 1) * size:wanted]
+            return {
+                "total": int(np.count_nonzero(scores)),
+                "page": page,
+                "size": size,
+                "results": [{**self._docs[number], "score": round(float(scores[number]), 4)} for number in ranked.tolist()],
+            }
+
+
+def create_search_index_from_env() -> ResumeSearchIndex:
+    """
+    Build the service index from PITCH_SEARCH_INDEX_DIR (directory for the segment files,
+    empty to keep the index in memory only) and PITCH_SEARCH_COMPACT_EVERY (documents
+    added before the delta is written out as a segment). When another process already has
+    the directory open, this one keeps an in-memory index.
+    """
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index")
+    directory = os.getenv("PITCH_SEARCH_INDEX_DIR", default_dir)
+    compact_every = int(os.getenv("PITCH_SEARCH_COMPACT_EVERY", "500"))
+    try:
+        return ResumeSearchIndex(directory or None, compact_every)
+    except IndexLocked as e:
+        logger.warning("Search index %s; this process keeps an in-memory index", e)
+        return ResumeSearchIndex(None, compact_every)
+    except (OSError, ValueError) as e:
+        logger.warning("Search index persistence disabled, could not open %s: %s", directory, e)
+        return ResumeSearchIndex(None, compact_every)
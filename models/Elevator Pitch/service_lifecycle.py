@@ -0,0 +1,178 @@
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from types import FrameType
+from typing import Any, Callable, Dict, Optional
+
+import uvicorn
+from uvicorn.main import STARTUP_FAILURE
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from service_logging import logger
+
+
+class ReadinessState:
+    """Whether the service should receive traffic: only after warm-up and until draining starts"""
+
+    def __init__(self):
+        self.warmed_up = False
+        self.draining = False
+        self.warmup_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and not self.draining
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = "draining" if self.draining else "ready" if self.warmed_up else "warming_up"
+        return {"status": status, "warmup_seconds": self.warmup_seconds}
+
+
+def warm_up_parsers() -> float:
+    """
+    Import the optional document libraries and run every parsing path once, so the
+    first real request doesn't pay for imports, regex compilation or template setup.
+    Returns the seconds spent.
+    """
+    start = time.perf_counter()
+    from resume_corpus import generate_corpus
+    from resume_parser import parse_resume_file
+
+    document = generate_corpus(1, seed=0, layouts=('short',))[0]
+    for fmt in ('txt', 'docx', 'pdf'):
+        try:
+            parse_resume_file(document.filename(fmt), document.render(fmt))
+        except Exception as e:
+            # A missing optional library only disables that format; the service still starts
+            logger.warning("Warm-up of %s parsing failed: %s", fmt, e)
+    return time.perf_counter() - start
+
+
+def warm_up_worker() -> int:
+    """Run in each pool worker so it is started and warmed before traffic arrives"""
+    warm_up_parsers()
+    return os.getpid()
+
+
+async def wait_for_drain(pool, timeout: float, interval: float = 0.1) -> bool:
+    """Wait until the pool has no jobs left, for at most `timeout` seconds"""
+    deadline = time.monotonic() + timeout
+    while pool.in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+    return not pool.in_flight
+
+
+# Set by drain_on_sigterm in each server process; DrainingServer runs it on the first SIGTERM
+_sigterm_drain: Optional[Callable[[Callable[[], None]], None]] = None
+
+
+def drain_on_sigterm(readiness: ReadinessState, pool, delay: float, timeout: float):
+    """
+    Have the first SIGTERM turn /ready red while the server still accepts connections, and shut
+    uvicorn down only after `delay` seconds (so load balancers see the red probe and stop routing
+    here) and once the pool is idle or `timeout` has passed. Call from a startup hook; it applies
+    when the app is served by run_server, whose DrainingServer hands SIGTERM to it.
+    """
+    global _sigterm_drain
+    loop = asyncio.get_running_loop()
+    drain_tasks = []  # Holds the task, which the loop only references weakly
+
+    async def drain_then_exit(shutdown: Callable[[], None]):
+        await asyncio.sleep(delay)
+        if not await wait_for_drain(pool, timeout):
+            logger.warning("Closing the listener with %d jobs still in the worker pool", pool.in_flight)
+        shutdown()
+
+    def start_drain(shutdown: Callable[[], None]):
+        readiness.draining = True
+        logger.info("SIGTERM received, draining for %.0fs before closing the listener", delay)
+        loop.call_soon_threadsafe(lambda: drain_tasks.append(loop.create_task(drain_then_exit(shutdown))))
+
+    _sigterm_drain = start_drain
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn.Server that hands the first SIGTERM to the drain set up by drain_on_sigterm and
+    only shuts down once that finishes; a second SIGTERM, or any other signal, shuts down at
+    once. uvicorn 0.24 delivers signals through loop.add_signal_handler, so replacing the
+    process's SIGTERM handler would not hold its shutdown back; this hook is called either way.
+    """
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self.draining = False
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if sig != signal.SIGTERM or self.draining or self.should_exit or _sigterm_drain is None:
+            super().handle_exit(sig, frame)
+            return
+        self.draining = True
+        _sigterm_drain(lambda: super(DrainingServer, self).handle_exit(sig, frame))
+
+
+def _importable(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def production_server_options() -> Dict[str, Any]:
+    """
+    uvicorn.run options for production: no reloader, PITCH_SERVER_WORKERS processes,
+    uvloop and httptools when installed, and PITCH_DRAIN_SECONDS to finish in-flight requests.
+    """
+    options = {
+        "host": os.getenv("PITCH_HOST", "0.0.0.0"),
+        "port": int(os.getenv("PITCH_PORT", "8000")),
+        "workers": int(os.getenv("PITCH_SERVER_WORKERS", "1")),
+        "loop": "uvloop" if _importable("uvloop") else "asyncio",
+        "http": "httptools" if _importable("httptools") else "h11",
+        "reload": False,
+        "access_log": os.getenv("PITCH_ACCESS_LOG", "0") == "1",
+        "timeout_graceful_shutdown": int(float(os.getenv("PITCH_DRAIN_SECONDS", "30"))),
+        "log_level": os.getenv("PITCH_LOG_LEVEL", "info").lower(),
+    }
+    logger.info("Production server options: %s", options)
+    return options
+
+
+def run_server(app: str, options: Dict[str, Any], unix_socket: str = ""):
+    """
+    uvicorn.run with a DrainingServer, plus HTTP on a Unix domain socket when one is given. Both
+    sockets are bound here and handed to the reloader or worker supervisor, so every worker
+    accepts on both.
+    """
+    config = uvicorn.Config(app, **options)
+    server = DrainingServer(config)
+    sockets = None
+    if unix_socket:
+        from framed_transport import bind_unix_socket
+
+        tcp = config.bind_socket()
+        # bind_socket leaves proto at 0, and asyncio only sets TCP_NODELAY on connections accepted
+        # from an IPPROTO_TCP listener; without it every response waits on a delayed ACK
+        tcp = socket.socket(tcp.family, tcp.type, socket.IPPROTO_TCP, fileno=tcp.detach())
+        sockets = [tcp, bind_unix_socket(unix_socket)]
+        logger.info("Serving HTTP on unix:%s too", unix_socket)
+    elif config.should_reload or config.workers > 1:
+        sockets = [config.bind_socket()]
+    try:
+        if config.should_reload:
+            ChangeReload(config, target=server.run, sockets=sockets).run()
+        elif config.workers > 1:
+            Multiprocess(config, target=server.run, sockets=sockets).run()
+        else:
+            server.run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+    if not server.started and not config.should_reload and config.workers == 1:
+        sys.exit(STARTUP_FAILURE)
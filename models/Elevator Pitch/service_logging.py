@@ -0,0 +1,75 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+LOGGER_NAME = "pitch_service"
+
+# Pass as `extra=` on records written once per request; only those are sampled
+PER_REQUEST = {"per_request": True}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random fraction of per-request INFO/DEBUG records. Everything else passes: warnings
+    and errors, and startup, warm-up, drain and shutdown messages, which are rare and matter.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "per_request", False):
+            return True
+        return random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the queue untouched. The stock QueueHandler formats the message and
+    traceback on the calling thread; here that work happens on the listener thread instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging() -> logging.Logger:
+    """
+    Configure the service logger: records are sampled, queued on the request path and
+    written to stdout by a background listener thread.
+    PITCH_LOG_LEVEL sets the level and PITCH_LOG_SAMPLE_RATE the fraction of per-request
+    INFO/DEBUG records kept.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(os.getenv("PITCH_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(float(os.getenv("PITCH_LOG_SAMPLE_RATE", "0.05"))))
+    logger.addHandler(handler)
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    def start_listener():
+        listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+    start_listener()
+    # Forked worker processes inherit the queue but not the listener thread; Windows never forks
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=start_listener)
+    return logger
+
+
+logger = setup_logging()
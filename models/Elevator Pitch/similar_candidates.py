@@ -0,0 +1,491 @@
+import json
+import math
+import os
+import shutil
+import threading
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from resume_search import analyze
+from service_logging import logger
+from skill_matcher import normalise_skill
+
+# How much a shared term in each part of the profile counts towards similarity
+FIELD_WEIGHTS: Dict[str, float] = {
+    "skill": 1.0,
+    "title": 0.6,
+    "major": 0.5,
+    "cert": 0.5,
+    "degree": 0.3,
+    "school": 0.3,
+}
+
+# Below this many candidates every one is compared exactly; the hash tables only pay off above it
+EXACT_SCAN_BELOW = 50_000
+# Rows inserted since the hash tables were built are matched on their stored codes until they pass this many,
+# or a fiftieth of the tables' size, and the tables are rebuilt
+DELTA_REBUILD_MIN = 1000
+# Rows hashed at once while rebuilding, which bounds the projections held in memory
+REBUILD_BLOCK = 65536
+
+
+def _strings(values: Any) -> List[str]:
+    return [value for value in values if isinstance(value, str)] if isinstance(values, list) else []
+
+
+def _dicts(values: Any) -> List[Dict[str, Any]]:
+    return [value for value in values if isinstance(value, dict)] if isinstance(values, list) else []
+
+
+def profile_features(result: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Sublinear term frequencies of a parsed profile's skills, position titles, education and
+    certifications, keyed "field:term" so the same word counts separately in each field
+    """
+    counts: Dict[str, int] = {}
+
+    def add(field: str, term: str):
+        if term:
+            key = f"{field}:{term}"
+            counts[key] = counts.get(key, 0) + 1
+
+    for skill in _strings(result.get("skills")):
+        add("skill", normalise_skill(skill))
+    for position in _dicts(result.get("positions")):
+        for word in analyze(str(position.get("position_name") or "")):
+            add("title", word)
+        for skill in _strings(position.get("skills")):
+            add("skill", normalise_skill(skill))
+    for education in _dicts(result.get("education_qualifications")):
+        for field, key in (("degree", "degree_type"), ("school", "school_name"), ("major", "specialization_subjects")):
+            for word in analyze(str(education.get(key) or "")):
+                add(field, word)
+    for certification in _strings(result.get("candidate_courses_and_certifications")):
+        add("cert", " ".join(certification.lower().split()))
+    return {feature: 1.0 + math.log(count) for feature, count in counts.items()}
+
+
+@lru_cache(maxsize=65536)
+def feature_slot(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Hashing trick: the vector slot a feature lands in, and the sign that keeps collisions unbiased"""
+    encoded = feature.encode('utf-8')
+    return zlib.crc32(encoded) % dimensions, 1.0 if zlib.crc32(encoded, 0x5bd1e995) & 1 else -1.0
+
+
+class SimilarCandidateIndex:
+    """
+    "More like this" over parsed profiles. Each profile becomes a fixed-length, unit-length
+    hashed TF-IDF vector, and cosine similarity ranks the neighbours.
+
+    Neighbours are found with multi-probe random-hyperplane LSH: every table hashes a vector
+    to the signs of `bits` random projections, so similar vectors tend to share a bucket. A
+    query collects the candidates in its own bucket and the buckets one bit away in each
+    table, and ranks only those exactly. Each table is a row array sorted by bucket code, so
+    a bucket is a binary-searched slice. Rows inserted since the tables were built are kept
+    in a small delta with their codes, matched against the same probes; deleted rows are
+    skipped until the next rebuild.
+
+    IDF weights are refreshed, and every vector recomputed, whenever the number of candidates
+    has doubled since the last refresh. Refreshes, and table rebuilds once the delta is large,
+    run in a background thread and are swapped in when done; rows changed meanwhile make up
+    the new delta. With a directory, changes are journaled and compact()
+    writes a snapshot that the next start loads instead of rebuilding.
+    """
+
+    def __init__(self, directory: Optional[str] = None, dimensions: int = 128, tables: int = 12, bits: int = 14,
+                 seed: int = 7, compact_every: int = 5000):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.tables = tables
+        self.bits = bits
+        self.seed = seed
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._planes = np.random.RandomState(seed).standard_normal((dimensions, tables * bits)).astype(np.float32)
+        self._bit_values = 1 << np.arange(bits, dtype=np.int64)
+
+        # Per row: unit vector, and whether it holds a candidate
+        self._vectors = np.zeros((1024, dimensions), dtype=np.float32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._ids: List[Optional[str]] = []
+        self._features: List[Optional[Dict[str, float]]] = []
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._row_of: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        # Hash tables: per table, rows ordered by bucket code and the codes in the same order
+        self._table_rows = np.zeros((tables, 0), dtype=np.int32)
+        self._table_codes = np.zeros((tables, 0), dtype=np.int64)
+        # Rows added since the tables were built, with their bucket codes in every table
+        self._delta: List[int] = []
+        self._delta_codes = np.zeros((DELTA_REBUILD_MIN, tables), dtype=np.int64)
+
+        self._document_frequency: Dict[str, int] = {}
+        self._idf_size = 0
+        self._changes = 0
+        # Rows added or removed while a background refresh runs; None when no refresh is running
+        self._touched: Optional[Set[int]] = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            # Replaying the journal can start a background rebuild, which takes the lock to swap in
+            with self._lock:
+                self._load()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    # Vectors
+
+    @staticmethod
+    def _idf_weight(candidates: int, frequency: int) -> float:
+        return math.log((1 + candidates) / (1 + frequency)) + 1.0
+
+    def _idf(self, feature: str) -> float:
+        return self._idf_weight(len(self._row_of), self._document_frequency.get(feature, 0))
+
+    def _vector(self, features: Dict[str, float]) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, tf in features.items():
+            slot, sign = feature_slot(feature, self.dimensions)
+            vector[slot] += sign * FIELD_WEIGHTS[feature.split(":", 1)[0]] * tf * self._idf(feature)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _codes_of(self, vectors: np.ndarray) -> np.ndarray:
+        signs = (vectors @ self._planes > 0).reshape(len(vectors), self.tables, self.bits)
+        return signs.astype(np.int64) @ self._bit_values
+
+    def _hash_tables(self, vectors: np.ndarray, live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Per table, the live rows ordered by bucket code and the codes in the same order"""
+        rows = np.flatnonzero(live).astype(np.int32)
+        codes = np.empty((len(rows), self.tables), dtype=np.int64)
+        for start in range(0, len(rows), REBUILD_BLOCK):
+            codes[start:start + REBUILD_BLOCK] = self._codes_of(vectors[rows[start:start + REBUILD_BLOCK]])
+        codes = codes.T
+        order = np.argsort(codes, axis=1, kind='stable')
+        return rows[order], np.take_along_axis(codes, order, axis=1)
+
+    def _rebuild_tables(self):
+        self._table_rows, self._table_codes = self._hash_tables(self._vectors, self._live[:len(self._ids)])
+        self._delta = []
+
+    def _weighted_vectors(self, features: List[Optional[Dict[str, float]]], frequency: Dict[str, int],
+                          candidates: int, capacity: int) -> np.ndarray:
+        """
+        Unit vectors of every stored profile under the IDF weights of `frequency` over `candidates`.
+        Each feature's slot and weight is worked out once, and rows are filled a block at a time.
+        """
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        weights: Dict[str, Tuple[int, float]] = {}
+        for start in range(0, len(features), REBUILD_BLOCK):
+            rows: List[int] = []
+            slots: List[int] = []
+            values: List[float] = []
+            for row, row_features in enumerate(features[start:start + REBUILD_BLOCK], start):
+                if row_features is None:
+                    continue
+                for feature, tf in row_features.items():
+                    weight = weights.get(feature)
+                    if weight is None:
+                        slot, sign = feature_slot(feature, self.dimensions)
+                        idf = self._idf_weight(candidates, frequency.get(feature, 0))
+                        weight = weights[feature] = (slot, sign * FIELD_WEIGHTS[feature.split(":", 1)[0]] * idf)
+                    rows.append(row)
+                    slots.append(weight[0])
+                    values.append(weight[1] * tf)
+            np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(slots, dtype=np.intp)),
+                      np.asarray(values, dtype=np.float32))
+            block = vectors[start:start + REBUILD_BLOCK]
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            np.divide(block, norms, out=block, where=norms > 0)
+        return vectors
+
+    def _refresh(self):
+        """Recompute every vector with the current IDF weights"""
+        self._vectors = self._weighted_vectors(
+            self._features, self._document_frequency, len(self), len(self._vectors)
+        )
+        self._rebuild_tables()
+        self._idf_size = len(self)
+
+    def _start_rebuild(self, refresh: bool):
+        """
+        Rebuild the hash tables in a background thread, first recomputing every vector under the
+        current IDF weights when refresh is set. Called with the lock held.
+        """
+        features = list(self._features) if refresh else None
+        frequency = dict(self._document_frequency) if refresh else None
+        candidates = len(self)
+        vectors = self._vectors
+        live = self._live[:len(self._ids)].copy()
+        if refresh:
+            self._idf_size = candidates
+        self._touched = set()
+
+        def rebuild():
+            try:
+                # Rows written after this point are touched, so reading the shared vectors is safe
+                rebuilt = self._weighted_vectors(features, frequency, candidates, len(vectors)) if refresh else vectors
+                tables = self._hash_tables(rebuilt, live)
+            except Exception as e:
+                logger.warning("Similarity index rebuild failed: %s", e)
+                with self._lock:
+                    self._touched = None
+                return
+            with self._lock:
+                self._swap_rebuild(rebuilt if refresh else None, *tables)
+
+        threading.Thread(target=rebuild, name="similar-index-rebuild", daemon=True).start()
+
+    def _swap_rebuild(self, vectors: Optional[np.ndarray], table_rows: np.ndarray, table_codes: np.ndarray):
+        """Install a finished rebuild; rows changed while it ran become the new delta"""
+        touched, self._touched = sorted(self._touched), None
+        if vectors is not None:
+            if len(vectors) < len(self._vectors):
+                padding = np.zeros((len(self._vectors) - len(vectors), self.dimensions), dtype=np.float32)
+                vectors = np.concatenate([vectors, padding])
+            for row in touched:
+                vectors[row] = self._vector(self._features[row]) if self._live[row] else 0
+            self._vectors = vectors
+        self._table_rows, self._table_codes = table_rows, table_codes
+        self._delta = [row for row in touched if self._live[row]]
+        self._delta_codes = np.zeros((max(DELTA_REBUILD_MIN, 2 * len(self._delta)), self.tables), dtype=np.int64)
+        if self._delta:
+            self._delta_codes[:len(self._delta)] = self._codes_of(self._vectors[self._delta])
+
+    # Persistence
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _settings(self) -> Dict[str, int]:
+        return {"dimensions": self.dimensions, "tables": self.tables, "bits": self.bits, "seed": self.seed}
+
+    def _load(self):
+        snapshot = self._path("snapshot")
+        if os.path.exists(os.path.join(snapshot, "docs.json")):
+            with open(os.path.join(snapshot, "docs.json"), encoding='utf-8') as f:
+                docs = json.load(f)
+            with open(os.path.join(snapshot, "settings.json"), encoding='utf-8') as f:
+                settings = json.load(f)
+            for doc in docs:
+                self._place(doc["id"], doc["features"], doc["meta"])
+            if settings == self._settings():
+                self._vectors[:len(docs)] = np.load(os.path.join(snapshot, "vectors.npy"))
+                self._rebuild_tables()
+                self._idf_size = len(self)
+            else:
+                # Vectors from other settings can't be reused; the stored features rebuild them
+                self._refresh()
+
+        journal = self._path("journal.jsonl")
+        if os.path.exists(journal):
+            replayed = 0
+            with open(journal, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # A write cut short by a crash; everything before it is intact
+                    if entry.get("op") == "remove":
+                        self._remove(entry["id"])
+                    else:
+                        self._add(entry["id"], entry["features"], entry.get("meta") or {})
+                    replayed += 1
+            self._changes = replayed
+            logger.info("Similarity index loaded %d candidates, replayed %d journal entries", len(self), replayed)
+
+    def _journal(self, entry: Dict[str, Any]):
+        if self.directory:
+            with open(self._path("journal.jsonl"), "a", encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def compact(self):
+        """Write a snapshot of every candidate and empty the journal"""
+        with self._lock:
+            if not self.directory:
+                return
+            rows = np.flatnonzero(self._live[:len(self._ids)])
+            docs = [
+                {"id": self._ids[row], "features": self._features[row], "meta": self._meta[row]} for row in rows.tolist()
+            ]
+            # Written to a new directory and swapped in, so a crash never leaves a half-written snapshot
+            staging = self._path("snapshot.tmp")
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            with open(os.path.join(staging, "docs.json"), "w", encoding='utf-8') as f:
+                json.dump(docs, f)
+            with open(os.path.join(staging, "settings.json"), "w", encoding='utf-8') as f:
+                json.dump(self._settings(), f)
+            np.save(os.path.join(staging, "vectors.npy"), self._vectors[rows])
+
+            snapshot = self._path("snapshot")
+            retired = self._path("snapshot.old")
+            shutil.rmtree(retired, ignore_errors=True)
+            if os.path.exists(snapshot):
+                os.rename(snapshot, retired)
+            os.rename(staging, snapshot)
+            shutil.rmtree(retired, ignore_errors=True)
+            open(self._path("journal.jsonl"), "w").close()
+            self._changes = 0
+
+    # Updates
+
+    def add(self, doc_id: str, result: Dict[str, Any], meta: Optional[Dict[str, Any]] = None):
+        """Index a parsed profile, replacing any earlier version with the same id"""
+        features = profile_features(result)
+        with self._lock:
+            self._add(doc_id, features, meta or {})
+            self._journal({"id": doc_id, "features": features, "meta": meta or {}})
+            self._changes += 1
+            if self.compact_every and self._changes >= self.compact_every:
+                self.compact()
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(doc_id)
+            if removed:
+                self._journal({"op": "remove", "id": doc_id})
+                self._changes += 1
+            return removed
+
+    def _place(self, doc_id: str, features: Dict[str, float], meta: Dict[str, Any]) -> int:
+        """Store a candidate in a free row, without computing its vector"""
+        row = self._free_rows.pop() if self._free_rows else len(self._ids)
+        if row == len(self._ids):
+            self._ids.append(None)
+            self._features.append(None)
+            self._meta.append(None)
+            if row >= len(self._live):
+                capacity = len(self._live) * 2
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])[:capacity]
+                self._live = np.concatenate([self._live, np.zeros_like(self._live)])[:capacity]
+        self._ids[row] = doc_id
+        self._features[row] = features
+        self._meta[row] = meta
+        self._live[row] = True
+        self._row_of[doc_id] = row
+        if self._touched is not None:
+            self._touched.add(row)
+        for feature in features:
+            self._document_frequency[feature] = self._document_frequency.get(feature, 0) + 1
+        return row
+
+    def _add(self, doc_id: str, features: Dict[str, float], meta: Dict[str, Any]):
+        self._remove(doc_id)
+        row = self._place(doc_id, features, meta)
+        self._vectors[row] = self._vector(features)
+        if len(self._delta) == len(self._delta_codes):
+            self._delta_codes = np.concatenate([self._delta_codes, np.zeros_like(self._delta_codes)])
+        self._delta_codes[len(self._delta)] = self._codes_of(self._vectors[row:row + 1])[0]
+        self._delta.append(row)
+        # One rebuild at a time; the delta keeps growing until it is swapped in
+        if self._touched is None:
+            if len(self) > 2 * self._idf_size:
+                self._start_rebuild(refresh=True)
+            elif len(self._delta) > max(DELTA_REBUILD_MIN, self._table_rows.shape[1] // 50):
+                self._start_rebuild(refresh=False)
+
+    def _remove(self, doc_id: str) -> bool:
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return False
+        for feature in self._features[row]:
+            remaining = self._document_frequency[feature] - 1
+            if remaining:
+                self._document_frequency[feature] = remaining
+            else:
+                del self._document_frequency[feature]
+        self._ids[row] = self._features[row] = self._meta[row] = None
+        self._live[row] = False
+        self._vectors[row] = 0
+        self._free_rows.append(row)
+        if self._touched is not None:
+            self._touched.add(row)
+        return True
+
+    # Queries
+
+    def _candidate_rows(self, row: int) -> np.ndarray:
+        """Live rows sharing a bucket, or a bucket one bit away, with row in any table"""
+        codes = self._codes_of(self._vectors[row:row + 1])[0]
+        # Each table's own bucket followed by its neighbours one bit away
+        probes = codes[:, None] ^ np.concatenate([[0], 1 << np.arange(self.bits, dtype=np.int64)])[None, :]
+        parts = []
+        if self._delta:
+            delta_codes = self._delta_codes[:len(self._delta)]
+            near = np.zeros(len(self._delta), dtype=bool)
+            for table in range(self.tables):
+                near |= np.isin(delta_codes[:, table], probes[table])
+            parts.append(np.asarray(self._delta, dtype=np.int32)[near])
+        for table in range(self.tables):
+            table_codes = self._table_codes[table]
+            starts = np.searchsorted(table_codes, probes[table], 'left')
+            ends = np.searchsorted(table_codes, probes[table], 'right')
+            parts.extend(self._table_rows[table, start:end] for start, end in zip(starts.tolist(), ends.tolist()))
+        # A row found in several tables is marked once; deleted rows stay in the tables until the
+        # next rebuild, and a reused row is scored on its new vector
+        found = np.zeros(len(self._ids), dtype=bool)
+        if parts:
+            found[np.concatenate(parts)] = True
+        found &= self._live[:len(self._ids)]
+        found[row] = False
+        return np.flatnonzero(found)
+
+    def similar(self, doc_id: str, k: int = 10, exact: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        The k candidates most similar to doc_id, as {"id", "score", ...meta} dicts with the
+        cosine similarity as the score; None when doc_id isn't indexed
+        """
+        with self._lock:
+            row = self._row_of.get(doc_id)
+            if row is None:
+                return None
+            if exact or len(self) <= EXACT_SCAN_BELOW:
+                scores = self._vectors[:len(self._ids)] @ self._vectors[row]
+                scores[~self._live[:len(self._ids)]] = 0
+                scores[row] = 0
+                rows = np.arange(len(scores))
+            else:
+                rows = self._candidate_rows(row)
+                scores = self._vectors[rows] @ self._vectors[row]
+            if not len(rows):
+                return []
+            if len(rows) > k:
+                # Partial sort: only the k best are ordered
+                best = np.argpartition(scores, -k)[-k:]
+                rows, scores = rows[best], scores[best]
+            order = np.argsort(-scores, kind='stable')
+            return [
+                {"id": self._ids[found], "score": round(float(score), 4), **self._meta[found]}
+                for found, score in zip(rows[order].tolist(), scores[order].tolist())
+                if score > 0
+            ]
+
+
+def create_similar_index_from_env() -> SimilarCandidateIndex:
+    """
+    Build the service index from PITCH_SIMILAR_INDEX_DIR (directory for the snapshot and journal,
+    empty to keep the index in memory only), PITCH_SIMILAR_DIMENSIONS (vector length),
+    PITCH_SIMILAR_TABLES and PITCH_SIMILAR_BITS (LSH hash tables and bits per table) and
+    PITCH_SIMILAR_COMPACT_EVERY (changes journaled before a snapshot is written).
+    """
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "similar_index")
+    directory = os.getenv("PITCH_SIMILAR_INDEX_DIR", default_dir)
+    settings = {
+        "dimensions": int(os.getenv("PITCH_SIMILAR_DIMENSIONS", "128")),
+        "tables": int(os.getenv("PITCH_SIMILAR_TABLES", "12")),
+        "bits": int(os.getenv("PITCH_SIMILAR_BITS", "14")),
+        "compact_every": int(os.getenv("PITCH_SIMILAR_COMPACT_EVERY", "5000")),
+    }
+    try:
+        return SimilarCandidateIndex(directory or None, **settings)
+    except (OSError, ValueError) as e:
+        logger.warning("Similarity index persistence disabled, could not open %s: %s", directory, e)
+        return SimilarCandidateIndex(None, **settings)
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key: the first caller starts the work, and callers arriving
+    while it runs await the same result or exception instead of repeating it.
+
+    The work runs as its own task, so a caller that disconnects doesn't cancel it for the rest.
+    Keys are forgotten once the work finishes; later calls go through the result cache instead.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result of fn(), whether it was shared with an earlier caller)"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved, in case every caller went away before it was raised
+        if not task.cancelled():
+            task.exception()
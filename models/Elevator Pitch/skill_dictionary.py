@@ -0,0 +1,200 @@
+import json
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words, plus the punctuation that belongs inside skill names: c++, c#, node.js, .net, asp.net
+TOKEN_PATTERN = re.compile(r'\.?[A-Za-z0-9][A-Za-z0-9+#]*(?:\.[A-Za-z0-9][A-Za-z0-9+#]*)*')
+
+DEFAULT_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_dictionary.json")
+
+
+def tokenize(text: str) -> List[str]:
+    """Skill tokens of the text, in original case"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class SkillMatch:
+    __slots__ = ('skill', 'start', 'end', 'listed_only')
+
+    def __init__(self, skill: str, start: int, end: int, listed_only: bool = False):
+        self.skill = skill
+        self.start = start  # First token index
+        self.end = end      # Last token index, inclusive
+        # A one-letter alias ("R", "C"): a skill in a skill list, an initial or a word in prose
+        self.listed_only = listed_only
+
+
+class SkillAutomaton:
+    """
+    Aho-Corasick automaton over lowercase tokens instead of characters.
+
+    Every alias is a token sequence, so a single pass over a resume's tokens finds every
+    occurrence of every alias, however large the dictionary, and matches always start and
+    end on word boundaries. Aliases marked case-sensitive ("=Go") are matched on the
+    lowercase path and then checked against the original tokens.
+    """
+
+    def __init__(self):
+        # Node 0 is the root; each node maps a token to its child node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per node: (canonical skill, alias length in tokens, exact tokens or None, listed only), longest first
+        self._outputs: List[List[Tuple[str, int, Optional[Tuple[str, ...]], bool]]] = [[]]
+        self._built = False
+
+    def add(self, alias: str, skill: str, case_sensitive: bool = False):
+        tokens = tokenize(alias)
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            lowered = token.lower()
+            child = self._goto[node].get(lowered)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][lowered] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = child
+        listed_only = len(tokens) == 1 and len(tokens[0]) == 1
+        self._outputs[node].append((skill, len(tokens), tuple(tokens) if case_sensitive else None, listed_only))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge each node's outputs with its suffix's"""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                queue.append(child)
+        for outputs in self._outputs:
+            outputs.sort(key=lambda output: -output[1])
+        self._built = True
+
+    def __len__(self) -> int:
+        return sum(1 for outputs in self._outputs for _ in outputs)
+
+    def find(self, tokens: List[str], ignore_case: bool = False) -> List[SkillMatch]:
+        """
+        Leftmost-longest, non-overlapping matches in a token list, so "machine learning"
+        isn't also counted as "learning". ignore_case also accepts case-sensitive aliases
+        in any case, for text already known to be a skill list.
+        """
+        if not self._built:
+            self.build()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        candidates: List[SkillMatch] = []
+        node = 0
+        for index, lowered in enumerate([token.lower() for token in tokens]):
+            while node and lowered not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(lowered, 0)
+            for skill, length, exact, listed_only in outputs[node]:
+                start = index - length + 1
+                if exact is None or ignore_case or tuple(tokens[start:index + 1]) == exact:
+                    candidates.append(SkillMatch(skill, start, index, listed_only))
+
+        candidates.sort(key=lambda match: (match.start, match.start - match.end))
+        matches: List[SkillMatch] = []
+        next_free = 0
+        for match in candidates:
+            if match.start >= next_free:
+                matches.append(match)
+                next_free = match.end + 1
+        return matches
+
+
+class SkillDictionary:
+    """
+    Canonical skill names with their aliases, compiled into one SkillAutomaton. One-letter
+    aliases ("=R", "=C") also stand for initials and words ("R and D", "Vitamin C"), so they
+    only count in text known to be a skill list, such as the skills section.
+    """
+
+    def __init__(self, entries: Dict[str, Iterable[str]]):
+        self.automaton = SkillAutomaton()
+        self.skills: Tuple[str, ...] = tuple(entries)
+        for skill, aliases in entries.items():
+            exact = {alias[1:].lower() for alias in aliases if alias.startswith('=')}
+            # The canonical name is an alias too, unless it is listed as case-sensitive
+            if skill.lower() not in exact:
+                self.automaton.add(skill, skill)
+            for alias in aliases:
+                if alias.startswith('='):
+                    self.automaton.add(alias[1:], skill, case_sensitive=True)
+                else:
+                    self.automaton.add(alias, skill)
+        self.automaton.build()
+
+    @classmethod
+    def from_file(cls, path: str) -> "SkillDictionary":
+        """Load a JSON object mapping each canonical skill to a list of aliases"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def find(self, text: str) -> List[SkillMatch]:
+        """Matches in free text, where one-letter aliases don't count"""
+        return [match for match in self.automaton.find(tokenize(text)) if not match.listed_only]
+
+    def find_lines(
+        self, lines: List[str], listed: Optional[Tuple[int, int]] = None
+    ) -> Tuple[List[SkillMatch], List[int]]:
+        """
+        Matches across a list of lines, plus the line index of every token. One-letter aliases
+        only count on lines [start, end) of `listed`, the lines known to be a skill list.
+        """
+        tokens: List[str] = []
+        token_lines: List[int] = []
+        for number, line in enumerate(lines):
+            line_tokens = TOKEN_PATTERN.findall(line)
+            if line_tokens:
+                tokens.extend(line_tokens)
+                token_lines.extend([number] * len(line_tokens))
+        matches = [
+            match for match in self.automaton.find(tokens)
+            if not match.listed_only or (listed is not None and listed[0] <= token_lines[match.start] < listed[1])
+        ]
+        return matches, token_lines
+
+    def rank(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Canonical skills mentioned in the text, most frequent first, ties in order of first mention"""
+        return rank_matches(self.find(text), limit)
+
+    def canonical(self, name: str) -> Optional[str]:
+        """The canonical skill when the whole name is one known alias in any case, else None"""
+        tokens = tokenize(name)
+        matches = self.automaton.find(tokens, ignore_case=True)
+        if len(matches) == 1 and matches[0].start == 0 and matches[0].end == len(tokens) - 1:
+            return matches[0].skill
+        return None
+
+
+def rank_matches(matches: Iterable[SkillMatch], limit: Optional[int] = None) -> List[str]:
+    """Canonical skills of the matches, most frequent first, ties in order of first mention"""
+    counts: Dict[str, int] = {}
+    for match in matches:
+        counts[match.skill] = counts.get(match.skill, 0) + 1
+    # dict keeps first-mention order, and sorted() is stable
+    ranked = sorted(counts, key=counts.__getitem__, reverse=True)
+    return ranked[:limit] if limit is not None else ranked
+
+
+@lru_cache(maxsize=1)
+def get_skill_dictionary() -> SkillDictionary:
+    """
+    The service-wide dictionary, compiled once per process. PITCH_SKILL_DICTIONARY points at
+    a replacement JSON file, e.g. a full export of tens of thousands of skills.
+    """
+    return SkillDictionary.from_file(os.getenv("PITCH_SKILL_DICTIONARY", DEFAULT_DICTIONARY_PATH))
@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from service_logging import logger
+from skill_dictionary import get_skill_dictionary
+
+
+@lru_cache(maxsize=65536)
+def normalise_skill(skill: str) -> str:
+    """Canonical dictionary name for a known skill, otherwise the trimmed lowercase text"""
+    return get_skill_dictionary().canonical(skill) or " ".join(skill.lower().split())
+
+
+class _Postings:
+    """Growable int32 array of row numbers for one skill column"""
+
+    __slots__ = ('rows', 'size')
+
+    def __init__(self):
+        self.rows = np.empty(8, dtype=np.int32)
+        self.size = 0
+
+    def append(self, row: int):
+        if self.size == len(self.rows):
+            grown = np.empty(len(self.rows) * 2, dtype=np.int32)
+            grown[:self.size] = self.rows[:self.size]
+            self.rows = grown
+        self.rows[self.size] = row
+        self.size += 1
+
+    def remove(self, row: int):
+        live = self.rows[:self.size]
+        kept = live[live != row]
+        self.rows[:len(kept)] = kept
+        self.size = len(kept)
+
+    def view(self) -> np.ndarray:
+        return self.rows[:self.size]
+
+
+class SkillIncidenceMatrix:
+    """
+    Sparse rows × skills 0/1 matrix, stored column-compressed: each skill keeps the array of
+    rows that have it. Scoring a query is a sparse matrix-vector product, one vectorised
+    scatter-add per query skill, so its cost follows the rows sharing a skill with the query
+    rather than the total number of rows. Rows are added, replaced and removed in place.
+    """
+
+    def __init__(self):
+        self._row_of: Dict[Hashable, int] = {}
+        self._ids: List[Optional[Hashable]] = []
+        self._free_rows: List[int] = []
+        self._row_skills: List[Tuple[str, ...]] = []
+        self._columns: Dict[str, _Postings] = {}
+        self._nnz = np.zeros(1024, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, entity_id: Hashable) -> bool:
+        return entity_id in self._row_of
+
+    def skills(self, entity_id: Hashable) -> Tuple[str, ...]:
+        return self._row_skills[self._row_of[entity_id]]
+
+    def profiles(self) -> Dict[Hashable, List[str]]:
+        """Every row's id and normalised skills"""
+        return {entity_id: list(self._row_skills[row]) for entity_id, row in self._row_of.items()}
+
+    def upsert(self, entity_id: Hashable, skills: Iterable[str]):
+        """Add a row, or replace its skills; only the columns that changed are touched"""
+        new_skills = tuple(dict.fromkeys(normalise_skill(skill) for skill in skills if skill and skill.strip()))
+        row = self._row_of.get(entity_id)
+        if row is None:
+            row = self._free_rows.pop() if self._free_rows else len(self._ids)
+            if row == len(self._ids):
+                self._ids.append(entity_id)
+                self._row_skills.append(())
+            else:
+                self._ids[row] = entity_id
+            self._row_of[entity_id] = row
+            if row >= len(self._nnz):
+                self._nnz = np.concatenate([self._nnz, np.zeros(len(self._nnz), dtype=np.int32)])
+
+        old_skills = set(self._row_skills[row])
+        for skill in old_skills.difference(new_skills):
+            self._columns[skill].remove(row)
+        for skill in new_skills:
+            if skill not in old_skills:
+                self._columns.setdefault(skill, _Postings()).append(row)
+        self._row_skills[row] = new_skills
+        self._nnz[row] = len(new_skills)
+
+    def remove(self, entity_id: Hashable) -> bool:
+        row = self._row_of.pop(entity_id, None)
+        if row is None:
+            return False
+        for skill in self._row_skills[row]:
+            self._columns[skill].remove(row)
+        self._row_skills[row] = ()
+        self._ids[row] = None
+        self._nnz[row] = 0
+        self._free_rows.append(row)
+        return True
+
+    def overlap(self, skills: Iterable[str]) -> np.ndarray:
+        """Number of the given (normalised) skills every row has, indexed by row number"""
+        counts = np.zeros(len(self._ids), dtype=np.float32)
+        for skill in skills:
+            postings = self._columns.get(skill)
+            if postings is not None and postings.size:
+                # Rows appear at most once per column, so a plain fancy-index add is exact
+                counts[postings.view()] += 1
+        return counts
+
+    def top_k(
+        self, skills: Iterable[str], k: int, normalise_by_row: bool = False
+    ) -> List[Dict[str, object]]:
+        """
+        The k best rows for a skill query, as {"id", "score", "matched_skills"} dicts.
+        The score is the percentage of skills matched: of the row's skills when
+        normalise_by_row is set (rows are jobs), of the query's skills otherwise.
+        """
+        query = tuple(dict.fromkeys(normalise_skill(skill) for skill in skills if skill and skill.strip()))
+        if not query or not len(self):
+            return []
+        scores = self.overlap(query)
+        if normalise_by_row:
+            nnz = self._nnz[:len(scores)]
+            np.divide(scores, nnz, out=scores, where=nnz > 0)
+        else:
+            scores /= len(query)
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            # Partial sort: only the k best are ordered
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        order = matched[np.argsort(-scores[matched], kind='stable')]
+
+        query_set = set(query)
+        return [
+            {
+                "id": self._ids[row],
+                "score": round(float(scores[row]) * 100, 2),
+                "matched_skills": [skill for skill in self._row_skills[row] if skill in query_set],
+            }
+            for row in order.tolist()
+        ]
+
+
+class MatchEngine:
+    """
+    Candidates and jobs in two incidence matrices, matched in either direction.
+
+    With a directory every change is journaled, and compact() writes a snapshot of both
+    matrices and starts a fresh journal, so profiles survive a restart. The journal being
+    compacted is renamed aside first and only deleted once the snapshot is in place, so
+    changes made meanwhile are never lost. All methods take a lock and may be called from
+    worker threads.
+    """
+
+    KINDS = ("candidates", "jobs")
+
+    def __init__(self, directory: Optional[str] = None, compact_every: int = 5000):
+        self.candidates = SkillIncidenceMatrix()
+        self.jobs = SkillIncidenceMatrix()
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._compacting = threading.Lock()
+        self._changes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def matrix(self, kind: str) -> SkillIncidenceMatrix:
+        return self.candidates if kind == "candidates" else self.jobs
+
+    # Persistence
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _replay(self, path: str) -> int:
+        replayed = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # A write cut short by a crash; everything before it is intact
+                matrix = self.matrix(entry["kind"])
+                if entry.get("op") == "remove":
+                    matrix.remove(entry["id"])
+                else:
+                    matrix.upsert(entry["id"], entry["skills"])
+                replayed += 1
+        return replayed
+
+    def _load(self):
+        snapshot = self._path("snapshot.json")
+        if os.path.exists(snapshot):
+            with open(snapshot, encoding='utf-8') as f:
+                profiles = json.load(f)
+            for kind in self.KINDS:
+                matrix = self.matrix(kind)
+                for entity_id, skills in profiles.get(kind, {}).items():
+                    matrix.upsert(entity_id, skills)
+        replayed = 0
+        # A journal renamed aside by an interrupted compaction comes before the current one
+        for name in ("journal.compacting.jsonl", "journal.jsonl"):
+            if os.path.exists(self._path(name)):
+                replayed += self._replay(self._path(name))
+        self._changes = replayed
+        logger.info("Match index loaded %d candidates and %d jobs, replayed %d journal entries",
+                    len(self.candidates), len(self.jobs), replayed)
+
+    def _journal(self, entry: Dict[str, Any]):
+        if self.directory:
+            with open(self._path("journal.jsonl"), "a", encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+            self._changes += 1
+
+    def compact(self):
+        """Write a snapshot of both matrices and empty the journal"""
+        if not self.directory:
+            return
+        with self._compacting:
+            with self._lock:
+                profiles = {kind: self.matrix(kind).profiles() for kind in self.KINDS}
+                compacting = self._path("journal.compacting.jsonl")
+                if os.path.exists(self._path("journal.jsonl")):
+                    if os.path.exists(compacting):
+                        # Left by a compaction that failed: keep its entries ahead of the newer ones
+                        with open(self._path("journal.jsonl"), encoding='utf-8') as newer, \
+                                open(compacting, "a", encoding='utf-8') as f:
+                            f.write(newer.read())
+                        os.remove(self._path("journal.jsonl"))
+                    else:
+                        os.rename(self._path("journal.jsonl"), compacting)
+                self._changes = 0
+            # Written outside the lock, then swapped in, so a crash never leaves a half-written snapshot
+            staging = self._path("snapshot.json.tmp")
+            with open(staging, "w", encoding='utf-8') as f:
+                json.dump(profiles, f)
+            os.replace(staging, self._path("snapshot.json"))
+            if os.path.exists(compacting):
+                os.remove(compacting)
+
+    # Updates
+
+    def upsert(self, kind: str, entity_id: str, skills: Iterable[str]):
+        """Add a candidate or job, or replace its skills"""
+        with self._lock:
+            matrix = self.matrix(kind)
+            matrix.upsert(entity_id, skills)
+            self._journal({"kind": kind, "id": entity_id, "skills": list(matrix.skills(entity_id))})
+            due = self.compact_every and self._changes >= self.compact_every
+        if due and not self._compacting.locked():
+            self.compact()
+
+    def remove(self, kind: str, entity_id: str) -> bool:
+        with self._lock:
+            removed = self.matrix(kind).remove(entity_id)
+            if removed:
+                self._journal({"op": "remove", "kind": kind, "id": entity_id})
+            return removed
+
+    # Queries
+
+    def skills(self, kind: str, entity_id: str) -> Optional[Tuple[str, ...]]:
+        """The stored skills of a candidate or job, or None when it isn't indexed"""
+        with self._lock:
+            matrix = self.matrix(kind)
+            return matrix.skills(entity_id) if entity_id in matrix else None
+
+    def jobs_for_candidate(self, skills: Iterable[str], k: int) -> List[Dict[str, object]]:
+        # Same rule as the recommendation controller: share of the job's skills the candidate has
+        with self._lock:
+            return self.jobs.top_k(skills, k, normalise_by_row=True)
+
+    def candidates_for_job(self, skills: Iterable[str], k: int) -> List[Dict[str, object]]:
+        with self._lock:
+            return self.candidates.top_k(skills, k)
+
+
+def create_match_engine_from_env() -> MatchEngine:
+    """
+    Build the service matcher from PITCH_MATCH_INDEX_DIR (directory for the snapshot and journal,
+    empty to keep profiles in memory only) and PITCH_MATCH_COMPACT_EVERY (changes journaled
+    before a snapshot is written).
+    """
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "match_index")
+    directory = os.getenv("PITCH_MATCH_INDEX_DIR", default_dir)
+    compact_every = int(os.getenv("PITCH_MATCH_COMPACT_EVERY", "5000"))
+    try:
+        return MatchEngine(directory or None, compact_every)
+    except (OSError, ValueError) as e:
+        logger.warning("Match index persistence disabled, could not open %s: %s", directory, e)
+        return MatchEngine(None, compact_every)
@@ -0,0 +1,36 @@
+import asyncio
+
+from pitch_jobs import JobManager, JobStore
+
+
+def test_sibling_start_leaves_running_jobs_alone_until_their_lease_expires(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    runs = []
+
+    async def handler(job, content, progress):
+        runs.append(job["id"])
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        first = JobManager(JobStore(path), {"parse": handler}, concurrency=1, max_unfinished=10, lease=0.3)
+        first.start()
+        job = await first.submit("parse", "a.txt", b"resume", {})
+        while not runs:
+            await asyncio.sleep(0.01)
+
+        # A sibling worker starting while the job runs must not requeue it
+        second = JobManager(JobStore(path), {"parse": handler}, concurrency=1, max_unfinished=10, lease=0.3)
+        second.start()
+        await asyncio.sleep(1)
+        assert runs == [job["id"]]
+        assert second.store.get(job["id"])["status"] == "running"
+
+        # The first worker dies: its lease runs out and the sibling takes the job over
+        for task in first._runners + [first._renewer]:
+            task.cancel()
+        await asyncio.gather(*first._runners, first._renewer, return_exceptions=True)
+        await asyncio.sleep(1)
+        assert runs == [job["id"], job["id"]]
+        await second.stop(0)
+
+    asyncio.run(scenario())
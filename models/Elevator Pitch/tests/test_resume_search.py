@@ -0,0 +1,50 @@
+import json
+
+from resume_search import ResumeSearchIndex
+
+
+def crash(index: ResumeSearchIndex):
+    """Drop the index without close(), as a killed process would"""
+    index._directory_lock.close()
+
+
+def test_restart_after_reupload_during_compaction(tmp_path):
+    index = ResumeSearchIndex(str(tmp_path), compact_every=0)
+    index.add("a", {"body": "python"})
+    index.add("b", {"body": "java"})
+
+    persist = index._persist
+
+    def reupload_while_writing(*args):
+        index.add("c", {"body": "rust"})
+        index.add("c", {"body": "rust go"})
+        return persist(*args)
+
+    index._persist = reupload_while_writing
+    index.compact()
+    with open(tmp_path / "manifest.json", encoding='utf-8') as f:
+        assert json.load(f)["tombstones"] == []
+    crash(index)
+
+    reopened = ResumeSearchIndex(str(tmp_path))
+    assert len(reopened) == 3
+    assert [hit["id"] for hit in reopened.search("go")["results"]] == ["c"]
+    assert [hit["id"] for hit in reopened.search("rust")["results"]] == ["c"]
+
+
+def test_load_ignores_tombstones_outside_segments(tmp_path):
+    index = ResumeSearchIndex(str(tmp_path), compact_every=0)
+    index.add("a", {"body": "python"})
+    index.add("b", {"body": "java"})
+    index.compact()
+    index.remove("b")
+    crash(index)
+    with open(tmp_path / "manifest.json", encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest["tombstones"] = [7]  # Written by an index that saved tombstones of its delta
+    with open(tmp_path / "manifest.json", "w", encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    reopened = ResumeSearchIndex(str(tmp_path))
+    assert "a" in reopened and "b" not in reopened
+    assert reopened.search("java")["total"] == 0
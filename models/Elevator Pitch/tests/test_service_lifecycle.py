@@ -0,0 +1,87 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DRAIN_DELAY = 2.0
+
+# A minimal app served the way main.py serves itself, with drain_on_sigterm in its startup hook
+DRAIN_APP = f"""
+import sys
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from service_lifecycle import ReadinessState, drain_on_sigterm, run_server
+
+app = FastAPI()
+readiness = ReadinessState()
+readiness.warmed_up = True
+
+
+class IdlePool:
+    in_flight = 0
+
+
+@app.on_event("startup")
+async def start():
+    drain_on_sigterm(readiness, IdlePool(), {DRAIN_DELAY}, 5)
+
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(readiness.to_dict(), status_code=200 if readiness.ready else 503)
+
+
+if __name__ == "__main__":
+    run_server("drain_app:app", {{"host": "127.0.0.1", "port": int(sys.argv[1]), "log_level": "warning"}})
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_ready(port: int):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_sigterm_keeps_serving_with_ready_red_for_the_drain_delay(tmp_path):
+    (tmp_path / "drain_app.py").write_text(DRAIN_APP, encoding='utf-8')
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [env.get("PYTHONPATH"), SERVICE_DIR]))
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "drain_app.py", str(port)], cwd=tmp_path, env=env)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                assert get_ready(port)[0] == 200
+                break
+            except OSError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.1)
+
+        signalled = time.monotonic()
+        server.send_signal(signal.SIGTERM)
+        time.sleep(DRAIN_DELAY / 4)
+        assert get_ready(port) == (503, {"status": "draining", "warmup_seconds": None})
+
+        server.wait(timeout=30)
+        assert time.monotonic() - signalled >= DRAIN_DELAY
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
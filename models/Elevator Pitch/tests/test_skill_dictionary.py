@@ -0,0 +1,36 @@
+import pytest
+
+from resume_parser import extract_skills_from_text
+from skill_dictionary import get_skill_dictionary
+
+RESUME = """Jane Roe
+jane@example.com
+
+Experience
+Finance Manager at Acme 2018-2023
+{experience}
+
+Education
+B.Sc. Economics, State University 2017
+
+Skills
+{skills}
+"""
+
+
+@pytest.mark.parametrize("prose", [
+    "Drove R and D budget planning with Python.",
+    "Briefed the C suite each quarter using Python.",
+    "Graded C and R level suppliers in Python.",
+    "Ran a Vitamin C supplement launch, reported with Python.",
+])
+def test_one_letter_skills_are_not_found_in_prose(prose):
+    assert get_skill_dictionary().rank(prose) == ["Python"]
+    skills = extract_skills_from_text(RESUME.format(experience=prose, skills="Python, SQL"))
+    assert "R" not in skills and "C" not in skills
+
+
+def test_one_letter_skills_count_in_the_skills_section():
+    text = RESUME.format(experience="Drove R and D budget planning.", skills="Python, R, SQL, C")
+    assert extract_skills_from_text(text) == ["Python", "R", "SQL", "C"]
+    assert get_skill_dictionary().canonical("r") == "R"
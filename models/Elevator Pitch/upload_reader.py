@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional, Union
+
+from fastapi import UploadFile
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes each binary format must start with; text formats have no signature
+MAGIC_BYTES = {
+    '.pdf': (b'%PDF-',),
+    '.docx': (b'PK\x03\x04',),
+    # Legacy Word files are OLE containers, but many ".doc" uploads are really DOCX
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', b'PK\x03\x04'),
+    '.zip': (b'PK\x03\x04', b'PK\x05\x06'),
+}
+
+# Enough bytes to check every signature above
+MAGIC_PREFIX_LENGTH = max(len(magic) for signatures in MAGIC_BYTES.values() for magic in signatures)
+
+# Allowance on top of a route's file limit for multipart boundaries, part headers and form fields
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """Raised when an upload fails validation before it is fully read"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class IngestedUpload:
+    """An upload read into memory together with its size and SHA-256, computed while streaming"""
+
+    __slots__ = ("filename", "content", "size", "sha256")
+
+    def __init__(self, filename: str, content: Union[bytes, bytearray], sha256: str):
+        self.filename = filename
+        self.content = content
+        self.size = len(content)
+        self.sha256 = sha256
+
+
+def file_too_large(max_bytes: int) -> UploadRejected:
+    return UploadRejected(f"File too large, the limit is {max_bytes / (1024 * 1024):g} MB", status_code=413)
+
+
+def max_upload_bytes_from_env(name: str = "PITCH_MAX_UPLOAD_MB", default_mb: float = 20) -> int:
+    return int(float(os.getenv(name, default_mb)) * 1024 * 1024)
+
+
+def file_extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def check_magic_bytes(filename: str, prefix: bytes):
+    """Reject content whose leading bytes don't match the signature of its extension"""
+    signatures = MAGIC_BYTES.get(file_extension(filename))
+    if signatures and not prefix.startswith(signatures):
+        raise UploadRejected(f"File content does not match its {file_extension(filename)} extension")
+
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: int,
+    allowed_extensions: Optional[Iterable[str]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> IngestedUpload:
+    """
+    Read an upload in chunks into a single buffer, hashing as it streams in.
+    Rejects by extension before reading, by magic bytes after the first chunk, and by size
+    as soon as the limit is crossed, so an oversized file is never held in memory. Starlette
+    has already spooled the request body to a temporary file by now; UploadSizeMiddleware is
+    what keeps oversized bodies from being spooled at all.
+    """
+    if not file.filename:
+        raise UploadRejected("No file uploaded")
+    if allowed_extensions is not None and not file.filename.endswith(tuple(allowed_extensions)):
+        raise UploadRejected("Unsupported file format. Please upload JSON, TXT, PDF, DOC, or DOCX files.")
+    if file.size is not None and file.size > max_bytes:
+        raise file_too_large(max_bytes)
+
+    digest = hashlib.sha256()
+    # One growing buffer rather than a list of chunks joined at the end, which held the file twice
+    content = bytearray()
+    size = 0
+    prefix = b""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if len(prefix) < MAGIC_PREFIX_LENGTH:
+            prefix += chunk[:MAGIC_PREFIX_LENGTH - len(prefix)]
+            if len(prefix) >= MAGIC_PREFIX_LENGTH:
+                check_magic_bytes(file.filename, prefix)
+        size += len(chunk)
+        if size > max_bytes:
+            raise file_too_large(max_bytes)
+        digest.update(chunk)
+        content += chunk
+
+    if len(prefix) < MAGIC_PREFIX_LENGTH:
+        check_magic_bytes(file.filename, prefix)
+
+    return IngestedUpload(file.filename, content, digest.hexdigest())
+
+
+class UploadSizeMiddleware:
+    """
+    ASGI middleware enforcing a body size limit per upload route before Starlette spools the
+    multipart body to disk. A Content-Length over the limit is rejected with 413 before
+    anything is read. Chunked bodies are counted as they arrive, and once one passes the limit
+    the app sees a disconnect and the client gets the 413.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], overhead: int = MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.limits = limits
+        self.overhead = overhead
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+        limit = max_bytes + self.overhead
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(send, max_bytes)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            # Whatever the app answers to the cut-off body is replaced by the 413
+            if exceeded and not started:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, tracking_send)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await self._reject(send, max_bytes)
+
+    @staticmethod
+    async def _reject(send, max_bytes: int):
+        body = json.dumps({"detail": file_too_large(max_bytes).detail}).encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,79 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+
+class PoolSaturatedError(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class WorkerPool:
+    """
+    Bounded process pool for CPU-bound parsing and pitch work.
+    At most `workers` jobs run at once and at most `max_queue` more wait for a worker;
+    anything beyond that is rejected so the event loop never accumulates unbounded work.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs currently running or waiting for a worker"""
+        return self._in_flight
+
+    @property
+    def pids(self) -> List[int]:
+        """Process ids of the workers started so far"""
+        if self._executor is None:
+            return []
+        return list(self._executor._processes or {})
+
+    async def run(self, fn: Callable[..., Any], *args: Any, block: bool = False) -> Any:
+        """
+        Run fn(*args) in a worker process and await its result.
+        When the pool is full, raise PoolSaturatedError, or wait for a slot if block is True.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.max_queue)
+        if self._slots.locked() and not block:
+            raise PoolSaturatedError(
+                f"Server busy: {self._in_flight} parsing jobs in progress, please retry shortly"
+            )
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, fn, *args)
+            finally:
+                self._in_flight -= 1
+
+    async def warm_up(self, fn: Callable[[], Any]) -> List[Any]:
+        """Start every worker now by running fn once per worker, rather than on the first request"""
+        return await asyncio.gather(*(self.run(fn, block=True) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def create_pool_from_env() -> WorkerPool:
+    """
+    Build the service pool from PITCH_WORKERS (defaults to the CPU count)
+    and PITCH_MAX_QUEUE (jobs allowed to wait for a worker, defaults to 4 per worker).
+    """
+    workers = int(os.getenv("PITCH_WORKERS", os.cpu_count() or 1))
+    max_queue = int(os.getenv("PITCH_MAX_QUEUE", workers * 4))
+    return WorkerPool(workers, max_queue)